@@ -0,0 +1,265 @@
+"""
+Restaurant sales analytics.
+
+Order lines for a restaurant are streamed out of the database in chunks and
+reduced with NumPy into mergeable partial aggregates (SalesAggregate), so a
+window of any size is summarised without holding ORM objects in memory.
+
+Results are cached per (restaurant, window). Whole days before today never
+change, so they are aggregated once per day; only the latest bucket (today)
+is re-read from the database when the cache entry goes stale.
+
+Prices arrive as integer paise, so revenue is summed exactly in int64 and
+only converted to rupees in the final summary.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+from app import db
+from models import Order, OrderItem, MenuItem
+from money import to_rupees
+from metrics import cache_lookup
+
+CHUNK_SIZE = 50000  # Order lines fetched per database round trip
+LATEST_BUCKET_TTL = 60  # Seconds before today's bucket is re-read
+BASKET_SIZE_CAP = 10  # Baskets of this many items or more share one bucket
+MAX_CACHE_ENTRIES = 256
+
+_EMPTY_INT = np.empty(0, dtype=np.int64)
+_EMPTY_FLOAT = np.empty(0, dtype=np.float64)
+
+
+def _sum_by_key(keys, *values):
+    """
+    Group `values` by `keys` and sum them. Returns (unique_keys, *sums).
+    """
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return (unique,) + tuple(
+        np.bincount(inverse, weights=value, minlength=len(unique)) for value in values
+    )
+
+
+class SalesAggregate:
+    """
+    Partial sales aggregate over a set of order lines.
+
+    Every field is keyed (or positional, for hours) so two aggregates over
+    disjoint line sets can be merged without going back to the raw lines.
+    """
+    __slots__ = (
+        'hour_revenue', 'day_ids', 'day_revenue',
+        'dish_ids', 'dish_quantity', 'dish_revenue',
+        'order_ids', 'order_customers', 'order_items', 'order_revenue',
+    )
+
+    def __init__(self, hour_revenue, day_ids, day_revenue, dish_ids, dish_quantity, dish_revenue,
+                 order_ids, order_customers, order_items, order_revenue):
+        self.hour_revenue = hour_revenue
+        self.day_ids = day_ids
+        self.day_revenue = day_revenue
+        self.dish_ids = dish_ids
+        self.dish_quantity = dish_quantity
+        self.dish_revenue = dish_revenue
+        self.order_ids = order_ids
+        self.order_customers = order_customers
+        self.order_items = order_items
+        self.order_revenue = order_revenue
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(24), _EMPTY_INT, _EMPTY_FLOAT, _EMPTY_INT, _EMPTY_FLOAT, _EMPTY_FLOAT,
+                   _EMPTY_INT, _EMPTY_INT, _EMPTY_FLOAT, _EMPTY_FLOAT)
+
+    @classmethod
+    def from_lines(cls, order_ids, customer_ids, timestamps, menu_item_ids, quantities, prices):
+        """
+        Aggregate raw order lines. `timestamps` are UTC epoch seconds and
+        `prices` integer paise; all arguments are equal-length 1-D arrays,
+        one entry per OrderItem.
+        """
+        revenue = quantities * prices
+        hour_revenue = np.bincount((timestamps // 3600) % 24, weights=revenue, minlength=24)
+        day_ids, day_revenue = _sum_by_key(timestamps // 86400, revenue)
+        dish_ids, dish_quantity, dish_revenue = _sum_by_key(menu_item_ids, quantities, revenue)
+
+        order_keys, first_line, inverse = np.unique(order_ids, return_index=True, return_inverse=True)
+        order_items = np.bincount(inverse, weights=quantities, minlength=len(order_keys))
+        order_revenue = np.bincount(inverse, weights=revenue, minlength=len(order_keys))
+
+        return cls(hour_revenue, day_ids, day_revenue, dish_ids, dish_quantity, dish_revenue,
+                   order_keys, customer_ids[first_line], order_items, order_revenue)
+
+    @classmethod
+    def combine(cls, aggregates):
+        """
+        Merge any number of partial aggregates in one vectorized pass
+        """
+        aggregates = list(aggregates)
+        if not aggregates:
+            return cls.empty()
+
+        def joined(field):
+            return np.concatenate([getattr(aggregate, field) for aggregate in aggregates])
+
+        day_ids, day_revenue = _sum_by_key(joined('day_ids'), joined('day_revenue'))
+        dish_ids, dish_quantity, dish_revenue = _sum_by_key(
+            joined('dish_ids'), joined('dish_quantity'), joined('dish_revenue')
+        )
+
+        # An order's lines can straddle a chunk boundary, so orders are re-reduced too
+        order_keys, first, inverse = np.unique(joined('order_ids'), return_index=True, return_inverse=True)
+        order_items = np.bincount(inverse, weights=joined('order_items'), minlength=len(order_keys))
+        order_revenue = np.bincount(inverse, weights=joined('order_revenue'), minlength=len(order_keys))
+
+        return cls(sum(aggregate.hour_revenue for aggregate in aggregates), day_ids, day_revenue,
+                   dish_ids, dish_quantity, dish_revenue,
+                   order_keys, joined('order_customers')[first], order_items, order_revenue)
+
+    def merge(self, other):
+        """
+        Combine two partial aggregates into a new one
+        """
+        return SalesAggregate.combine([self, other])
+
+    def summary(self, top_n=10, dish_names=None):
+        """
+        Reduce the aggregate into the JSON-ready analytics payload
+        """
+        dish_names = dish_names or {}
+        order_count = len(self.order_ids)
+        total_revenue = int(self.order_revenue.sum())  # Paise
+
+        top = np.argsort(-self.dish_quantity, kind='stable')[:top_n]
+        top_dishes = [{
+            'menu_item_id': int(self.dish_ids[i]),
+            'name': dish_names.get(int(self.dish_ids[i])),
+            'quantity': int(self.dish_quantity[i]),
+            'revenue': to_rupees(float(self.dish_revenue[i]))
+        } for i in top]
+
+        basket_sizes = np.minimum(self.order_items.astype(np.int64), BASKET_SIZE_CAP)
+        basket_counts = np.bincount(basket_sizes, minlength=BASKET_SIZE_CAP + 1)
+        basket_distribution = {str(size): int(basket_counts[size]) for size in range(1, BASKET_SIZE_CAP)}
+        basket_distribution[f'{BASKET_SIZE_CAP}+'] = int(basket_counts[BASKET_SIZE_CAP])
+
+        _, orders_per_customer = np.unique(self.order_customers, return_counts=True)
+        customers = len(orders_per_customer)
+        repeat_customers = int(np.count_nonzero(orders_per_customer > 1))
+
+        return {
+            'revenue': to_rupees(total_revenue),
+            'orders': order_count,
+            'average_order_value': to_rupees(total_revenue / order_count) if order_count else 0.0,
+            'revenue_by_hour': [to_rupees(float(value)) for value in self.hour_revenue],
+            'revenue_by_day': [{
+                'date': (datetime(1970, 1, 1) + timedelta(days=int(day))).date().isoformat(),
+                'revenue': to_rupees(float(revenue))
+            } for day, revenue in zip(self.day_ids, self.day_revenue)],
+            'top_dishes': top_dishes,
+            'basket_size_distribution': basket_distribution,
+            'customers': customers,
+            'repeat_customers': repeat_customers,
+            'repeat_customer_rate': round(repeat_customers / customers, 4) if customers else 0.0
+        }
+
+
+def stream_order_lines(restaurant_id, start, end, chunk_size=CHUNK_SIZE):
+    """
+    Yield column arrays (order_ids, customer_ids, timestamps, menu_item_ids,
+    quantities, prices) for non-cancelled orders created in [start, end),
+    `chunk_size` lines at a time using a server-side cursor.
+    """
+    stmt = select(
+        Order.id, Order.customer_id, Order.created_at,
+        OrderItem.menu_item_id, OrderItem.quantity, OrderItem.price
+    ).join(
+        OrderItem, OrderItem.order_id == Order.id
+    ).where(
+        Order.restaurant_id == restaurant_id,
+        Order.status != 'cancelled',
+        Order.created_at >= start,
+        Order.created_at < end
+    ).order_by(Order.id).execution_options(yield_per=chunk_size)
+
+    result = db.session.execute(stmt)
+    for rows in result.partitions():
+        order_ids, customer_ids, created_at, menu_item_ids, quantities, prices = zip(*rows)
+        yield (
+            np.array(order_ids, dtype=np.int64),
+            np.array(customer_ids, dtype=np.int64),
+            np.array(created_at, dtype='datetime64[s]').astype(np.int64),
+            np.array(menu_item_ids, dtype=np.int64),
+            np.array(quantities, dtype=np.int64),
+            np.array(prices, dtype=np.int64),
+        )
+
+
+def load_aggregate(restaurant_id, start, end, chunk_size=CHUNK_SIZE):
+    """
+    Stream a restaurant's order lines in [start, end) into a single aggregate
+    """
+    return SalesAggregate.combine(
+        SalesAggregate.from_lines(*columns)
+        for columns in stream_order_lines(restaurant_id, start, end, chunk_size)
+    )
+
+
+class _CacheEntry:
+    __slots__ = ('closed_until', 'closed', 'latest', 'latest_loaded_at')
+
+    def __init__(self, closed_until, closed):
+        self.closed_until = closed_until
+        self.closed = closed
+        self.latest = None
+        self.latest_loaded_at = 0.0
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_restaurant_sales(restaurant_id, days=30, top_n=10, now=None):
+    """
+    Sales analytics for the last `days` days (UTC, today included) of a restaurant
+    """
+    now = now or datetime.utcnow()
+    today = datetime(now.year, now.month, now.day)
+    window_start = today - timedelta(days=days - 1)
+    key = (restaurant_id, days)
+
+    with _cache_lock:
+        entry = _cache.get(key)
+
+    closed_hit = entry is not None and entry.closed_until == today
+    cache_lookup('sales_closed_days', closed_hit)
+    if not closed_hit:
+        # New window or the day rolled over: aggregate the closed days once
+        entry = _CacheEntry(today, load_aggregate(restaurant_id, window_start, today))
+
+    latest_hit = entry.latest is not None and time.monotonic() - entry.latest_loaded_at <= LATEST_BUCKET_TTL
+    cache_lookup('sales_today', latest_hit)
+    if not latest_hit:
+        entry.latest = load_aggregate(restaurant_id, today, today + timedelta(days=1))
+        entry.latest_loaded_at = time.monotonic()
+
+    with _cache_lock:
+        if len(_cache) >= MAX_CACHE_ENTRIES and key not in _cache:
+            _cache.pop(next(iter(_cache)))
+        _cache[key] = entry
+
+    aggregate = entry.closed.merge(entry.latest)
+    top_ids = aggregate.dish_ids[np.argsort(-aggregate.dish_quantity, kind='stable')[:top_n]]
+    dish_names = dict(
+        db.session.query(MenuItem.id, MenuItem.name).filter(MenuItem.id.in_(top_ids.tolist())).all()
+    ) if len(top_ids) else {}
+
+    return aggregate.summary(top_n=top_n, dish_names=dish_names)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -1,5 +1,4 @@
 import os
-import logging
 from datetime import datetime
 
 from flask import Flask
@@ -7,8 +6,13 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from flask_login import LoginManager
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+from compression import CompressionMiddleware
+from json_provider import OrjsonProvider
+import logging_config
+from uploads import UploadRequest
+
+# JSON logs through a background queue; levels from LOG_LEVEL / LOG_LEVELS
+logging_config.configure_logging()
 
 # Define base class for SQLAlchemy models
 class Base(DeclarativeBase):
@@ -19,8 +23,24 @@ db = SQLAlchemy(model_class=Base)
 
 # Create app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+logging_config.init_app(app)
 app.secret_key = os.environ.get("SESSION_SECRET", "default_secret_key_for_development")
 
+# Uploads stream to disk in chunks and are rejected as soon as they pass the
+# cap; MAX_CONTENT_LENGTH refuses oversized bodies before any is read.
+app.request_class = UploadRequest
+app.config["MAX_UPLOAD_BYTES"] = int(os.environ.get("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+app.config["MAX_CONTENT_LENGTH"] = app.config["MAX_UPLOAD_BYTES"] + 64 * 1024  # Room for the other form fields
+
+# Compress HTML/JSON/CSV responses; levels trade CPU for bytes (see compression.stats)
+app.wsgi_app = CompressionMiddleware(
+    app.wsgi_app,
+    min_size=int(os.environ.get("COMPRESSION_MIN_SIZE", 1024)),
+    gzip_level=int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6)),
+    brotli_quality=int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 4)),
+)
+
 # Configure database
 database_url = os.environ.get("DATABASE_URL")
 # Fix for PostgreSQL URL format
@@ -50,12 +70,28 @@ from models import User
 def load_user(user_id):
     return db.session.get(User, int(user_id))
 
-with app.app_context():
-    # Import models to ensure tables are created
-    import models
-    
-    # Create all tables
-    db.create_all()
 
-# Import routes after app creation to avoid circular imports
-from routes import *
+def create_app():
+    """
+    Register the routes, request hooks and CLI commands, and return the app
+    """
+    # Deferred so importing app (models, CLI helpers, scripts) stays cheap and
+    # touches no database; the schema is managed by `flask --app main migrate`.
+    # Each module registers itself once, so calling this again is harmless.
+
+    # Import routes after app creation to avoid circular imports
+    import routes  # noqa: F401
+
+    # Per-request SQL counts/timings: Server-Timing header, N+1 warnings, debug panel
+    import query_stats  # noqa: F401
+
+    # Prometheus metrics at /metrics
+    import metrics  # noqa: F401
+
+    # On-demand request profiling under /_profiler (needs PROFILER_TOKEN)
+    import profiling  # noqa: F401
+
+    # Register CLI commands (flask --app main <command>)
+    import commands  # noqa: F401
+
+    return app
@@ -0,0 +1,209 @@
+"""
+Static asset bundles.
+
+`flask build-assets` concatenates and minifies each bundle's sources into
+static/dist under a content-hashed name (main.3f2a9c1e.js) and writes .gz
+and .br siblings next to it. Templates reference bundles through
+asset_url(), which resolves the hashed name from static/dist/manifest.json.
+Because a name only ever refers to one content, /assets/ responses are
+cached as immutable and repeat visits do not revalidate.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+from app import app
+
+try:
+    import brotli
+except ImportError:  # .br siblings are skipped without the brotli package
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DIST_FOLDER = os.path.join(app.static_folder, 'dist')
+MANIFEST_PATH = os.path.join(DIST_FOLDER, 'manifest.json')
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Bundle name -> source files under static/, concatenated in order. Page
+# scripts stay separate bundles: they assume their own page's markup.
+BUNDLES = {
+    'style.css': ['css/style.css'],
+    'main.js': ['js/main.js'],
+    'restaurant.js': ['js/restaurant.js'],
+    'payment.js': ['js/payment.js'],
+    'delivery_tracking.js': ['js/delivery_tracking.js'],
+}
+
+_manifest = None
+_manifest_mtime = None
+
+
+def minify_css(source):
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};:,>])\s*', r'\1', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+    """
+    Conservative JS minifier: drops comments, indentation and blank lines but
+    keeps line breaks, so automatic semicolon insertion behaves as before.
+    String, template and regex literals are copied verbatim.
+    """
+    out = []
+    i = 0
+    length = len(source)
+    previous = ''  # Last significant character, to tell a regex from division
+    while i < length:
+        char = source[i]
+        pair = source[i:i + 2]
+        if pair == '//':
+            end = source.find('\n', i)
+            i = length if end == -1 else end
+        elif pair == '/*':
+            end = source.find('*/', i + 2)
+            i = length if end == -1 else end + 2
+        elif char in '"\'`' or (char == '/' and (not previous or previous in '(,=:[!&|?{};+-*%<>~^\n')):
+            end = _literal_end(source, i)
+            out.append(source[i:end])
+            previous = source[end - 1]
+            i = end
+        else:
+            out.append(char)
+            if not char.isspace() or char == '\n':
+                previous = char
+            i += 1
+
+    lines = (line.strip() for line in ''.join(out).splitlines())
+    return '\n'.join(line for line in lines if line) + '\n'
+
+
+def _literal_end(source, start):
+    """
+    Index just past the string/template/regex literal opening at `start`
+    """
+    quote = source[start]
+    i = start + 1
+    in_class = False  # Inside a regex [...] a / does not close the literal
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if quote == '/' and char == '[':
+            in_class = True
+        elif quote == '/' and char == ']':
+            in_class = False
+        elif char == quote and not in_class:
+            return i + 1
+        elif char == '\n' and quote in '"\'/':
+            return i  # Unterminated; leave the rest to the main loop
+        i += 1
+    return i
+
+
+MINIFIERS = {
+    'css': minify_css,
+    'js': minify_js,
+}
+
+
+def build_assets():
+    """
+    Build every bundle into DIST_FOLDER and write the manifest. Returns the manifest.
+    """
+    os.makedirs(DIST_FOLDER, exist_ok=True)
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        stem, ext = name.rsplit('.', 1)
+        parts = []
+        for source in sources:
+            with open(os.path.join(app.static_folder, source), encoding='utf-8') as f:
+                parts.append(MINIFIERS[ext](f.read()))
+        content = '\n'.join(parts).encode('utf-8')
+
+        filename = f"{stem}.{hashlib.sha256(content).hexdigest()[:10]}.{ext}"
+        path = os.path.join(DIST_FOLDER, filename)
+        with open(path, 'wb') as f:
+            f.write(content)
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(content, quality=11))
+        manifest[name] = filename
+
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    _remove_stale(manifest)
+    logger.info("Built %d asset bundles", len(manifest))
+    return manifest
+
+
+def _remove_stale(manifest):
+    current = set(manifest.values())
+    for filename in os.listdir(DIST_FOLDER):
+        base = filename[:-3] if filename.endswith(('.gz', '.br')) else filename
+        if base != 'manifest.json' and base not in current:
+            os.remove(os.path.join(DIST_FOLDER, filename))
+
+
+def load_manifest():
+    """
+    The bundle manifest, re-read only when the file changes
+    """
+    global _manifest, _manifest_mtime
+    try:
+        mtime = os.path.getmtime(MANIFEST_PATH)
+    except OSError:
+        return {}
+    if mtime != _manifest_mtime:
+        with open(MANIFEST_PATH) as f:
+            _manifest = json.load(f)
+        _manifest_mtime = mtime
+    return _manifest
+
+
+# Best first; only encodings with a sibling file on disk are offered
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def send_asset(filename):
+    """
+    Response for a built bundle, using the precompressed sibling that the
+    client's Accept-Encoding allows
+    """
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in PRECOMPRESSED:
+        path = safe_join(DIST_FOLDER, filename + suffix)
+        if request.accept_encodings[encoding] and path and os.path.isfile(path):
+            response = send_from_directory(DIST_FOLDER, filename + suffix, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(DIST_FOLDER, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@app.template_global()
+def asset_url(name):
+    """
+    URL of a built bundle. Falls back to the unbundled source when
+    `flask build-assets` has not been run (e.g. in development).
+    """
+    filename = load_manifest().get(name)
+    if filename:
+        return url_for('asset', filename=filename)
+    return url_for('static', filename=BUNDLES[name][0])
@@ -0,0 +1,111 @@
+"""
+Benchmark the vectorized sales aggregation on a synthetic dataset.
+
+    python benchmarks/analytics_benchmark.py --lines 10000000
+
+Lines are generated in memory (no database) and fed through
+SalesAggregate in CHUNK_SIZE batches, exactly as load_aggregate() does
+with rows streamed from the database. A pure-Python loop over a sample
+is timed for comparison.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from analytics import CHUNK_SIZE, SalesAggregate  # noqa: E402
+
+
+def synthetic_lines(lines, seed=42, days=30, customers=50000, dishes=200):
+    """
+    Generate order lines: ~3 lines per order, orders in id order like the streaming query
+    """
+    rng = np.random.default_rng(seed)
+    lines_per_order = rng.integers(1, 6, size=lines // 3 + 1)
+    order_ids = np.repeat(np.arange(len(lines_per_order), dtype=np.int64), lines_per_order)[:lines]
+    order_count = int(order_ids[-1]) + 1
+
+    start = int(time.time()) - days * 86400
+    order_times = np.sort(rng.integers(start, start + days * 86400, size=order_count))
+    order_customers = rng.zipf(1.5, size=order_count) % customers
+
+    return (
+        order_ids,
+        order_customers[order_ids],
+        order_times[order_ids],
+        rng.integers(1, dishes + 1, size=lines),
+        rng.integers(1, 4, size=lines),
+        rng.choice(np.arange(2000, 40000, 1000), size=lines),  # Paise
+    )
+
+
+def python_baseline(columns):
+    """
+    The same aggregation written as a per-row Python loop
+    """
+    hour_revenue = [0.0] * 24
+    day_revenue = defaultdict(float)
+    dish_quantity = Counter()
+    order_items = defaultdict(float)
+    order_customer = {}
+    for order_id, customer_id, ts, dish_id, quantity, price in zip(*(c.tolist() for c in columns)):
+        revenue = quantity * price
+        hour_revenue[(ts // 3600) % 24] += revenue
+        day_revenue[ts // 86400] += revenue
+        dish_quantity[dish_id] += quantity
+        order_items[order_id] += quantity
+        order_customer[order_id] = customer_id
+    per_customer = Counter(order_customer.values())
+    return sum(1 for count in per_customer.values() if count > 1)
+
+
+def timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed:8.3f}s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=10_000_000)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--baseline-sample', type=int, default=500_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    columns, _ = timed(f"generate {args.lines:,} lines", lambda: synthetic_lines(args.lines, seed=args.seed))
+
+    def streamed():
+        return SalesAggregate.combine(
+            SalesAggregate.from_lines(*(column[offset:offset + args.chunk_size] for column in columns))
+            for offset in range(0, args.lines, args.chunk_size)
+        )
+
+    aggregate, streamed_time = timed(f"streamed aggregate ({args.chunk_size:,}/chunk)", streamed)
+    _, single_time = timed("single-shot aggregate", lambda: SalesAggregate.from_lines(*columns))
+    summary, _ = timed("summary", aggregate.summary)
+
+    sample = min(args.baseline_sample, args.lines)
+    _, baseline_time = timed(
+        f"python loop ({sample:,} line sample)",
+        lambda: python_baseline(tuple(column[:sample] for column in columns))
+    )
+
+    print()
+    print(f"orders: {summary['orders']:,}  revenue: {summary['revenue']:,.2f}  "
+          f"repeat rate: {summary['repeat_customer_rate']:.2%}")
+    print(f"vectorized throughput: {args.lines / streamed_time / 1e6:,.1f}M lines/s streamed, "
+          f"{args.lines / single_time / 1e6:,.1f}M lines/s single-shot")
+    print(f"python loop throughput: {sample / baseline_time / 1e6:,.2f}M lines/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare compression levels on real response bodies.
+
+    python benchmarks/compression_benchmark.py [--repeat 200]
+
+Seeds a throwaway SQLite database through /init_db, captures a few typical
+responses uncompressed (home page, restaurant dashboard, search JSON) and
+reports, for each gzip level and brotli quality, the compressed size and CPU
+time per response. Use it to pick COMPRESSION_GZIP_LEVEL and
+COMPRESSION_BROTLI_QUALITY; the live equivalent is compression.stats.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp(prefix='compression-bench-')}/bench.db")
+
+from app import create_app  # noqa: E402
+from compression import brotli  # noqa: E402
+from migrations import upgrade  # noqa: E402
+
+app = create_app()
+
+SETTINGS = [('gzip', level) for level in (1, 6, 9)]
+if brotli is not None:
+    SETTINGS += [('br', quality) for quality in (1, 4, 6, 11)]
+
+
+def capture_bodies():
+    with app.app_context():
+        upgrade()
+    client = app.test_client()
+    client.get('/init_db')
+    bodies = {
+        'home.html': client.get('/').data,
+        'search.json': client.get('/api/search_restaurants?query=a').data,
+    }
+    client.post('/login', data={'email': 'restaurant@example.com', 'password': 'password'})
+    bodies['restaurant_dashboard.html'] = client.get('/restaurant/dashboard').data
+    return bodies
+
+
+def compress(encoding, level, data):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    for name, data in capture_bodies().items():
+        print(f"{name}: {len(data)} bytes")
+        for encoding, level in SETTINGS:
+            started = time.process_time()
+            for _ in range(args.repeat):
+                out = compress(encoding, level, data)
+            per_response = (time.process_time() - started) / args.repeat
+            saved = len(data) - len(out)
+            print(f"  {encoding:<4} {level:>2}  {len(out):>7} bytes ({len(out) / len(data):6.1%})  "
+                  f"{per_response * 1e6:8.0f} us  {saved / (per_response * 1000):10.0f} bytes saved/CPU ms")
+
+
+if __name__ == '__main__':
+    main()
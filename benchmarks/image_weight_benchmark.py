@@ -0,0 +1,82 @@
+"""
+Measure what the image pipeline does to home page weight.
+
+    python benchmarks/image_weight_benchmark.py [IMAGE ...]
+
+Each image (default: everything in static/uploads) is run through
+images.build_variants() into a temporary directory. The report compares the
+bytes a home page card downloads before (raw upload) and after (card-sized
+WebP, JPEG fallback), plus processing time per image.
+
+LCP is approximated by the transfer time of the first card image on a
+throttled link; confirm in a real browser with Lighthouse before/after.
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from images import UPLOAD_FOLDER, build_variants  # noqa: E402
+
+# Effective downlink in bytes/second (Lighthouse "slow 4G" is ~1.6 Mbit/s)
+LINK_SPEEDS = {
+    'slow 4G (1.6 Mbit/s)': 1.6e6 / 8,
+    '4G (9 Mbit/s)': 9e6 / 8,
+}
+
+
+def kib(size):
+    return f"{size / 1024:8.1f} KiB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('images', nargs='*')
+    parser.add_argument('--cards', type=int, default=12, help='Restaurant cards on the home page')
+    args = parser.parse_args()
+
+    paths = args.images or sorted(
+        path for path in glob.glob(os.path.join(UPLOAD_FOLDER, '*'))
+        if not path.rsplit('.', 1)[0].endswith(('_thumb', '_card', '_hero'))
+    )
+    if not paths:
+        parser.error('no images found')
+
+    before_total = after_webp_total = after_jpeg_total = 0
+    with tempfile.TemporaryDirectory() as output:
+        print(f"{'image':<50} {'original':>12} {'card.webp':>12} {'card.jpg':>12} {'time':>8}")
+        for path in paths:
+            stem = os.path.basename(path).rsplit('.', 1)[0]
+            started = time.perf_counter()
+            manifest = build_variants(path, stem, output_folder=output, url_prefix='')
+            elapsed = time.perf_counter() - started
+
+            original = os.path.getsize(path)
+            card_webp = os.path.getsize(os.path.join(output, manifest['card']['webp'].lstrip('/')))
+            card_jpeg = os.path.getsize(os.path.join(output, manifest['card']['jpeg'].lstrip('/')))
+            before_total += original
+            after_webp_total += card_webp
+            after_jpeg_total += card_jpeg
+            print(f"{os.path.basename(path)[:50]:<50} {kib(original)} {kib(card_webp)} {kib(card_jpeg)} {elapsed * 1000:6.0f}ms")
+
+    count = len(paths)
+    before_page = before_total / count * args.cards
+    after_page = after_webp_total / count * args.cards
+    print()
+    print(f"home page image weight for {args.cards} cards (average image):")
+    print(f"  before: {kib(before_page)}")
+    print(f"  after:  {kib(after_page)} WebP ({after_page / before_page:.1%} of before), "
+          f"{kib(after_jpeg_total / count * args.cards)} JPEG fallback")
+    print("estimated LCP image transfer time (first card):")
+    for label, speed in LINK_SPEEDS.items():
+        print(f"  {label:<22} before {before_total / count / speed * 1000:7.0f}ms   "
+              f"after {after_webp_total / count / speed * 1000:7.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
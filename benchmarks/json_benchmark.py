@@ -0,0 +1,106 @@
+"""
+Benchmark /api/search_restaurants on a large catalogue.
+
+    python benchmarks/json_benchmark.py [--restaurants 10000] [--repeat 20]
+
+Seeds a throwaway SQLite database with synthetic restaurants, then times
+the previous path (ORM objects + Restaurant.to_dict() + stdlib json) against
+the current endpoint (column rows + RESTAURANT_JSON + orjson), and checks
+that both produce the same payload. Serialization alone is timed separately.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp(prefix='json-bench-')}/bench.db")
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from models import User, Restaurant  # noqa: E402
+from json_provider import OrjsonProvider  # noqa: E402
+from migrations import upgrade  # noqa: E402
+
+app = create_app()
+
+CUISINES = ['South Indian', 'North Indian', 'Chinese', 'Italian', 'Snacks', 'Beverages', 'Desserts']
+
+
+def seed(count):
+    owner = User(username='bench', email='bench@example.com', password_hash='x', role='restaurant')
+    db.session.add(owner)
+    db.session.flush()
+    rng = random.Random(42)
+    db.session.execute(Restaurant.__table__.insert(), [{
+        'owner_id': owner.id,
+        'name': f"Restaurant {i}",
+        'description': f"Serving {rng.choice(CUISINES).lower()} food since {rng.randint(1990, 2024)}",
+        'cuisine_type': rng.choice(CUISINES),
+        'address': f"{i} Food Street, Chennai",
+        'phone': f"98{i:08d}",
+        'image_url': None,
+        'rating': round(rng.uniform(2.5, 5.0), 1),
+        'is_open': rng.random() > 0.2,
+    } for i in range(count)])
+    db.session.commit()
+
+
+def legacy_search():
+    """
+    The endpoint as it was: ORM objects, to_dict() and the stdlib encoder
+    """
+    restaurants = Restaurant.query.all()
+    return DefaultJSONProvider(app).response({
+        'success': True,
+        'restaurants': [restaurant.to_dict() for restaurant in restaurants]
+    })
+
+
+def timed(f, repeat):
+    samples = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        f()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--restaurants', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with app.app_context():
+        upgrade()
+        seed(args.restaurants)
+
+    search = app.view_functions['search_restaurants']
+    with app.test_request_context('/api/search_restaurants'):
+        old_body = legacy_search().get_data()
+        new_body = search().get_data()
+        payload = json.loads(old_body)
+        assert json.loads(new_body) == payload, 'payload changed'
+
+        old = timed(lambda: legacy_search().get_data(), args.repeat)
+        new = timed(lambda: search().get_data(), args.repeat)
+
+        stdlib, fast = DefaultJSONProvider(app), OrjsonProvider(app)
+        encode_old = timed(lambda: stdlib.dumps(payload, separators=(',', ':')), args.repeat)
+        encode_new = timed(lambda: fast.dumps(payload), args.repeat)
+
+    print(f"/api/search_restaurants with {args.restaurants} restaurants ({len(new_body) / 1024:.0f} KiB), median of {args.repeat}:")
+    print(f"  ORM + to_dict + json:          {old * 1000:8.1f} ms")
+    print(f"  rows + serializer + orjson:    {new * 1000:8.1f} ms  ({old / new:.1f}x)")
+    print(f"  encode only, json -> orjson:   {encode_old * 1000:8.1f} ms -> {encode_new * 1000:.1f} ms ({encode_old / encode_new:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
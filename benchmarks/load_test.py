@@ -0,0 +1,356 @@
+"""
+End-to-end load test: customers, restaurant owners and delivery partners
+running the real order flow concurrently.
+
+    python benchmarks/load_test.py [--duration 20] [--customers 20] [--restaurants 3] [--partners 5]
+    python benchmarks/load_test.py --url http://localhost:5000 --duration 60 --json load.json
+
+Without --url the app runs in-process through the Flask test client on a
+throwaway SQLite database (one thread per virtual user, so the numbers are
+GIL-bound and best compared with each other). With --url it drives a
+running server over HTTP using only the standard library.
+
+Setup registers the users through /register, and each owner adds a menu
+through the API. Then, until the duration runs out:
+- customers browse home, search, open a restaurant, add items to the cart,
+  check out, and poll the order's tracking;
+- owners reload the dashboard and mark their pending orders ready;
+- partners pick up ready orders, send location pings and complete the
+  delivery.
+
+Prints throughput and p50/p95/p99 latency per step. --json writes the same
+numbers to a file for comparison between runs.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+
+SEARCH_TERMS = ['', 'load', 'dosa', 'south', 'biryani', 'restaurant']
+MENU = [('Masala Dosa', '80'), ('Idli', '45.50'), ('Veg Biryani', '180'), ('Paneer Roll', '120'),
+        ('Filter Coffee', '25'), ('Gulab Jamun', '60')]
+PASSWORD = 'loadtest'
+
+_ORDER_ID = re.compile(r'/order/(\d+)')
+_READY_BUTTON = re.compile(r'data-order-id="(\d+)"\s+data-status="ready"')
+
+
+class TestClientTransport:
+    """
+    Requests through the Flask test client; one per virtual user for its own cookies
+    """
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None, json_body=None, headers=None):
+        response = self.client.open(path, method=method, data=form, json=json_body, headers=headers)
+        return response.status_code, response.headers, response.get_data()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class HttpTransport:
+    """
+    Requests to a running server; redirects are returned, not followed, like the test client
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect
+        )
+
+    def request(self, method, path, form=None, json_body=None, headers=None):
+        headers = dict(headers or {})
+        data = None
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers, error.read()
+
+
+class Recorder:
+    """
+    Latencies and outcomes per step for one virtual user
+    """
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = Counter()  # (step, status) -> count; status None for connection errors
+        self.conflicts = Counter()
+
+    def call(self, transport, step, method, path, ok=(200, 302), conflict=(), **kwargs):
+        started = time.perf_counter()
+        try:
+            status, headers, body = transport.request(method, path, **kwargs)
+        except Exception as error:  # Connection refused, timeouts
+            status, headers, body = None, {}, str(error).encode()
+        self.latencies.setdefault(step, []).append(time.perf_counter() - started)
+        if status in conflict:
+            self.conflicts[step] += 1
+        elif status not in ok:
+            self.errors[step, status] += 1
+            return None, headers, body
+        return status, headers, body
+
+
+class LoadTest:
+
+    def __init__(self, new_transport, args):
+        self.new_transport = new_transport
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.run_id = f'{int(time.time())}{os.getpid() % 1000}'
+        self.catalog = {}  # restaurant id -> menu item ids
+        self.recorders = []
+        self.deadline = None
+
+    # Setup
+
+    def register_and_login(self, name, role):
+        transport = self.new_transport()
+        email = f'{name.lower().replace(" ", ".")}.{self.run_id}@load.test'
+        status, _, _ = transport.request('POST', '/register', form={
+            'name': f'{name} {self.run_id}', 'email': email, 'password': PASSWORD, 'confirm_password': PASSWORD,
+            'phone': '9000000000', 'address': f'{name} Street, Chennai', 'role': role
+        })
+        if status != 302:
+            raise SystemExit(f'Registering {email} failed with {status}')
+        status, _, _ = transport.request('POST', '/login', form={'email': email, 'password': PASSWORD})
+        if status != 302:
+            raise SystemExit(f'Logging in {email} failed with {status}')
+        return transport
+
+    def setup_restaurant(self, index):
+        transport = self.register_and_login(f'Load Owner {index}', 'restaurant')
+        item_ids = []
+        for name, price in MENU:
+            _, _, body = transport.request('POST', '/api/restaurant/add_menu_item', json_body={
+                'name': name, 'price': price, 'category': 'Load', 'is_vegetarian': True
+            })
+            item_ids.append(json.loads(body)['item']['id'])
+
+        restaurant_name = f"Load Owner {index} {self.run_id}'s Restaurant"
+        _, _, body = transport.request('GET', '/api/search_restaurants?' + urllib.parse.urlencode({'query': restaurant_name}))
+        restaurant_id = next(r['id'] for r in json.loads(body)['restaurants'] if r['name'] == restaurant_name)
+        self.catalog[restaurant_id] = item_ids
+        return transport
+
+    def setup(self):
+        owners = [self.setup_restaurant(i) for i in range(self.args.restaurants)]
+        customers = [self.register_and_login(f'Load Customer {i}', 'customer') for i in range(self.args.customers)]
+        partners = [self.register_and_login(f'Load Partner {i}', 'delivery') for i in range(self.args.partners)]
+        return owners, customers, partners
+
+    # Virtual users
+
+    def think(self, rng):
+        if self.args.think:
+            time.sleep(rng.expovariate(1 / self.args.think))
+
+    def running(self):
+        return time.monotonic() < self.deadline
+
+    def customer(self, transport, recorder, rng):
+        while self.running():
+            recorder.call(transport, 'home', 'GET', '/')
+            query = urllib.parse.urlencode({'query': rng.choice(SEARCH_TERMS)})
+            recorder.call(transport, 'search', 'GET', f'/api/search_restaurants?{query}')
+            restaurant_id = rng.choice(list(self.catalog))
+            recorder.call(transport, 'restaurant_page', 'GET', f'/restaurant/{restaurant_id}')
+            self.think(rng)
+
+            for item_id in rng.sample(self.catalog[restaurant_id], rng.randint(1, 3)):
+                recorder.call(transport, 'add_to_cart', 'POST', '/add-to-cart', form={
+                    'menu_item_id': item_id, 'quantity': rng.randint(1, 2)
+                }, headers={'Referer': f'/restaurant/{restaurant_id}'})
+            status, headers, _ = recorder.call(transport, 'checkout', 'POST', '/checkout', form={
+                'payment_method': 'cash', 'delivery_address': 'Load Street, Chennai'
+            })
+            match = _ORDER_ID.search(headers.get('Location', '')) if status == 302 else None
+            if match is None:
+                transport.request('GET', '/clear-cart')  # Don't carry a failed cart into the next round
+                continue
+
+            order_id = match.group(1)
+            recorder.call(transport, 'order_page', 'GET', f'/order/{order_id}')
+            recorder.call(transport, 'tracking_page', 'GET', f'/tracking/{order_id}')
+            for _ in range(self.args.polls):
+                self.think(rng)
+                recorder.call(transport, 'tracking_poll', 'GET', f'/api/order/{order_id}/delivery_location')
+
+    def restaurant(self, transport, recorder, rng):
+        while self.running():
+            recorder.call(transport, 'restaurant_dashboard', 'GET', '/restaurant/dashboard')
+            status, _, body = recorder.call(transport, 'restaurant_orders', 'GET', '/api/order/list/restaurant_active')
+            pending = _READY_BUTTON.findall(json.loads(body)['html']) if status else []
+            for order_id in pending:
+                recorder.call(transport, 'mark_ready', 'POST', '/api/order/update_status', json_body={
+                    'order_id': int(order_id), 'status': 'ready'
+                })
+            self.think(rng)
+            if not pending:
+                time.sleep(self.args.idle_poll)
+
+    def partner(self, transport, recorder, rng):
+        while self.running():
+            status, _, body = recorder.call(transport, 'available_orders', 'GET', '/api/delivery/available_orders')
+            orders = json.loads(body)['orders'] if status else []
+            if not orders:
+                time.sleep(self.args.idle_poll)
+                continue
+
+            order_id = rng.choice(orders)['id']
+            status, _, _ = recorder.call(transport, 'accept_order', 'POST', '/api/delivery/accept_order',
+                                         json_body={'order_id': order_id}, conflict=(404,))
+            if status != 200:
+                continue  # Another partner took it first
+            for next_status in ('delivering', 'completed'):
+                for _ in range(self.args.pings):
+                    self.think(rng)
+                    recorder.call(transport, 'location_ping', 'POST', '/api/delivery/update_location', json_body={
+                        'order_id': order_id,
+                        'latitude': 13.0827 + rng.uniform(-0.05, 0.05),
+                        'longitude': 80.2707 + rng.uniform(-0.05, 0.05)
+                    })
+                recorder.call(transport, f'mark_{next_status}', 'POST', '/api/order/update_status', json_body={
+                    'order_id': order_id, 'status': next_status
+                })
+
+    # Run and report
+
+    def run(self):
+        owners, customers, partners = self.setup()
+        threads = []
+        for role, transports in ((self.customer, customers), (self.restaurant, owners), (self.partner, partners)):
+            for transport in transports:
+                recorder = Recorder()
+                self.recorders.append(recorder)
+                rng = random.Random(self.rng.random())
+                threads.append(threading.Thread(target=role, args=(transport, recorder, rng), daemon=True))
+
+        started = time.monotonic()
+        self.deadline = started + self.args.duration
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.summary(time.monotonic() - started)
+
+    def summary(self, elapsed):
+        latencies, errors, conflicts = {}, Counter(), Counter()
+        for recorder in self.recorders:
+            for step, values in recorder.latencies.items():
+                latencies.setdefault(step, []).extend(values)
+            errors.update(recorder.errors)
+            conflicts.update(recorder.conflicts)
+
+        error_statuses = {}
+        for (step, status), count in errors.items():
+            error_statuses.setdefault(step, {})[str(status)] = count
+
+        steps = {}
+        for step, values in latencies.items():
+            values.sort()
+            cuts = statistics.quantiles(values, n=100, method='inclusive') if len(values) > 1 else values * 99
+            steps[step] = {
+                'requests': len(values),
+                'errors': sum(error_statuses.get(step, {}).values()),
+                'error_statuses': error_statuses.get(step, {}),
+                'conflicts': conflicts[step],
+                'rps': round(len(values) / elapsed, 2),
+                'p50_ms': round(cuts[49] * 1000, 2),
+                'p95_ms': round(cuts[94] * 1000, 2),
+                'p99_ms': round(cuts[98] * 1000, 2),
+                'max_ms': round(values[-1] * 1000, 2),
+            }
+        total = sum(step['requests'] for step in steps.values())
+        return {
+            'target': self.args.url or 'in-process',
+            'duration_s': round(elapsed, 2),
+            'users': {'customers': self.args.customers, 'restaurants': self.args.restaurants,
+                      'partners': self.args.partners},
+            'requests': total,
+            'errors': sum(errors.values()),
+            'rps': round(total / elapsed, 2),
+            'orders_completed': steps.get('mark_completed', {}).get('requests', 0),
+            'steps': steps,
+        }
+
+
+def print_summary(summary):
+    print(f"{summary['target']}: {summary['requests']} requests in {summary['duration_s']}s "
+          f"= {summary['rps']} req/s, {summary['errors']} errors, {summary['orders_completed']} orders delivered")
+    print(f"{'step':<22}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for name, step in sorted(summary['steps'].items(), key=lambda item: -item[1]['requests']):
+        errors = f"{step['errors']}" + (f"+{step['conflicts']}c" if step['conflicts'] else '')
+        print(f"{name:<22}{step['requests']:>9}{errors:>8}{step['rps']:>9}{step['p50_ms']:>9}"
+              f"{step['p95_ms']:>9}{step['p99_ms']:>9}{step['max_ms']:>9}")
+    print('(Nc: expected conflicts, e.g. an order another partner accepted first)')
+    for name, step in sorted(summary['steps'].items()):
+        if step['error_statuses']:
+            statuses = ', '.join(f'{count}x {status}' for status, count in step['error_statuses'].items())
+            print(f'errors in {name}: {statuses}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='base URL of a running server (default: in-process test client)')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of load after setup')
+    parser.add_argument('--customers', type=int, default=20)
+    parser.add_argument('--restaurants', type=int, default=3)
+    parser.add_argument('--partners', type=int, default=5)
+    parser.add_argument('--polls', type=int, default=3, help='tracking polls per order')
+    parser.add_argument('--pings', type=int, default=2, help='location pings per delivery leg')
+    parser.add_argument('--think', type=float, default=0.0, help='mean think time between steps, seconds')
+    parser.add_argument('--idle-poll', type=float, default=0.2, help='wait when there is nothing to do, seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    if args.url:
+        new_transport = lambda: HttpTransport(args.url)  # noqa: E731
+    else:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp(prefix='load-test-')}/load.db")
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        from app import create_app
+        from migrations import upgrade
+        app = create_app()
+        with app.app_context():
+            upgrade()
+        new_transport = lambda: TestClientTransport(app)  # noqa: E731
+
+    summary = LoadTest(new_transport, args).run()
+    print_summary(summary)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
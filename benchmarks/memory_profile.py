@@ -0,0 +1,299 @@
+"""
+Memory behaviour under sustained load: RSS growth and the allocation sites
+that keep memory per route.
+
+    python benchmarks/memory_profile.py [--requests 10000] [--warmup 2000] [--sample-every 25] [--json mem.json]
+
+Replays the load_test.py scenario in-process (customers, restaurant owners
+and delivery partners over a throwaway SQLite database) and stops after
+--requests requests. Requests are serialized so memory can be attributed
+to the route that allocated it. tracemalloc starts after --warmup requests,
+once caches and compiled templates have settled. From then on, every
+traced block is memory allocated since warm-up and still alive.
+
+Reported:
+- RSS and traced memory every --checkpoint requests, and their growth per
+  10k requests fitted over the run after warm-up. Steady growth means a
+  leak or an unbounded cache, such as a dict that is never pruned or an
+  identity map that outlives its request;
+- per endpoint, the memory still held when a request returns, and the
+  allocation sites holding it, from snapshots around every
+  --sample-every'th request;
+- the sites holding the most memory allocated since warm-up;
+- the size of each role's session cookie, which carries per-user state
+  such as delivery_locations and restaurant_bot_settings.
+
+Tracing slows requests down; compare memory, not latency.
+"""
+import argparse
+import functools
+import gc
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import tracemalloc
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp(prefix='memory-profile-')}/bench.db")
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+from load_test import LoadTest, TestClientTransport  # noqa: E402
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def rss_bytes():
+    """
+    Current resident set size; falls back to the peak where /proc is not available
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@functools.lru_cache(maxsize=None)
+def location(filename):
+    """
+    (path relative to the project or to site-packages, whether it is project code); None for the harness
+    """
+    path = os.path.abspath(filename)
+    if path.startswith(BENCHMARK_ROOT) or filename == tracemalloc.__file__:
+        return None
+    if path.startswith(PROJECT_ROOT):
+        return os.path.relpath(path, PROJECT_ROOT), True
+    return filename.rpartition('site-packages/')[2], False
+
+
+def site(traceback):
+    """
+    The innermost frame in this project's code, with the innermost frame overall when they differ;
+    None for the harness's own allocations
+    """
+    locations = [(location(frame.filename), frame.lineno) for frame in traceback]
+    if any(where is None for where, _ in locations):
+        return None
+    (path, _), lineno = locations[-1]
+    label = f"{path}:{lineno}"
+    for (project_path, in_project), project_lineno in reversed(locations):
+        if in_project:
+            project_label = f"{project_path}:{project_lineno}"
+            return project_label if project_label == label else f"{project_label} (via {label})"
+    return label
+
+
+def growth_per_10k(points):
+    """
+    Least-squares slope of (requests, bytes) points, scaled to 10k requests
+    """
+    if len(points) < 2:
+        return 0
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return 0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance * 10000
+
+
+class MemoryProfile:
+    """
+    Shared by every virtual user's transport: serializes requests and records memory
+    """
+
+    def __init__(self, app, args):
+        self.app = app
+        self.args = args
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.per_endpoint = Counter()
+        self.sampled = Counter()
+        self.traced = Counter()  # endpoint -> requests made while tracing
+        self.held = Counter()  # endpoint -> bytes still allocated when its sampled requests returned
+        self.sites = defaultdict(Counter)  # endpoint -> site -> bytes, from sampled requests
+        self.checkpoints = []
+        self.load_test = None
+
+    def endpoint(self, method, path):
+        try:
+            return self.app.url_map.bind('localhost').match(path.split('?', 1)[0], method)[0]
+        except Exception:
+            return 'unmatched'
+
+    def request(self, transport, method, path, **kwargs):
+        with self.lock:
+            if self.requests == self.args.warmup:
+                gc.collect()
+                tracemalloc.start(self.args.frames)
+            endpoint = self.endpoint(method, path)
+            self.per_endpoint[endpoint] += 1
+            if not tracemalloc.is_tracing():
+                result = transport.request(method, path, **kwargs)
+            else:
+                self.traced[endpoint] += 1
+                if self.traced[endpoint] % self.args.sample_every != 1:
+                    result = transport.request(method, path, **kwargs)
+                else:
+                    result = self.sample(endpoint, transport, method, path, **kwargs)
+            self.requests += 1
+            if self.requests % self.args.checkpoint == 0:
+                self.checkpoint()
+            if self.requests >= self.args.requests:
+                self.load_test.deadline = 0
+            return result
+
+    def sample(self, endpoint, transport, method, path, **kwargs):
+        """
+        Run one request between snapshots; collecting garbage first so only memory kept alive is counted
+        """
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        start, _ = tracemalloc.get_traced_memory()
+        result = transport.request(method, path, **kwargs)
+        gc.collect()
+        end, _ = tracemalloc.get_traced_memory()
+        # The body is still referenced by the virtual user, not the app
+        body = result[2]
+        body_traceback, body_size = tracemalloc.get_object_traceback(body), sys.getsizeof(body)
+        self.sampled[endpoint] += 1
+        self.held[endpoint] += end - start - (body_size if body_traceback else 0)
+        for stat in tracemalloc.take_snapshot().compare_to(before, 'traceback'):
+            size = stat.size_diff - (body_size if stat.traceback == body_traceback else 0)
+            where = site(stat.traceback)
+            if size > 0 and where:
+                self.sites[endpoint][where] += size
+        return result
+
+    def checkpoint(self):
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        # tracemalloc's own bookkeeping grows with the traces; leave it out of RSS
+        rss = rss_bytes() - tracemalloc.get_tracemalloc_memory()
+        self.checkpoints.append({'requests': self.requests, 'rss': rss, 'traced': traced,
+                                 'objects': len(gc.get_objects())})
+        print(f"  {self.requests} requests: RSS {self.checkpoints[-1]['rss'] / 2 ** 20:.1f} MiB"
+              + (f", traced since warm-up {traced / 2 ** 20:.2f} MiB" if traced is not None else ''), flush=True)
+
+
+class ProfiledTransport:
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.inner = TestClientTransport(profile.app)
+
+    def request(self, method, path, **kwargs):
+        if self.profile.load_test.deadline is None:  # Setup: registrations, menus
+            return self.inner.request(method, path, **kwargs)
+        return self.profile.request(self.inner, method, path, **kwargs)
+
+
+def summarize(profile, transports, top):
+    warm = [point for point in profile.checkpoints if point['traced'] is not None]
+    summary = {
+        'requests': profile.requests,
+        'rss_growth_per_10k': round(growth_per_10k([(p['requests'], p['rss']) for p in warm])),
+        'traced_growth_per_10k': round(growth_per_10k([(p['requests'], p['traced']) for p in warm])),
+        'checkpoints': profile.checkpoints,
+        'endpoints': {},
+        'growth_sites': [],
+        'session_cookie_bytes': {},
+    }
+    for endpoint, count in profile.per_endpoint.most_common():
+        sampled = profile.sampled[endpoint]
+        summary['endpoints'][endpoint] = {
+            'requests': count,
+            'sampled': sampled,
+            'held_per_request': round(profile.held[endpoint] / sampled) if sampled else None,
+            'top_sites': [(where, round(size / sampled)) for where, size in profile.sites[endpoint].most_common(top)],
+        }
+    if tracemalloc.is_tracing():
+        gc.collect()
+        growth = Counter()
+        for stat in tracemalloc.take_snapshot().statistics('traceback'):
+            where = site(stat.traceback)
+            if where:
+                growth[where] += stat.size
+        summary['growth_sites'] = growth.most_common(top)
+        tracemalloc.stop()
+    for role, role_transports in transports.items():
+        sizes = [len(cookie.value) for transport in role_transports
+                 if (cookie := transport.inner.client.get_cookie('session')) is not None]
+        summary['session_cookie_bytes'][role] = max(sizes, default=0)
+    return summary
+
+
+def print_summary(summary):
+    mib = 2 ** 20
+    print(f"\n{summary['requests']} requests. Growth per 10k requests after warm-up: "
+          f"RSS {summary['rss_growth_per_10k'] / mib:+.2f} MiB, traced {summary['traced_growth_per_10k'] / mib:+.2f} MiB")
+    print(f"\n{'endpoint':<36}{'requests':>9}{'sampled':>8}{'held/req':>10}")
+    for endpoint, entry in summary['endpoints'].items():
+        held = entry['held_per_request']
+        print(f"{endpoint:<36}{entry['requests']:>9}{entry['sampled']:>8}{'-' if held is None else f'{held} B':>10}")
+        for where, size in entry['top_sites'][:3]:
+            print(f"{'':>8}{size:>8} B/req  {where}")
+    if summary['growth_sites']:
+        print("\nHolding the most memory allocated since warm-up:")
+        for where, size in summary['growth_sites']:
+            print(f"  {size / 1024:>10.1f} KiB  {where}")
+    print("\nLargest session cookie per role: " + ', '.join(
+        f"{role} {size} B" for role, size in summary['session_cookie_bytes'].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--warmup', type=int, help='requests before tracing starts (default: a fifth of --requests)')
+    parser.add_argument('--checkpoint', type=int, default=1000, help='record RSS every N requests')
+    parser.add_argument('--sample-every', type=int, default=25, help='snapshot every Nth request per endpoint')
+    parser.add_argument('--frames', type=int, default=10, help='traceback depth kept by tracemalloc (deeper is slower)')
+    parser.add_argument('--top', type=int, default=10, help='allocation sites to list')
+    parser.add_argument('--customers', type=int, default=10)
+    parser.add_argument('--restaurants', type=int, default=3)
+    parser.add_argument('--partners', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+    if args.warmup is None:
+        args.warmup = args.requests // 5
+
+    from app import create_app
+    from migrations import upgrade
+
+    app = create_app()
+    with app.app_context():
+        upgrade()
+
+    profile = MemoryProfile(app, args)
+    transports = defaultdict(list)
+    load_args = argparse.Namespace(
+        url=None, duration=10 ** 9, customers=args.customers, restaurants=args.restaurants,
+        partners=args.partners, polls=3, pings=2, think=0.0, idle_poll=0.05, seed=args.seed
+    )
+    roles = iter(['owner'] * args.restaurants + ['customer'] * args.customers + ['partner'] * args.partners)
+
+    def new_transport():
+        transport = ProfiledTransport(profile)
+        transports[next(roles)].append(transport)
+        return transport
+
+    profile.load_test = LoadTest(new_transport, load_args)
+    profile.load_test.run()
+
+    summary = summarize(profile, transports, args.top)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
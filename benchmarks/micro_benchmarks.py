@@ -0,0 +1,283 @@
+"""
+Micro-benchmarks for hot model helpers, route handlers and templates, with
+a stored baseline.
+
+    python benchmarks/micro_benchmarks.py                # compare with the baseline, exit 1 on a regression
+    python benchmarks/micro_benchmarks.py --save         # record the current numbers as the baseline
+    python benchmarks/micro_benchmarks.py -k render      # only benchmarks whose name contains "render"
+
+Runs against a throwaway SQLite database filled by synthetic.generate() with
+a fixed seed. Each benchmark is timed with timeit in --repeat rounds, each
+alternating about 20ms of calls to the benchmark with 20ms of a fixed
+pure-Python calibration loop, keeping the fastest block of each. Benchmarks
+are compared in multiples of the calibration loop rather than in seconds,
+so a machine that is busier or slower than when the baseline was recorded
+does not read as a regression; the short alternating blocks mean both see
+the same bursts of load from other processes. A benchmark regresses when it is
+more than its threshold slower than its baseline: 25% by default, more for
+route and render benchmarks, which go through SQLite, Jinja and the WSGI
+stack and vary more between runs; --threshold overrides them all. A
+benchmark over its threshold is measured once more before it counts.
+Baselines are still best recorded on the machine that compares against
+them; the file stores the Python version and platform, and a mismatch is
+reported.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp(prefix='micro-bench-')}/bench.db")
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from flask import render_template  # noqa: E402
+from flask_login import login_user  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from migrations import upgrade  # noqa: E402
+from models import User, Restaurant, MenuItem, Order  # noqa: E402
+from money import cart_totals  # noqa: E402
+from routes import load_order_page  # noqa: E402
+from synthetic import PASSWORD, generate  # noqa: E402
+from utils import allowed_roles  # noqa: E402
+
+app = create_app()
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'micro_benchmarks.json')
+DATASET = dict(restaurants=50, menu_items=1000, customers=500, partners=20, orders=5000, days=60, seed=7,
+               until=date(2026, 1, 31))
+
+BLOCK_SECONDS = 0.02
+DEFAULT_THRESHOLD = 0.25
+STACK_THRESHOLD = 0.4  # Route and render benchmarks
+
+BENCHMARKS = {}
+THRESHOLDS = {}
+
+
+def benchmark(name, threshold=DEFAULT_THRESHOLD):
+    """
+    Register a generator that sets up, yields the callable to time, then cleans up
+    """
+    def register(func):
+        BENCHMARKS[name] = contextlib.contextmanager(func)
+        THRESHOLDS[name] = threshold
+        return func
+    return register
+
+
+def calibration():
+    """
+    Fixed interpreter work (dicts, strings, arithmetic) that the benchmarks are measured against
+    """
+    rows = [{'id': i, 'name': f'Dish {i}', 'price': i * 100} for i in range(200)]
+    return sum(len(row['name']) + row['price'] // 3 for row in rows if row['id'] % 3)
+
+
+class Fixture:
+    """
+    The seeded database and a few rows the benchmarks need
+    """
+
+    def __init__(self):
+        with app.app_context():
+            upgrade()
+            generate(**DATASET)
+            self.owner_id = db.session.scalar(db.select(User.id).filter_by(role='restaurant').order_by(User.id))
+            self.partner_id = db.session.scalar(db.select(User.id).filter_by(role='delivery').order_by(User.id))
+
+    def client(self, user_id):
+        client = app.test_client()
+        with app.app_context():
+            email = db.session.get(User, user_id).email
+        client.post('/login', data={'email': email, 'password': PASSWORD})
+        return client
+
+    @contextlib.contextmanager
+    def request_as(self, user_id):
+        with app.test_request_context():
+            login_user(db.session.get(User, user_id))
+            yield
+
+
+@benchmark('restaurant_to_dict')
+def _restaurant_to_dict(fixture):
+    with app.app_context():
+        restaurant = db.session.scalars(db.select(Restaurant).limit(1)).one()
+        yield restaurant.to_dict
+
+
+@benchmark('order_items_display')
+def _order_items_display(fixture):
+    with app.app_context():
+        order = db.session.scalars(db.select(Order).limit(1)).one()
+        yield lambda: order.order_items_display
+
+
+@benchmark('cart_totals')
+def _cart_totals(fixture):
+    cart = [{'menu_item_id': i, 'name': f'Dish {i}', 'price': 12500 + i * 1000, 'quantity': i % 3 + 1}
+            for i in range(5)]
+    yield lambda: cart_totals(cart)
+
+
+@benchmark('allowed_roles')
+def _allowed_roles(fixture):
+    view = allowed_roles(['restaurant'])(lambda: None)
+    with fixture.request_as(fixture.owner_id):
+        yield view
+
+
+@benchmark('route_search_restaurants', threshold=STACK_THRESHOLD)
+def _search_restaurants(fixture):
+    client = app.test_client()
+    yield lambda: client.get('/api/search_restaurants?query=biryani')
+
+
+@benchmark('route_available_orders', threshold=STACK_THRESHOLD)
+def _available_orders(fixture):
+    client = fixture.client(fixture.partner_id)
+    yield lambda: client.get('/api/delivery/available_orders')
+
+
+@benchmark('render_home', threshold=STACK_THRESHOLD)
+def _render_home(fixture):
+    with app.test_request_context():
+        restaurants = Restaurant.query.filter_by(is_open=True).all()
+        yield lambda: render_template('home.html', restaurants=restaurants)
+
+
+@benchmark('render_restaurant_dashboard', threshold=STACK_THRESHOLD)
+def _render_restaurant_dashboard(fixture):
+    with fixture.request_as(fixture.owner_id):
+        restaurant = Restaurant.query.filter_by(owner_id=fixture.owner_id).first()
+        current_orders, active_cursor = load_order_page('restaurant_active')
+        completed_orders, history_cursor = load_order_page('restaurant_history')
+        menu_items = MenuItem.query.filter_by(restaurant_id=restaurant.id).all()
+        yield lambda: render_template(
+            'restaurant_dashboard.html', restaurant=restaurant, current_orders=current_orders,
+            active_cursor=active_cursor, completed_orders=completed_orders, history_cursor=history_cursor,
+            menu_items=menu_items
+        )
+
+
+def block_size(timer):
+    """
+    Calls that take about BLOCK_SECONDS
+    """
+    number, seconds = timer.autorange()  # At least 0.2s
+    return max(1, round(number * BLOCK_SECONDS / seconds))
+
+
+def measure(func, rounds):
+    """
+    (per-call seconds, per-call time in calibration loops) from `rounds` alternating blocks
+    of `func` and the calibration loop, keeping the fastest block of each
+    """
+    timer, calibration_timer = timeit.Timer(func), timeit.Timer(calibration)
+    number, calibration_number = block_size(timer), block_size(calibration_timer)
+    seconds = unit = float('inf')
+    for _ in range(rounds):
+        unit = min(unit, calibration_timer.timeit(calibration_number) / calibration_number)
+        seconds = min(seconds, timer.timeit(number) / number)
+    return seconds, seconds / unit
+
+
+def machine():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'processor': platform.machine()}
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE):
+        return None
+    with open(BASELINE) as f:
+        return json.load(f)
+
+
+def save_baseline(results):
+    baseline = load_baseline() or {'results': {}}
+    baseline['machine'] = machine()
+    baseline['results'].update({
+        name: {'seconds': round(seconds, 10), 'calibrated': round(calibrated, 6)}
+        for name, (seconds, calibrated) in results.items()
+    })
+    os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+    with open(BASELINE, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def change(calibrated, before):
+    """
+    Relative slowdown against the baseline entry `before`, in calibration loops
+    """
+    return calibrated / before['calibrated'] - 1
+
+
+def report(results, baseline, thresholds):
+    """
+    Print each benchmark against its baseline; returns the names that regressed
+    """
+    previous = baseline['results'] if baseline else {}
+    regressed = []
+    print(f"{'benchmark':<30}{'baseline':>12}{'current':>12}{'change':>9}{'allowed':>9}")
+    for name, (seconds, calibrated) in results.items():
+        before = previous.get(name)
+        if before is None:
+            print(f"{name:<30}{'-':>12}{seconds * 1e6:>10.2f}us{'':>18}  new")
+            continue
+        slowdown = change(calibrated, before)
+        status = ''
+        if slowdown > thresholds[name]:
+            status = 'REGRESSED'
+            regressed.append(name)
+        elif slowdown < -thresholds[name]:
+            status = 'faster'
+        print(f"{name:<30}{before['seconds'] * 1e6:>10.2f}us{seconds * 1e6:>10.2f}us{slowdown:>+9.0%}"
+              f"{thresholds[name]:>+9.0%}  {status}")
+    if baseline and baseline.get('machine') != machine():
+        print(f"Note: baseline was recorded on {baseline.get('machine')}, this is {machine()}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-k', dest='pattern', help='only run benchmarks whose name contains this')
+    parser.add_argument('--save', action='store_true', help='write the results to the baseline file')
+    parser.add_argument('--threshold', type=float,
+                        help='allowed slowdown before failing, for every benchmark (default: per benchmark)')
+    parser.add_argument('--repeat', type=int, default=25, help='rounds of benchmark and calibration blocks')
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if not args.pattern or args.pattern in name]
+    if not names:
+        raise SystemExit(f"No benchmark matches {args.pattern!r}")
+
+    thresholds = {name: THRESHOLDS[name] if args.threshold is None else args.threshold for name in names}
+    fixture = Fixture()
+    baseline = load_baseline()
+    previous = baseline['results'] if baseline else {}
+    results = {}
+    for name in names:
+        with BENCHMARKS[name](fixture) as func:
+            results[name] = measure(func, args.repeat)
+            if name in previous and change(results[name][1], previous[name]) > thresholds[name]:
+                # Confirm before failing; a burst of load on the machine can slow a single run
+                results[name] = min(results[name], measure(func, args.repeat), key=lambda result: result[1])
+
+    regressed = report(results, baseline, thresholds)
+    if args.save:
+        save_baseline(results)
+        print(f"Saved baseline to {os.path.relpath(BASELINE)}")
+    elif regressed:
+        raise SystemExit(f"{len(regressed)} benchmark(s) regressed by more than their threshold: "
+                         + ', '.join(regressed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+"""
+Query-count regression check: the SQL statements each route runs, pinned
+per endpoint.
+
+    python benchmarks/query_counts.py              # fail if any request runs more statements than its budget
+    python benchmarks/query_counts.py --update     # write the observed counts as the new budgets
+    python benchmarks/query_counts.py --scale 10   # same budgets on a 10x larger dataset
+
+Drives the routes in routes.py with the test client as an anonymous visitor,
+a customer, a customer who has not completed their profile, a restaurant
+owner and a delivery partner, over a synthetic SQLite database, following
+one order from cart to delivery and a second one through a stubbed Stripe
+checkout. The count for each request comes from query_stats. When a request
+runs more statements than its budget in
+benchmarks/baselines/query_counts.json, the statement shapes it ran are
+printed, most repeated first. Running with --scale and the same budgets
+checks that a page's query count does not grow with the data (no N+1).
+
+Every endpoint in app.url_map needs a step in SCENARIO or an entry in
+UNCOVERED saying why it has none; a new route without either fails the
+check. Streamed responses (the order export) run their queries after the
+response is returned and are not covered.
+"""
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+from datetime import date
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp(prefix='query-counts-')}/bench.db")
+os.environ.setdefault('BLOB_FOLDER', tempfile.mkdtemp(prefix='query-counts-blobs-'))
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+from flask import request, request_finished  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from migrations import upgrade  # noqa: E402
+from models import User, Restaurant, MenuItem, Order  # noqa: E402
+from query_stats import current_stats  # noqa: E402
+from synthetic import PASSWORD, generate  # noqa: E402
+import routes  # noqa: E402
+
+app = create_app()
+BUDGETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'query_counts.json')
+DATASET = dict(restaurants=20, menu_items=400, customers=200, partners=10, orders=3000, days=30, seed=11,
+               until=date(2026, 1, 31))
+
+# (role, method, path, request kwargs, expected status); {placeholders} are filled from the fixture
+SCENARIO = [
+    (None, 'GET', '/', {}, 200),
+    (None, 'GET', '/login', {}, 200),
+    (None, 'GET', '/register', {}, 200),
+    (None, 'GET', '/api/search_restaurants?query=biryani', {}, 200),
+    (None, 'GET', '/api/order/{order_id}/location', {}, 200),
+    (None, 'GET', '/api/order/{order_id}/delivery_location', {}, 200),
+    (None, 'GET', '/metrics', {}, 200),
+
+    ('newcomer', 'GET', '/complete-profile', {}, 200),
+    ('newcomer', 'POST', '/complete-profile', {'data': {'phone': '9876500000', 'address': 'Query Street'}}, 302),
+
+    ('customer', 'GET', '/dashboard', {}, 200),
+    ('customer', 'GET', '/edit_profile', {}, 200),
+    ('customer', 'GET', '/change_password', {}, 302),
+    ('customer', 'GET', '/api/order/list/customer_active', {}, 200),
+    ('customer', 'GET', '/api/order/list/customer_history', {}, 200),
+    ('customer', 'GET', '/order/{order_id}', {}, 200),
+    ('customer', 'GET', '/tracking/{order_id}', {}, 200),
+    ('customer', 'GET', '/restaurant/{restaurant_id}', {}, 200),
+    ('customer', 'POST', '/add-to-cart', {'data': {'menu_item_id': '{menu_item_id}', 'quantity': 2},
+                                          'headers': {'Referer': '/'}}, 302),
+    ('customer', 'POST', '/add-to-cart', {'data': {'menu_item_id': '{other_menu_item_id}', 'quantity': 1},
+                                          'headers': {'Referer': '/'}}, 302),
+    ('customer', 'GET', '/cart', {}, 200),
+    ('customer', 'POST', '/update-cart-item', {'json': {'index': 0, 'quantity': 3}}, 200),
+    ('customer', 'GET', '/checkout', {}, 200),
+    ('customer', 'GET', '/payment-checkout', {}, 200),
+    ('customer', 'POST', '/checkout', {'data': {'payment_method': 'cash', 'delivery_address': 'Query Street'}}, 302),
+    ('customer', 'GET', '/order/{new_order_id}', {}, 200),
+    ('customer', 'POST', '/add-to-cart', {'data': {'menu_item_id': '{menu_item_id}', 'quantity': 1},
+                                          'headers': {'Referer': '/'}}, 302),
+    ('customer', 'POST', '/create-checkout-session', {}, 303),
+    ('customer', 'GET', '/stripe-success', {}, 302),
+    ('customer', 'POST', '/add-to-cart', {'data': {'menu_item_id': '{menu_item_id}', 'quantity': 1},
+                                          'headers': {'Referer': '/'}}, 302),
+    ('customer', 'GET', '/stripe-cancel', {}, 302),
+    ('customer', 'GET', '/clear-cart', {}, 302),
+
+    ('owner', 'GET', '/restaurant/dashboard', {}, 200),
+    ('owner', 'GET', '/api/order/list/restaurant_active', {}, 200),
+    ('owner', 'GET', '/api/order/list/restaurant_history', {}, 200),
+    ('owner', 'GET', '/api/restaurant/analytics?days=30', {}, 200),
+    ('owner', 'GET', '/restaurant/bot', {}, 200),
+    ('owner', 'POST', '/api/restaurant-bot/{restaurant_id}/update', {'json': {'bot_enabled': True}}, 200),
+    ('owner', 'POST', '/api/toggle_menu_item', {'json': {'item_id': '{other_menu_item_id}'}}, 200),
+    ('owner', 'POST', '/api/toggle_restaurant_status', {}, 200),
+    ('owner', 'POST', '/api/restaurant/update', {'json': {'description': 'Updated by the query check'}}, 200),
+    ('owner', 'POST', '/api/restaurant/update_details', {'data': {'phone': '9876511111', 'rating': '4.5'}}, 200),
+    ('owner', 'POST', '/api/restaurant/update_location', {'json': {'location': 'https://maps.app.goo.gl/query'}}, 200),
+    ('owner', 'POST', '/api/restaurant/upload_image', {'data': {'image': '{image}'}}, 200),
+    ('owner', 'POST', '/api/restaurant/add_menu_item', {'json': {'name': 'Query Dosa', 'price': '75'}}, 200),
+    ('owner', 'POST', '/api/order/update_status', {'json': {'order_id': '{new_order_id}', 'status': 'preparing'}}, 200),
+    ('owner', 'POST', '/api/order/food_prepared', {'json': {'order_id': '{new_order_id}'}}, 200),
+
+    ('partner', 'GET', '/delivery/dashboard', {}, 200),
+    ('partner', 'GET', '/delivery/enhanced-dashboard', {}, 200),
+    ('partner', 'GET', '/api/order/list/delivery_available', {}, 200),
+    ('partner', 'GET', '/api/order/list/delivery_history', {}, 200),
+    ('partner', 'GET', '/api/order/list/enhanced_available', {}, 200),
+    ('partner', 'GET', '/api/order/list/enhanced_history', {}, 200),
+    ('partner', 'GET', '/api/delivery/available_orders', {}, 200),
+    ('partner', 'POST', '/api/delivery/update_status', {'json': {'is_online': True}}, 200),
+    ('partner', 'POST', '/api/delivery/accept_order', {'json': {'order_id': '{new_order_id}'}}, 200),
+    ('partner', 'POST', '/api/delivery/update_location',
+     {'json': {'order_id': '{new_order_id}', 'latitude': 13.08, 'longitude': 80.27}}, 200),
+    ('partner', 'POST', '/api/order/update_status', {'json': {'order_id': '{new_order_id}', 'status': 'delivering'}}, 200),
+    ('partner', 'GET', '/tracking/{new_order_id}', {}, 200),
+    ('partner', 'POST', '/api/order/update_status', {'json': {'order_id': '{new_order_id}', 'status': 'completed'}}, 200),
+    ('partner', 'GET', '/logout', {}, 302),
+]
+
+# Endpoints with no step in SCENARIO, and why
+UNCOVERED = {
+    'static': 'files from static/, no database',
+    'asset': 'built static bundles, no database',
+    'media': 'blob files from disk, no database',
+    'export_restaurant_orders': 'streamed; its queries run after the response is returned',
+    'init_db': 'seeds the demo accounts; not part of the app',
+    'profiler_index': 'operator only, off unless PROFILER_TOKEN is set',
+    'profiler_start': 'operator only, off unless PROFILER_TOKEN is set',
+    'profiler_stop': 'operator only, off unless PROFILER_TOKEN is set',
+    'profiler_collapsed': 'operator only, off unless PROFILER_TOKEN is set',
+    'profiler_pstats': 'operator only, off unless PROFILER_TOKEN is set',
+}
+
+_NEW_ORDER = re.compile(r'/order/(\d+)')
+_PLACEHOLDER = re.compile(r'^\{(\w+)\}$')
+
+
+def fill(value, context):
+    """
+    Substitute {placeholders} in a path or (nested) request arguments;
+    callables in `context` are called for a fresh value, such as a file to upload
+    """
+    if isinstance(value, str):
+        whole = _PLACEHOLDER.match(value)
+        if not whole:
+            return value.format(**context)
+        value = context[whole.group(1)]
+        return value() if callable(value) else value
+    if isinstance(value, dict):
+        return {key: fill(item, context) for key, item in value.items()}
+    return value
+
+
+def png_upload():
+    image = io.BytesIO()
+    Image.new('RGB', (64, 48), (200, 80, 40)).save(image, 'PNG')
+    image.seek(0)
+    return image, 'query.png'
+
+
+def stub_stripe():
+    """
+    Stands in for routes.stripe_client(): the checkout session goes straight to its success URL
+    """
+    session = SimpleNamespace(create=lambda **kwargs: SimpleNamespace(url=kwargs['success_url']))
+    return SimpleNamespace(checkout=SimpleNamespace(Session=session))
+
+
+def seed(scale):
+    """
+    Generate the dataset and pick the users and rows the scenario works with
+    """
+    with app.app_context():
+        upgrade()
+        generate(**{key: value * scale if isinstance(value, int) and key not in ('seed', 'days') else value
+                    for key, value in DATASET.items()})
+
+        def first(role):
+            return db.session.scalars(db.select(User).filter_by(role=role).order_by(User.id).limit(1)).one()
+
+        customer, owner, partner = first('customer'), first('restaurant'), first('delivery')
+        newcomer = User(username='Query Newcomer', email='newcomer@query.test', role='customer')
+        newcomer.set_password(PASSWORD)
+        db.session.add(newcomer)
+        db.session.commit()
+        restaurant = Restaurant.query.filter_by(owner_id=owner.id).first()
+        menu_item_ids = db.session.scalars(
+            db.select(MenuItem.id).filter_by(restaurant_id=restaurant.id, is_available=True).order_by(MenuItem.id).limit(2)
+        ).all()
+        order_id = db.session.scalar(
+            db.select(Order.id).filter_by(customer_id=customer.id).order_by(Order.id.desc()).limit(1)
+        )
+        users = {'customer': customer.email, 'newcomer': newcomer.email, 'owner': owner.email, 'partner': partner.email}
+        return users, {
+            'restaurant_id': restaurant.id,
+            'menu_item_id': menu_item_ids[0],
+            'other_menu_item_id': menu_item_ids[1],
+            'order_id': order_id,
+            'image': png_upload,
+        }
+
+
+def run_scenario(users, context):
+    """
+    Returns [(label, status, expected status, QueryStats)] in scenario order, and the endpoints the steps reached
+    """
+    clients = {None: app.test_client()}
+    for role, email in users.items():
+        clients[role] = app.test_client()
+        clients[role].post('/login', data={'email': email, 'password': PASSWORD})
+    routes.stripe_client = stub_stripe
+
+    captured, endpoints = [], set()
+
+    def finished(sender, response, **extra):
+        captured.append(current_stats())
+        endpoints.add(request.endpoint)
+
+    request_finished.connect(finished, app, weak=False)
+
+    results, seen = [], {}
+    for role, method, path, kwargs, expected in SCENARIO:
+        captured.clear()
+        response = clients[role].open(fill(path, context), method=method, **fill(kwargs, context))
+        label = f"{role or 'anonymous'} {method} {path}"
+        seen[label] = seen.get(label, 0) + 1
+        if seen[label] > 1:
+            label += f" #{seen[label]}"  # Repeated steps get their own budget
+        results.append((label, response.status_code, expected, captured[-1] if captured else None))
+        if method == 'POST' and path == '/checkout':
+            match = _NEW_ORDER.search(response.headers.get('Location', ''))
+            context['new_order_id'] = int(match.group(1)) if match else 0
+    return results, endpoints
+
+
+def check_coverage(endpoints):
+    """
+    Print the endpoints with neither a scenario step nor an UNCOVERED entry, and stale UNCOVERED entries;
+    returns them
+    """
+    registered = {rule.endpoint for rule in app.url_map.iter_rules()}
+    missing = sorted(registered - endpoints - set(UNCOVERED))
+    stale = sorted(set(UNCOVERED) - registered)
+    for endpoint in missing:
+        print(f"FAIL: no scenario step for endpoint {endpoint}; add one or list it in UNCOVERED")
+    for endpoint in stale:
+        print(f"FAIL: UNCOVERED lists {endpoint}, which is not a registered endpoint")
+    return missing + stale
+
+
+def load_budgets():
+    if not os.path.exists(BUDGETS):
+        return {}
+    with open(BUDGETS) as f:
+        return json.load(f)
+
+
+def save_budgets(results):
+    budgets = {label: stats.count if stats else 0 for label, _, _, stats in results}
+    os.makedirs(os.path.dirname(BUDGETS), exist_ok=True)
+    with open(BUDGETS, 'w') as f:
+        json.dump(budgets, f, indent=2)
+        f.write('\n')
+
+
+def check(results, budgets, verbose):
+    """
+    Print a line per request and the statements of those over budget; returns the failures
+    """
+    failures = []
+    for label, status, expected, stats in results:
+        count = stats.count if stats else 0
+        budget = budgets.get(label)
+        if status != expected:
+            outcome = f"FAIL: status {status}, expected {expected}"
+        elif budget is None:
+            outcome = "FAIL: no budget (run with --update)"
+        elif count > budget:
+            outcome = f"FAIL: over budget of {budget}"
+        elif count < budget:
+            outcome = f"ok, under budget of {budget} (tighten with --update)"
+        else:
+            outcome = 'ok'
+        print(f"{count:>4}  {label:<62} {outcome}")
+
+        if outcome.startswith('FAIL'):
+            failures.append(label)
+        if stats and (verbose or (budget is not None and count > budget)):
+            for shape, times in stats.shapes.most_common(15):
+                print(f"        {times:>3}x {shape[:200]}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--update', action='store_true', help='record the observed counts as the budgets')
+    parser.add_argument('--scale', type=int, default=1, help='multiply the dataset size')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print the statements of every request')
+    args = parser.parse_args()
+
+    users, context = seed(args.scale)
+    results, endpoints = run_scenario(users, context)
+    if args.update:
+        save_budgets(results)
+        check(results, load_budgets(), args.verbose)
+        check_coverage(endpoints)
+        print(f"Saved budgets to {os.path.relpath(BUDGETS)}")
+        return
+
+    failures = check(results, load_budgets(), args.verbose) + check_coverage(endpoints)
+    if failures:
+        raise SystemExit(f"{len(failures)} request(s) failed the query budget check")
+    print(f"All {len(results)} requests within their query budgets.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Benchmark dashboard order lists: ORM entities against read models.
+
+    python benchmarks/read_model_benchmark.py [--orders 20000] [--limit 50] [--repeat 20]
+
+Seeds a throwaway SQLite database with synthetic orders, then loads the same
+lists through the previous path (Order.query + lazy restaurant/customer/items
+relationships) and through read_models (one column-projected select into
+slotted dataclasses). Reports median time, SQL statements and peak traced
+memory for a dashboard page and for the unpaginated "available orders" list,
+and checks that both paths render the same fields.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp(prefix='read-model-bench-')}/bench.db")
+
+from sqlalchemy import event  # noqa: E402
+
+from app import app, db  # noqa: E402
+from migrations import upgrade  # noqa: E402
+from models import User, Restaurant, MenuItem, Order, OrderItem, items_display, order_summary_values  # noqa: E402
+from read_models import order_summaries, order_summary_page  # noqa: E402
+
+STATUSES = ['completed'] * 6 + ['cancelled', 'pending', 'preparing', 'ready']
+
+
+def seed(count):
+    rng = random.Random(42)
+    customers = [User(username=f"customer{i}", email=f"customer{i}@example.com", password_hash='x',
+                      role='customer', phone=f"90{i:08d}") for i in range(50)]
+    owners = [User(username=f"owner{i}", email=f"owner{i}@example.com", password_hash='x', role='restaurant')
+              for i in range(20)]
+    db.session.add_all(customers + owners)
+    db.session.flush()
+    restaurants = [Restaurant(owner_id=owner.id, name=f"Restaurant {i}", address=f"{i} Food Street",
+                              phone=f"98{i:08d}")
+                   for i, owner in enumerate(owners)]
+    db.session.add_all(restaurants)
+    db.session.flush()
+    menu = {r.id: [MenuItem(restaurant_id=r.id, name=f"Dish {r.id}-{j}", price=(50 + j * 10) * 100) for j in range(10)]
+            for r in restaurants}
+    db.session.add_all([item for items in menu.values() for item in items])
+    db.session.flush()
+
+    started = datetime.utcnow() - timedelta(days=90)
+    orders, lines = [], []
+    for i in range(count):
+        restaurant = rng.choice(restaurants)
+        customer = rng.choice(customers)
+        created = started + timedelta(minutes=i * 5)
+        picked = [(rng.randint(1, 3), item) for item in rng.sample(menu[restaurant.id], rng.randint(1, 4))]
+        orders.append({
+            'id': i + 1,
+            'customer_id': customer.id,
+            'restaurant_id': restaurant.id,
+            'status': rng.choice(STATUSES),
+            'total_amount': 0,
+            'delivery_address': f"Room {i}, Hostel Block",
+            'payment_method': 'cash',
+            'created_at': created,
+            'updated_at': created,
+            'customer_display_name': customer.username,
+            **order_summary_values((quantity, item.name) for quantity, item in picked),
+        })
+        for quantity, item in picked:
+            lines.append({'order_id': i + 1, 'menu_item_id': item.id, 'quantity': quantity, 'price': item.price})
+    db.session.execute(Order.__table__.insert(), orders)
+    db.session.execute(OrderItem.__table__.insert(), lines)
+    db.session.commit()
+    return customers[0]
+
+
+def lazy_items_display(order):
+    # Order.order_items_display before the summary was denormalized
+    return items_display([(item.quantity, item.menu_item.name) for item in order.items])
+
+
+def orm_page(customer_id, limit):
+    """
+    The dashboard as it was: ORM entities, with relationships loaded lazily by the template
+    """
+    orders = Order.query.filter(Order.customer_id == customer_id).order_by(
+        Order.created_at.desc(), Order.id.desc()
+    ).limit(limit).all()
+    return [render(order.id, order.restaurant.name, order.customer.username, lazy_items_display(order))
+            for order in orders]
+
+
+def read_model_page(customer_id, limit):
+    orders, _ = order_summary_page([Order.customer_id == customer_id], limit=limit)
+    return [render(order.id, order.restaurant_name, order.customer_name, order.order_items_display)
+            for order in orders]
+
+
+def orm_available():
+    orders = Order.query.filter_by(status='ready', delivery_partner_id=None).order_by(
+        Order.created_at.desc(), Order.id.desc()
+    ).all()
+    return [render(order.id, order.restaurant.name, order.restaurant.address, lazy_items_display(order))
+            for order in orders]
+
+
+def read_model_available():
+    orders = order_summaries([Order.status == 'ready', Order.delivery_partner_id.is_(None)])
+    return [render(order.id, order.restaurant_name, order.restaurant_address, order.order_items_display)
+            for order in orders]
+
+
+def render(*fields):
+    return fields
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def measure(f, repeat):
+    """
+    Median seconds, statements per call and peak traced KiB for f()
+    """
+    counter = StatementCounter()
+    event.listen(db.engine, 'before_cursor_execute', counter)
+    try:
+        db.session.expunge_all()
+        f()
+        statements = counter.count
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', counter)
+
+    samples = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        f()
+        samples.append(time.perf_counter() - started)
+
+    db.session.expunge_all()
+    tracemalloc.start()
+    f()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(samples), statements, peak / 1024
+
+
+def report(label, old_f, new_f, repeat):
+    assert old_f() == new_f(), f"{label}: read model output differs"
+    old_time, old_statements, old_peak = measure(old_f, repeat)
+    new_time, new_statements, new_peak = measure(new_f, repeat)
+    print(f"{label}:")
+    print(f"  ORM entities:  {old_time * 1000:8.2f} ms  {old_statements:5d} statements  {old_peak:9.0f} KiB peak")
+    print(f"  read models:   {new_time * 1000:8.2f} ms  {new_statements:5d} statements  {new_peak:9.0f} KiB peak"
+          f"  ({old_time / new_time:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with app.app_context():
+        upgrade()
+        customer = seed(args.orders)
+        print(f"{args.orders} orders, median of {args.repeat}")
+        report(f"customer dashboard page ({args.limit} orders)",
+               lambda: orm_page(customer.id, args.limit),
+               lambda: read_model_page(customer.id, args.limit), args.repeat)
+        ready = Order.query.filter_by(status='ready').count()
+        report(f"available orders ({ready} orders, unpaginated)", orm_available, read_model_available, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Cold-start time of a worker, phase by phase.
+
+    python benchmarks/startup_benchmark.py [--runs 10] [--imports 15] [--json startup.json]
+
+Each run starts a fresh interpreter against a throwaway SQLite database that
+is already migrated, as a gunicorn worker finds it, and times:
+
+- import_app: importing app (config, database and login setup);
+- create_app: registering routes, request hooks and CLI commands;
+- first_request: the first GET /login, which loads and compiles templates;
+- migrate: migrations.upgrade() on the up-to-date schema. Workers do not
+  run it; it runs once per deploy through `flask --app main migrate`.
+
+Medians and minimums over --runs are reported, with the whole process
+(interpreter start and exit included). With --imports N, the N modules with
+the largest self time under `python -X importtime` are listed as well.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ['import_app', 'create_app', 'first_request', 'migrate']
+
+CHILD = '''
+import json, sys, time
+timings = {}
+mark = time.perf_counter()
+import app as app_module
+timings['import_app'] = time.perf_counter() - mark
+mark = time.perf_counter()
+app = app_module.create_app()
+timings['create_app'] = time.perf_counter() - mark
+mark = time.perf_counter()
+response = app.test_client().get('/login')
+timings['first_request'] = time.perf_counter() - mark
+assert response.status_code == 200, response.status_code
+mark = time.perf_counter()
+from migrations import upgrade
+with app.app_context():
+    upgrade()
+timings['migrate'] = time.perf_counter() - mark
+sys.stdout.write(json.dumps(timings))
+'''
+
+
+def child_env(database_url):
+    return dict(os.environ, DATABASE_URL=database_url, LOG_LEVEL='WARNING')
+
+
+def run_child(env, *flags):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, *flags, '-c', CHILD], cwd=PROJECT_ROOT, env=env,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode:
+        raise SystemExit(f"Startup run failed:\n{result.stderr[-2000:]}")
+    timings = json.loads(result.stdout)
+    timings['process'] = elapsed
+    return timings, result.stderr
+
+
+def slowest_imports(stderr, count):
+    """
+    (self microseconds, cumulative microseconds, module) for the largest self times in -X importtime output
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((int(self_us), int(cumulative_us), module.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--imports', type=int, default=0, help='list the N slowest imports')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    database_url = f"sqlite:///{tempfile.mkdtemp(prefix='startup-bench-')}/bench.db"
+    env = child_env(database_url)
+    run_child(env)  # Creates the schema and warms the bytecode cache
+
+    runs = [run_child(env)[0] for _ in range(args.runs)]
+    summary = {}
+    print(f"{'phase':<16}{'median':>10}{'min':>10}")
+    for phase in PHASES + ['process']:
+        values = [timings[phase] for timings in runs]
+        summary[phase] = {'median': statistics.median(values), 'min': min(values)}
+        print(f"{phase:<16}{summary[phase]['median'] * 1000:>8.1f}ms{summary[phase]['min'] * 1000:>8.1f}ms")
+    boot = [timings['import_app'] + timings['create_app'] for timings in runs]
+    summary['worker_boot'] = {'median': statistics.median(boot), 'min': min(boot)}
+    print(f"\nWorker boot (import_app + create_app): {summary['worker_boot']['median'] * 1000:.1f}ms median")
+
+    if args.imports:
+        _, stderr = run_child(env, '-X', 'importtime')
+        summary['slowest_imports'] = slowest_imports(stderr, args.imports)
+        print(f"\n{'self':>10}{'cumulative':>12}  module")
+        for self_us, cumulative_us, module in summary['slowest_imports']:
+            print(f"{self_us / 1000:>8.1f}ms{cumulative_us / 1000:>10.1f}ms  {module}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
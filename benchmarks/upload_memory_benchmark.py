@@ -0,0 +1,138 @@
+"""
+Measure peak Python memory while an image upload is received.
+
+    python benchmarks/upload_memory_benchmark.py [--sizes 1,8,32] [--limit-kib 1024]
+
+For each size a multipart body is generated lazily (never held in memory),
+parsed through the app's UploadRequest and moved into the blob store, the
+same path /api/restaurant/upload_image takes. tracemalloc reports the peak
+allocation during the upload; the script exits non-zero if any upload
+peaks above --limit-kib, or if an over-cap upload is not rejected with 413
+before its body is read.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('BLOB_FOLDER', tempfile.mkdtemp(prefix='upload-bench-'))
+
+from flask import request  # noqa: E402
+from werkzeug.exceptions import RequestEntityTooLarge  # noqa: E402
+from werkzeug.test import EnvironBuilder  # noqa: E402
+
+from app import app  # noqa: E402
+from blobstore import put_file  # noqa: E402
+from uploads import sniff_image_type  # noqa: E402
+
+BOUNDARY = 'benchmarkboundary'
+JPEG_HEADER = b'\xff\xd8\xff\xe0' + b'\x00' * 12
+
+
+class MultipartBody:
+    """
+    File-like multipart body holding one `size`-byte file part, produced on demand
+    """
+
+    def __init__(self, size):
+        self.parts = [
+            (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="image"; filename="photo.jpg"\r\n'
+             'Content-Type: image/jpeg\r\n\r\n').encode() + JPEG_HEADER,
+            size - len(JPEG_HEADER),
+            f'\r\n--{BOUNDARY}--\r\n'.encode(),
+        ]
+        self.length = len(self.parts[0]) + self.parts[1] + len(self.parts[2])
+        self.consumed = 0
+
+    def read(self, n=-1):
+        out = b''
+        while self.parts and (n < 0 or len(out) < n):
+            part = self.parts[0]
+            want = (n - len(out)) if n >= 0 else 1 << 20
+            if isinstance(part, int):
+                take = min(part, want)
+                out += os.urandom(take)
+                part -= take
+                if part:
+                    self.parts[0] = part
+                else:
+                    self.parts.pop(0)
+            else:
+                out += part[:want]
+                if len(part) > want:
+                    self.parts[0] = part[want:]
+                else:
+                    self.parts.pop(0)
+        self.consumed += len(out)
+        return out
+
+
+def environ_for(body, chunked=False):
+    environ = EnvironBuilder(method='POST', path='/api/restaurant/upload_image').get_environ()
+    environ['CONTENT_TYPE'] = f'multipart/form-data; boundary={BOUNDARY}'
+    environ['wsgi.input'] = body
+    if chunked:
+        # No Content-Length: the server has de-chunked and terminated the stream
+        environ.pop('CONTENT_LENGTH', None)
+        environ['wsgi.input_terminated'] = True
+    else:
+        environ['CONTENT_LENGTH'] = str(body.length)
+    return environ
+
+
+def receive(body, chunked=False):
+    """
+    Parse one upload and move it into the blob store. Returns (key, peak bytes).
+    """
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    with app.request_context(environ_for(body, chunked)):
+        file = request.files['image']
+        ext = sniff_image_type(file.stream.head)
+        key = put_file(file.stream.detach(), file.stream.hexdigest(), ext)
+    return key, tracemalloc.get_traced_memory()[1] - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1,8,32', help='Upload sizes in MiB, comma separated')
+    parser.add_argument('--limit-kib', type=int, default=1024, help='Fail if an upload peaks above this')
+    args = parser.parse_args()
+
+    sizes = [int(size) * 1024 * 1024 for size in args.sizes.split(',')]
+    app.config['MAX_UPLOAD_BYTES'] = max(sizes)
+    app.config['MAX_CONTENT_LENGTH'] = max(sizes) + 64 * 1024
+
+    failed = False
+    tracemalloc.start()
+    print(f"{'upload':>18} {'peak memory':>14}")
+    for size in sizes:
+        for chunked in (False, True):
+            _, peak = receive(MultipartBody(size), chunked=chunked)
+            label = f"{size // (1024 * 1024)} MiB" + (' chunked' if chunked else '')
+            print(f"{label:>18} {peak / 1024:10.1f} KiB")
+            failed |= peak > args.limit_kib * 1024
+
+    # Over the cap: Content-Length is refused before reading, chunked bodies stop at the cap
+    app.config['MAX_UPLOAD_BYTES'] = 1024 * 1024
+    app.config['MAX_CONTENT_LENGTH'] = 1024 * 1024 + 64 * 1024
+    for chunked in (False, True):
+        body = MultipartBody(8 * 1024 * 1024)
+        try:
+            receive(body, chunked=chunked)
+            rejected = False
+        except RequestEntityTooLarge:
+            rejected = True
+        print(f"over cap{' chunked' if chunked else ''}: {'413' if rejected else 'ACCEPTED'} "
+              f"after reading {body.consumed / 1024:.0f} KiB of {body.length / 1024:.0f} KiB")
+        failed |= not rejected
+    tracemalloc.stop()
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
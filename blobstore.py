@@ -0,0 +1,197 @@
+"""
+Content-addressed blob store for uploaded media.
+
+Files are named by the SHA-256 of their bytes and sharded two levels deep
+(`ab/cd/abcd....webp`), so uploading the same bytes twice stores them once
+and a URL never changes meaning. Owners (restaurants, menu items) point at
+blobs through BlobRef rows; blobs nobody references are removed by
+collect_garbage() (`flask gc-blobs`).
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+
+from sqlalchemy import delete, select
+
+from app import app, db
+from models import BlobRef
+
+logger = logging.getLogger(__name__)
+
+BLOB_FOLDER = os.environ.get('BLOB_FOLDER', os.path.join(app.instance_path, 'blobs'))
+BLOB_URL_PREFIX = '/media'
+BLOB_MAX_AGE = 365 * 24 * 3600  # Content never changes under a key, so cache for a year
+CHUNK_SIZE = 64 * 1024
+
+# Unreferenced blobs younger than this are left alone: an upload writes its
+# blob before the transaction that references it commits.
+GC_GRACE_SECONDS = 3600
+
+# ab/cd/abcd<60 more hex digits>.ext, as written by blob_key()
+_BLOB_KEY = re.compile(r'([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.[a-z0-9]{1,10}')
+
+
+def blob_path(key):
+    return os.path.join(BLOB_FOLDER, *key.split('/'))
+
+
+def blob_url(key):
+    return f"{BLOB_URL_PREFIX}/{key}"
+
+
+def key_from_url(url):
+    """
+    The blob key behind a /media URL, or None for any other URL
+    """
+    prefix = f"{BLOB_URL_PREFIX}/"
+    if url and url.startswith(prefix):
+        return url[len(prefix):]
+    return None
+
+
+def blob_key(hexdigest, ext):
+    return f"{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}.{ext.lower()}"
+
+
+def is_blob_key(key):
+    """
+    Whether `key` has the layout of a stored blob; anything else under BLOB_FOLDER (the tmp spool) is not public
+    """
+    return _BLOB_KEY.fullmatch(key) is not None
+
+
+def temp_folder():
+    """
+    Scratch space on the same filesystem as the store, so finished files can be renamed into place
+    """
+    folder = os.path.join(BLOB_FOLDER, 'tmp')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def put_file(tmp_path, hexdigest, ext):
+    """
+    Move an already-hashed file from temp_folder() into the store. Returns the key;
+    if the content is already stored the temporary file is discarded.
+    """
+    key = blob_key(hexdigest, ext)
+    path = blob_path(key)
+    if os.path.exists(path):
+        # Duplicate content: refresh the mtime so GC's grace period covers this upload too
+        os.utime(path)
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+    return key
+
+
+def put_stream(stream, ext):
+    """
+    Hash `stream` while copying it to a temporary file, then move it into
+    place under its content key. Returns the key; existing content is reused.
+    """
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=temp_folder())
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                tmp.write(chunk)
+        return put_file(tmp_path, digest.hexdigest(), ext)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def put_path(path, ext=None):
+    with open(path, 'rb') as f:
+        return put_stream(f, ext or path.rsplit('.', 1)[1])
+
+
+def get_refs(owner_type, owner_id):
+    """
+    {role: key} for everything an owner references
+    """
+    rows = db.session.execute(
+        select(BlobRef.role, BlobRef.blob_key).where(
+            BlobRef.owner_type == owner_type,
+            BlobRef.owner_id == owner_id
+        )
+    )
+    return dict(rows.all())
+
+
+def set_refs(owner_type, owner_id, keys_by_role):
+    """
+    Replace an owner's references with `keys_by_role`. Blobs dropped here
+    become garbage once no other owner points at them. Does not commit.
+    """
+    drop_refs(owner_type, [owner_id])
+    db.session.add_all(
+        BlobRef(blob_key=key, owner_type=owner_type, owner_id=owner_id, role=role)
+        for role, key in keys_by_role.items()
+    )
+
+
+def drop_refs(owner_type, owner_ids):
+    db.session.execute(
+        delete(BlobRef).where(BlobRef.owner_type == owner_type, BlobRef.owner_id.in_(owner_ids))
+    )
+
+
+def iter_blobs():
+    """
+    Yield (key, path) for every stored blob
+    """
+    if not os.path.isdir(BLOB_FOLDER):
+        return
+    for root, dirs, files in os.walk(BLOB_FOLDER):
+        dirs[:] = [d for d in dirs if d != 'tmp']
+        for name in files:
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, BLOB_FOLDER).replace(os.sep, '/'), path
+
+
+def collect_garbage(grace_seconds=GC_GRACE_SECONDS, dry_run=False):
+    """
+    Delete blobs (and abandoned temp files) that no BlobRef points at and that
+    are older than `grace_seconds`. Returns (files removed, bytes freed).
+    """
+    referenced = set(db.session.execute(select(BlobRef.blob_key).distinct()).scalars())
+    cutoff = time.time() - grace_seconds
+
+    candidates = [path for key, path in iter_blobs() if key not in referenced]
+    tmp_folder = os.path.join(BLOB_FOLDER, 'tmp')
+    if os.path.isdir(tmp_folder):
+        candidates += [os.path.join(tmp_folder, name) for name in os.listdir(tmp_folder)]
+
+    removed = freed = 0
+    for path in candidates:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if stat.st_mtime > cutoff:
+            continue
+        if not dry_run:
+            os.remove(path)
+            _prune_empty_dirs(os.path.dirname(path))
+        removed += 1
+        freed += stat.st_size
+
+    logger.info("Blob GC %s %d files (%d bytes)", 'would remove' if dry_run else 'removed', removed, freed)
+    return removed, freed
+
+
+def _prune_empty_dirs(folder):
+    while folder != BLOB_FOLDER and os.path.basename(folder) != 'tmp':
+        try:
+            os.rmdir(folder)
+        except OSError:
+            return
+        folder = os.path.dirname(folder)
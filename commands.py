@@ -0,0 +1,223 @@
+import click
+
+from app import app
+
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Create missing tables and apply pending schema migrations.
+
+    Run before starting the app on a new database and after each deploy;
+    the app does not touch the schema when it starts.
+    """
+    from migrations import upgrade
+
+    applied = upgrade()
+    for name in applied:
+        click.echo(f"  applied {name}")
+    click.echo(f"Schema is up to date ({len(applied)} migration(s) applied).")
+
+
+@app.cli.command('rebuild-partner-stats')
+@click.option('--chunk-size', default=5000, show_default=True, help='Orders read per batch')
+def rebuild_partner_stats_command(chunk_size):
+    """Rebuild the delivery partner rollup table from completed orders."""
+    from rollups import rebuild_partner_stats
+
+    processed = rebuild_partner_stats(
+        chunk_size=chunk_size,
+        progress=lambda count: click.echo(f"  {count} orders processed")
+    )
+    click.echo(f"Rebuilt partner stats from {processed} completed orders.")
+
+
+@app.cli.command('export-orders')
+@click.option('--restaurant-id', type=int, help='Only export orders for this restaurant')
+@click.option('--format', 'export_format', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+@click.option('--from', 'date_from', help='First day to include (YYYY-MM-DD)')
+@click.option('--to', 'date_to', help='Last day to include (YYYY-MM-DD)')
+@click.option('--status', 'statuses', multiple=True, help='Order status to include; repeatable')
+@click.option('--gzip', 'use_gzip', is_flag=True, help='Gzip the output')
+@click.option('--output', type=click.File('wb'), default='-', help='Output file (default: stdout)')
+def export_orders_command(restaurant_id, export_format, date_from, date_to, statuses, use_gzip, output):
+    """Stream orders and their items as CSV or NDJSON."""
+    from exports import parse_date_range, stream_export
+
+    try:
+        start, end = parse_date_range(date_from, date_to)
+    except ValueError:
+        raise click.BadParameter('dates must be in YYYY-MM-DD format')
+
+    for chunk in stream_export(export_format, gzip=use_gzip, restaurant_id=restaurant_id,
+                               start=start, end=end, statuses=list(statuses)):
+        output.write(chunk)
+
+
+def _echo_progress(label, count):
+    click.echo(f"  {count} {label}")
+
+
+@app.cli.command('delete-restaurant')
+@click.argument('restaurant_ids', type=int, nargs=-1)
+@click.option('--all', 'delete_all', is_flag=True, help='Delete every restaurant')
+@click.option('--batch-size', default=500, show_default=True, help='Rows deleted per transaction')
+@click.option('--sleep', 'pause', default=0.0, show_default=True, help='Seconds to pause between batches')
+@click.confirmation_option(prompt='This permanently deletes restaurants and their orders. Continue?')
+def delete_restaurant_command(restaurant_ids, delete_all, batch_size, pause):
+    """Delete restaurants with their menus and orders in small batches.
+
+    Safe to re-run: an interrupted deletion resumes where it stopped.
+    """
+    from models import Restaurant
+    from maintenance import delete_restaurant
+
+    if delete_all:
+        restaurant_ids = [restaurant.id for restaurant in Restaurant.query.order_by(Restaurant.id)]
+    if not restaurant_ids:
+        raise click.UsageError('pass restaurant ids or --all')
+
+    for restaurant_id in restaurant_ids:
+        click.echo(f"Deleting restaurant {restaurant_id}")
+        counts = delete_restaurant(restaurant_id, batch_size=batch_size, pause=pause, progress=_echo_progress)
+        click.echo(f"Deleted restaurant {restaurant_id}: "
+                   f"{counts['orders']} orders, {counts['menu_items']} menu items")
+
+
+@app.cli.command('archive-orders')
+@click.option('--older-than-days', default=90, show_default=True, help='Archive orders created before this many days ago')
+@click.option('--restaurant-id', type=int, help='Only archive orders for this restaurant')
+@click.option('--batch-size', default=500, show_default=True, help='Orders moved per transaction')
+@click.option('--sleep', 'pause', default=0.0, show_default=True, help='Seconds to pause between batches')
+def archive_orders_command(older_than_days, restaurant_id, batch_size, pause):
+    """Move old completed/cancelled orders into the archive tables."""
+    from maintenance import archive_orders
+
+    archived = archive_orders(older_than_days, batch_size=batch_size, pause=pause,
+                              restaurant_id=restaurant_id, progress=_echo_progress)
+    click.echo(f"Archived {archived} orders.")
+
+
+@app.cli.command('check-order-summaries')
+@click.option('--repair', is_flag=True, help='Rewrite drifted rows instead of only reporting them')
+@click.option('--batch-size', default=500, show_default=True, help='Orders checked per transaction')
+def check_order_summaries_command(repair, batch_size):
+    """Verify the denormalized item/customer columns on every order."""
+    from maintenance import check_order_summaries
+
+    drifted = check_order_summaries(repair=repair, batch_size=batch_size, progress=_echo_progress)
+    if not drifted:
+        click.echo("All order summaries are consistent.")
+        return
+    shown = ', '.join(str(order_id) for order_id in drifted[:20])
+    more = f" and {len(drifted) - 20} more" if len(drifted) > 20 else ''
+    click.echo(f"{len(drifted)} orders drifted: {shown}{more}. "
+               + ("Repaired." if repair else "Run with --repair to fix them."))
+
+
+@app.cli.command('generate-data')
+@click.option('--restaurants', default=100, show_default=True)
+@click.option('--menu-items', default=2000, show_default=True, help='Total across all restaurants')
+@click.option('--customers', default=2000, show_default=True)
+@click.option('--partners', default=50, show_default=True, help='Delivery partners')
+@click.option('--orders', default=20000, show_default=True)
+@click.option('--days', default=180, show_default=True, help='Days of order history')
+@click.option('--until', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day of history (default: yesterday)')
+@click.option('--seed', default=42, show_default=True)
+@click.option('--chunk-size', default=10000, show_default=True, help='Rows written per transaction')
+@click.option('--skip-rollups', is_flag=True, help='Do not rebuild the delivery partner rollup afterwards')
+def generate_data_command(restaurants, menu_items, customers, partners, orders, days, until, seed, chunk_size,
+                          skip_rollups):
+    """Bulk-load a deterministic synthetic dataset for benchmarks.
+
+    The same options (including --until) always produce the same rows.
+    Users get the password "password".
+    """
+    from synthetic import generate
+    from rollups import rebuild_partner_stats
+
+    try:
+        counts = generate(restaurants, menu_items, customers, partners, orders, days=days, seed=seed,
+                          until=until.date() if until else None, chunk_size=chunk_size, progress=_echo_progress)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    click.echo("Generated " + ', '.join(f"{count} {label}" for label, count in counts.items()) + '.')
+
+    if not skip_rollups:
+        processed = rebuild_partner_stats(progress=lambda count: _echo_progress('orders rolled up', count))
+        click.echo(f"Rebuilt partner stats from {processed} completed orders.")
+
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Bundle, minify and fingerprint static CSS/JS into static/dist."""
+    import os
+    from assets import DIST_FOLDER, build_assets
+
+    for name, filename in build_assets().items():
+        size = os.path.getsize(os.path.join(DIST_FOLDER, filename))
+        click.echo(f"  {name} -> {filename} ({size / 1024:.1f} KiB)")
+
+
+@app.cli.command('process-images')
+def process_images_command():
+    """Generate responsive variants for restaurant images that do not have them yet.
+
+    Uploads from before the blob store are imported into it first.
+    """
+    import os
+    from models import Restaurant
+    from blobstore import get_refs
+    from images import UPLOAD_FOLDER, UPLOAD_URL_PREFIX, import_legacy_image, process_restaurant_image
+
+    pending = Restaurant.query.filter(
+        Restaurant.image_variants.is_(None),
+        Restaurant.image_url.isnot(None)
+    ).all()
+    processed = 0
+    for restaurant in pending:
+        source_key = get_refs('restaurant', restaurant.id).get('source')
+        if source_key is None and restaurant.image_url.startswith(f'{UPLOAD_URL_PREFIX}/'):
+            filename = restaurant.image_url.rsplit('/', 1)[1]
+            source_path = os.path.join(UPLOAD_FOLDER, filename)
+            if not os.path.exists(source_path):
+                click.echo(f"  restaurant {restaurant.id}: {filename} missing, skipped")
+                continue
+            source_key = import_legacy_image(restaurant, source_path)
+        if source_key is None:
+            continue  # External URL
+        manifest = process_restaurant_image(restaurant.id, source_key)
+        click.echo(f"  restaurant {restaurant.id}: {'done' if manifest else 'failed'}")
+        processed += 1
+    click.echo(f"Processed {processed} restaurant images.")
+
+
+@app.cli.command('gc-blobs')
+@click.option('--grace', 'grace_seconds', default=3600, show_default=True,
+              help='Keep unreferenced blobs younger than this many seconds')
+@click.option('--legacy', is_flag=True, help='Also remove pre-blob-store uploads no restaurant points at')
+@click.option('--dry-run', is_flag=True, help='Report what would be removed without deleting')
+def gc_blobs_command(grace_seconds, legacy, dry_run):
+    """Delete uploaded media that nothing references any more."""
+    import os
+    from models import Restaurant
+    from blobstore import collect_garbage
+    from images import UPLOAD_FOLDER, UPLOAD_URL_PREFIX
+
+    removed, freed = collect_garbage(grace_seconds=grace_seconds, dry_run=dry_run)
+    verb = 'Would remove' if dry_run else 'Removed'
+    click.echo(f"{verb} {removed} unreferenced blobs ({freed / 1024:.0f} KiB).")
+
+    if legacy and os.path.isdir(UPLOAD_FOLDER):
+        in_use = set()
+        for image_url, variants in Restaurant.query.with_entities(Restaurant.image_url, Restaurant.image_variants):
+            in_use.add(image_url)
+            for entry in (variants or {}).values():
+                in_use.update(entry.get(ext) for ext in ('webp', 'jpeg'))
+        stale = [
+            name for name in os.listdir(UPLOAD_FOLDER)
+            if os.path.isfile(os.path.join(UPLOAD_FOLDER, name)) and f'{UPLOAD_URL_PREFIX}/{name}' not in in_use
+        ]
+        for name in stale:
+            if not dry_run:
+                os.remove(os.path.join(UPLOAD_FOLDER, name))
+        click.echo(f"{verb} {len(stale)} legacy uploads.")
@@ -0,0 +1,244 @@
+"""
+Response compression middleware.
+
+Wraps the WSGI app and compresses text-like responses (HTML, JSON, CSV,
+JS/CSS) with brotli or gzip, whichever the client prefers. Responses with
+a known Content-Length are compressed in one go; streamed responses
+(generators without a length) are compressed chunk by chunk and flushed
+as they go, so downloads still start immediately. Responses that are
+already encoded, small, or binary pass through untouched.
+
+CPU time spent and bytes saved are counted per encoding in `stats` (and
+summarised in the log every SUMMARY_EVERY responses), so the level/quality
+knobs can be tuned against real traffic. metrics.py observes `stats` and
+exports the same counters to Prometheus.
+"""
+import logging
+import threading
+import time
+import zlib
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # gzip only without the brotli package
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# A summary of `stats` is logged every this many compressed responses
+SUMMARY_EVERY = 1000
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/x-ndjson',
+    'application/xml',
+    'image/svg+xml',
+)
+
+
+class CompressionStats:
+    """
+    Thread-safe counters: responses, input/output bytes and CPU seconds per
+    encoding, plus skipped responses per reason
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.encodings = {}
+        self.skipped = {}
+        self._observers = []
+
+    def add_observer(self, observer):
+        """
+        Also pass every record() and skip() call to `observer`, which has methods of the same signature
+        """
+        self._observers.append(observer)
+
+    def record(self, encoding, bytes_in, bytes_out, cpu_seconds, responses=0):
+        with self._lock:
+            entry = self.encodings.setdefault(
+                encoding, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0, 'cpu_seconds': 0.0}
+            )
+            entry['responses'] += responses
+            entry['bytes_in'] += bytes_in
+            entry['bytes_out'] += bytes_out
+            entry['cpu_seconds'] += cpu_seconds
+            summarise = responses and entry['responses'] % SUMMARY_EVERY == 0
+        for observer in self._observers:
+            observer.record(encoding, bytes_in, bytes_out, cpu_seconds, responses)
+        if summarise:
+            logger.info("Compression stats: %s", self.snapshot())
+
+    def skip(self, reason):
+        with self._lock:
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
+        for observer in self._observers:
+            observer.skip(reason)
+
+    def snapshot(self):
+        """
+        Copy of the counters with derived ratio and bytes saved per CPU millisecond
+        """
+        with self._lock:
+            encodings = {name: dict(entry) for name, entry in self.encodings.items()}
+            skipped = dict(self.skipped)
+        for entry in encodings.values():
+            saved = entry['bytes_in'] - entry['bytes_out']
+            entry['ratio'] = round(entry['bytes_out'] / entry['bytes_in'], 4) if entry['bytes_in'] else None
+            entry['bytes_saved_per_cpu_ms'] = round(saved / (entry['cpu_seconds'] * 1000)) if entry['cpu_seconds'] else None
+        return {'encodings': encodings, 'skipped': skipped}
+
+
+stats = CompressionStats()
+
+
+class _Gzip:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        # Sync flush: everything so far reaches the client without ending the stream
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    WSGI middleware compressing responses of at least `min_size` bytes.
+    `gzip_level` (1-9) and `brotli_quality` (0-11) trade CPU for bytes.
+    """
+
+    def __init__(self, wsgi_app, min_size=1024, gzip_level=6, brotli_quality=4):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def choose_encoding(self, environ):
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return None
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        offers = ['br', 'gzip'] if brotli is not None else ['gzip']
+        return accepted.best_match(offers)
+
+    def new_compressor(self, encoding):
+        if encoding == 'br':
+            return _Brotli(self.brotli_quality)
+        return _Gzip(self.gzip_level)
+
+    def skip_reason(self, status, headers):
+        """
+        Why a response must not be compressed, or None
+        """
+        if int(status.split(' ', 1)[0]) in (204, 206, 304):
+            return 'status'
+        if 'Content-Encoding' in headers:
+            return 'already_encoded'
+        content_type = headers.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return 'content_type'
+        if 'no-transform' in headers.get('Cache-Control', ''):
+            return 'no_transform'
+        length = headers.get('Content-Length')
+        if length is not None and int(length) < self.min_size:
+            return 'too_small'
+        return None
+
+    def __call__(self, environ, start_response):
+        encoding = self.choose_encoding(environ)
+        if encoding is None:
+            return self.wsgi_app(environ, start_response)
+
+        state = {}
+
+        def intercept(status, response_headers, exc_info=None):
+            headers = Headers(response_headers)
+            reason = self.skip_reason(status, headers)
+            if reason:
+                stats.skip(reason)
+                state['passthrough'] = True
+                return start_response(status, response_headers, exc_info)
+            state.update(status=status, headers=headers, exc_info=exc_info)
+            return state.setdefault('buffer', []).append
+
+        body = self.wsgi_app(environ, intercept)
+        if state.get('passthrough') or 'headers' not in state:
+            return body
+        return self._compressed(body, encoding, state, start_response)
+
+    def _compressed(self, body, encoding, state, start_response):
+        headers = state['headers']
+        headers['Content-Encoding'] = encoding
+        vary = headers.get('Vary')
+        headers['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+        if headers.get('ETag'):
+            # Strong validators describe the identity body, not this encoding
+            headers['ETag'] = headers['ETag'] if headers['ETag'].startswith('W/') else 'W/' + headers['ETag']
+
+        compressor = self.new_compressor(encoding)
+        if 'Content-Length' in headers:
+            # Buffered response: compress once and send the real length
+            try:
+                data = b''.join(state.get('buffer', [])) + b''.join(body)
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+            started = time.thread_time()
+            compressed = compressor.compress(data) + compressor.finish()
+            stats.record(encoding, len(data), len(compressed), time.thread_time() - started, responses=1)
+            headers['Content-Length'] = str(len(compressed))
+            start_response(state['status'], headers.to_wsgi_list(), state['exc_info'])
+            return [compressed]
+
+        start_response(state['status'], headers.to_wsgi_list(), state['exc_info'])
+        return self._stream(body, encoding, compressor, state.get('buffer', []))
+
+    def _stream(self, body, encoding, compressor, pending):
+        """
+        Compress a streamed body chunk by chunk, flushing after each one
+        """
+        stats.record(encoding, 0, 0, 0.0, responses=1)
+        try:
+            for chunk in _chain(pending, body):
+                if not chunk:
+                    continue
+                started = time.thread_time()
+                out = compressor.compress(chunk) + compressor.flush()
+                stats.record(encoding, len(chunk), len(out), time.thread_time() - started)
+                yield out
+            started = time.thread_time()
+            out = compressor.finish()
+            stats.record(encoding, 0, len(out), time.thread_time() - started)
+            yield out
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+
+def _chain(first, second):
+    yield from first
+    yield from second
@@ -0,0 +1,154 @@
+"""
+Streaming order exports.
+
+Order + OrderItem lines are read with a server-side cursor (yield_per) and
+encoded incrementally, so memory stays flat whatever the date range.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app import db
+from models import Order, OrderItem, MenuItem
+from money import to_rupees
+
+CHUNK_SIZE = 2000  # Rows fetched per database round trip
+FLUSH_BYTES = 64 * 1024  # Encoded bytes buffered before a chunk is yielded
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+EXPORT_COLUMNS = (
+    'order_id', 'created_at', 'status', 'customer_id', 'restaurant_id', 'delivery_partner_id',
+    'total_amount', 'payment_method', 'payment_status', 'delivery_address',
+    'menu_item_id', 'item_name', 'quantity', 'price',
+)
+# Stored in paise, exported in rupees
+MONEY_COLUMNS = tuple(EXPORT_COLUMNS.index(name) for name in ('total_amount', 'price'))
+
+
+def parse_date_range(date_from=None, date_to=None):
+    """
+    Parse inclusive YYYY-MM-DD bounds into a half-open [start, end) datetime range.
+    Raises ValueError on malformed dates.
+    """
+    start = datetime.strptime(date_from, '%Y-%m-%d') if date_from else None
+    end = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1) if date_to else None
+    return start, end
+
+
+def export_rows(restaurant_id=None, start=None, end=None, statuses=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield one row per order line (EXPORT_COLUMNS order, amounts in rupees). All
+    filters run in SQL. Orders without items are exported once with empty item columns.
+    """
+    stmt = select(
+        Order.id, Order.created_at, Order.status, Order.customer_id, Order.restaurant_id,
+        Order.delivery_partner_id, Order.total_amount, Order.payment_method, Order.payment_status,
+        Order.delivery_address, OrderItem.menu_item_id, MenuItem.name, OrderItem.quantity, OrderItem.price
+    ).outerjoin(
+        OrderItem, OrderItem.order_id == Order.id
+    ).outerjoin(
+        MenuItem, MenuItem.id == OrderItem.menu_item_id
+    ).order_by(Order.created_at, Order.id, OrderItem.id)
+
+    if restaurant_id is not None:
+        stmt = stmt.where(Order.restaurant_id == restaurant_id)
+    if start is not None:
+        stmt = stmt.where(Order.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(Order.created_at < end)
+    if statuses:
+        stmt = stmt.where(Order.status.in_(statuses))
+
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        for row in partition:
+            yield _in_rupees(row)
+
+
+def _buffered(encoded_lines):
+    """
+    Group small encoded lines into ~FLUSH_BYTES chunks to keep write calls cheap
+    """
+    buffer = []
+    size = 0
+    for line in encoded_lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def iter_csv(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+
+    def take():
+        line = out.getvalue().encode()
+        out.seek(0)
+        out.truncate()
+        return line
+
+    def lines():
+        writer.writerow(EXPORT_COLUMNS)
+        yield take()
+        for row in rows:
+            writer.writerow(_plain(value) for value in row)
+            yield take()
+
+    yield from _buffered(lines())
+
+
+def iter_ndjson(rows):
+    def lines():
+        for row in rows:
+            record = dict(zip(EXPORT_COLUMNS, (_plain(value) for value in row)))
+            yield json.dumps(record, separators=(',', ':')).encode() + b'\n'
+
+    yield from _buffered(lines())
+
+
+def gzip_stream(chunks, level=6):
+    """
+    Gzip a byte stream on the fly
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(export_format, gzip=False, **filters):
+    """
+    Encoded byte chunks for an export in `export_format` ('csv' or 'ndjson')
+    """
+    rows = export_rows(**filters)
+    chunks = iter_csv(rows) if export_format == 'csv' else iter_ndjson(rows)
+    return gzip_stream(chunks) if gzip else chunks
+
+
+def _in_rupees(row):
+    row = list(row)
+    for index in MONEY_COLUMNS:
+        if row[index] is not None:
+            row[index] = to_rupees(row[index])
+    return row
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
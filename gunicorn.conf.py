@@ -0,0 +1,9 @@
+# Loaded automatically by gunicorn from the working directory
+import os
+
+
+def child_exit(server, worker):
+    # Fold an exited worker's live gauges out of the shared metrics directory
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
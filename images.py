@@ -0,0 +1,141 @@
+"""
+Restaurant image pipeline.
+
+Uploads are saved once to the blob store, then decoded a single time on a
+background worker pool and re-encoded into responsive variants (WebP and
+JPEG at several widths) with EXIF metadata stripped. The variant manifest is
+stored on the restaurant and rendered as a srcset, so pages never ship the
+raw upload.
+"""
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from app import app, db
+from blobstore import blob_path, blob_url, get_refs, put_file, put_path, put_stream, set_refs
+from uploads import UploadSpool
+
+logger = logging.getLogger(__name__)
+
+# Where uploads lived before the blob store; see import_legacy_image()
+UPLOAD_FOLDER = os.path.join(app.static_folder, 'uploads')
+UPLOAD_URL_PREFIX = '/static/uploads'
+
+# Variant name -> target width in pixels. Images are never upscaled.
+VARIANTS = {
+    'thumb': 160,
+    'card': 480,
+    'hero': 1280,
+}
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+# Pillow releases the GIL while decoding/resizing/encoding, so threads scale here
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('IMAGE_WORKERS', 2)),
+    thread_name_prefix='image-worker'
+)
+
+
+def build_variants(source_path, stem, output_folder=UPLOAD_FOLDER, url_prefix=UPLOAD_URL_PREFIX):
+    """
+    Decode `source_path` once and write every variant/format as `{stem}_{variant}.{ext}`.
+    Returns the srcset manifest: {variant: {'width', 'height', 'webp', 'jpeg'}}.
+    """
+    with Image.open(source_path) as source:
+        # Apply the EXIF orientation before the metadata is dropped
+        image = ImageOps.exif_transpose(source)
+        image = image.convert('RGB')
+
+    manifest = {}
+    for variant, width in VARIANTS.items():
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+        else:
+            resized = image
+
+        entry = {'width': resized.width, 'height': resized.height}
+        for ext, options in FORMATS.items():
+            filename = f"{stem}_{variant}.{ext}"
+            # No exif= argument, so metadata is not carried into the variants
+            resized.save(os.path.join(output_folder, filename), **options)
+            entry[ext] = f"{url_prefix}/{filename}"
+        manifest[variant] = entry
+
+    return manifest
+
+
+def process_restaurant_image(restaurant_id, source_key):
+    """
+    Worker job: build the variants into the blob store and point the restaurant at them
+    """
+    from models import Restaurant
+
+    with app.app_context():
+        try:
+            keys = {}
+            with tempfile.TemporaryDirectory() as output:
+                manifest = build_variants(blob_path(source_key), 'variant', output_folder=output, url_prefix='')
+                for variant, entry in manifest.items():
+                    for ext in FORMATS:
+                        key = put_path(os.path.join(output, entry[ext].lstrip('/')))
+                        keys[f"{variant}.{ext}"] = key
+                        entry[ext] = blob_url(key)
+        except Exception as e:
+            logger.error("Image processing failed for restaurant %s: %s", restaurant_id, e)
+            return None
+
+        restaurant = db.session.get(Restaurant, restaurant_id)
+        # A newer upload may have landed while this one was processing
+        if restaurant and restaurant.image_url == blob_url(source_key):
+            restaurant.image_url = manifest['hero']['jpeg']
+            restaurant.image_variants = manifest
+            # The source stays referenced so variants can be rebuilt later
+            set_refs('restaurant', restaurant.id, {'source': source_key, **keys})
+            db.session.commit()
+        return manifest
+
+
+def save_restaurant_upload(restaurant, file, ext):
+    """
+    Store an uploaded image for `restaurant` and queue variant generation.
+    The raw upload is served until the variants are ready. Returns the image URL.
+    """
+    if isinstance(file.stream, UploadSpool):
+        # Already on disk and hashed while it streamed in
+        source_key = put_file(file.stream.detach(), file.stream.hexdigest(), ext)
+    else:
+        source_key = put_stream(file.stream, ext)
+    if get_refs('restaurant', restaurant.id).get('source') == source_key:
+        # Same bytes as the current image: nothing to redo
+        return restaurant.image_url
+
+    restaurant.image_url = blob_url(source_key)
+    restaurant.image_variants = None
+    set_refs('restaurant', restaurant.id, {'source': source_key})
+    db.session.commit()
+
+    schedule_variants(restaurant.id, source_key)
+    return restaurant.image_url
+
+
+def import_legacy_image(restaurant, path):
+    """
+    Move a pre-blob-store upload into the store; the old file is left for `flask gc-blobs --legacy`
+    """
+    source_key = put_path(path)
+    restaurant.image_url = blob_url(source_key)
+    restaurant.image_variants = None
+    set_refs('restaurant', restaurant.id, {'source': source_key})
+    db.session.commit()
+    return source_key
+
+
+def schedule_variants(restaurant_id, source_key):
+    return _executor.submit(process_restaurant_image, restaurant_id, source_key)
@@ -0,0 +1,42 @@
+"""
+orjson-backed JSON provider for jsonify()/request.json.
+
+Output matches Flask's DefaultJSONProvider (sorted keys, HTTP-date
+datetimes, str() for Decimal/UUID), so clients see the same payloads, but
+encoding runs in orjson and the response body is built straight from bytes.
+Falls back to the stdlib provider when orjson is not installed or when
+stdlib-only arguments (indent, cls, ...) are passed.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+
+    def _options(self):
+        # Datetimes go through self.default so they keep Flask's HTTP-date format
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
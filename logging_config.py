@@ -0,0 +1,194 @@
+"""
+Process-wide logging setup.
+
+Records are handed to a QueueHandler and written by a QueueListener thread,
+so request threads never block on stream or file I/O. Output is one JSON
+object per line (LOG_FORMAT=text for a readable console while developing)
+carrying the request id, method and path of the request that logged it.
+
+Environment:
+    LOG_LEVEL       root level (default INFO)
+    LOG_LEVELS      per-logger overrides, e.g. "sqlalchemy.engine=INFO,werkzeug=WARNING"
+    LOG_FORMAT      json (default) or text
+    LOG_FILE        write here instead of stderr
+    LOG_DEBUG_RATE  DEBUG records let through per second per call site (default 20);
+                    the rest are dropped and counted on the next one that passes
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id', 'method', 'path'}
+
+_listener = None
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamp records with the current request's id, method and path.
+    Runs in the calling thread, before the record is queued.
+    """
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = request_id()
+            record.method = request.method
+            record.path = request.path
+        else:
+            record.request_id = record.method = record.path = None
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """
+    Let at most `rate` DEBUG records per second through for each call site
+    (logger, file, line); higher levels always pass
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._windows = {}  # site -> [window start, passed, dropped]
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate <= 0:
+            return True
+        site = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(site)
+            if window is None or now - window[0] >= 1.0:
+                dropped = window[2] if window else 0
+                window = self._windows[site] = [now, 0, 0]
+                if dropped:
+                    record.sampled_dropped = dropped
+            if window[1] >= self.rate:
+                window[2] += 1
+                return False
+            window[1] += 1
+            return True
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry.update(request_id=record.request_id, method=record.method, path=record.path)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        if getattr(record, 'request_id', None):
+            line += f' [{record.request_id} {record.method} {record.path}]'
+        if getattr(record, 'sampled_dropped', None):
+            line += f' (+{record.sampled_dropped} similar dropped)'
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+
+    def prepare(self, record):
+        # Resolve the message and traceback now (args and exc_info may not
+        # survive the hop to the listener thread) but keep them separate
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def request_id():
+    """
+    The current request's id: the client's X-Request-ID if sent, else a fresh one
+    """
+    if 'request_id' not in g:
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    return g.request_id
+
+
+def init_app(app):
+    """
+    Echo the request id back so clients and proxies can correlate their logs
+    """
+
+    @app.after_request
+    def _add_request_id(response):
+        response.headers['X-Request-ID'] = request_id()
+        return response
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """
+    Route all logging through a queue to one JSON (or text) handler
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_file = os.environ.get('LOG_FILE')
+    target = logging.FileHandler(log_file) if log_file else logging.StreamHandler(sys.stderr)
+    target.setFormatter(TextFormatter() if os.environ.get('LOG_FORMAT') == 'text' else JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(DebugSampler(int(os.environ.get('LOG_DEBUG_RATE', 20))))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+    for name, level in _parse_levels(os.environ.get('LOG_LEVELS', '')).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, target, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the writer thread
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
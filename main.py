@@ -1,4 +1,11 @@
-from app import app
+from app import create_app
+
+app = create_app()
 
 if __name__ == "__main__":
+    # The development server keeps a local database current on its own;
+    # deployments run `flask --app main migrate` before starting workers
+    import migrations
+    with app.app_context():
+        migrations.upgrade()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,205 @@
+"""
+Batched bulk deletion, archival and consistency checks.
+
+Every operation works in bounded batches, each committed in its own short
+transaction, so locks are held briefly and the WAL never has to absorb one
+giant transaction. Batches are idempotent: an interrupted run is resumed by
+simply running the same command again.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, delete, insert, literal, select
+
+from app import db
+from blobstore import drop_refs
+from models import User, Restaurant, MenuItem, Order, OrderItem, ArchivedOrder, ArchivedOrderItem, order_summary_values
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+ARCHIVABLE_STATUSES = ('completed', 'cancelled')
+
+SUMMARY_COLUMNS = ('item_count', 'items_summary', 'customer_display_name')
+ORDER_COLUMNS = (
+    'id', 'customer_id', 'restaurant_id', 'delivery_partner_id', 'status', 'total_amount',
+    'delivery_address', 'payment_method', 'payment_status', 'created_at', 'updated_at',
+) + SUMMARY_COLUMNS
+ORDER_ITEM_COLUMNS = ('id', 'order_id', 'menu_item_id', 'quantity', 'price')
+
+
+def _next_ids(stmt, batch_size):
+    return list(db.session.execute(stmt.limit(batch_size)).scalars())
+
+
+def _run_batches(next_batch, apply_batch, batch_size, pause, progress, label):
+    """
+    Repeatedly fetch a batch of ids and apply a change to them, one transaction per batch
+    """
+    done = 0
+    while True:
+        ids = next_batch(batch_size)
+        if not ids:
+            break
+        apply_batch(ids)
+        db.session.commit()
+        done += len(ids)
+        if progress:
+            progress(label, done)
+        if pause:
+            time.sleep(pause)
+    return done
+
+
+def _delete_orders(ids):
+    db.session.execute(delete(OrderItem).where(OrderItem.order_id.in_(ids)))
+    db.session.execute(delete(Order).where(Order.id.in_(ids)))
+
+
+def delete_restaurant(restaurant_id, batch_size=DEFAULT_BATCH_SIZE, pause=0.0, progress=None):
+    """
+    Delete a restaurant with its orders, order items and menu items in batches.
+    Returns a dict of deleted row counts.
+    """
+    def order_batch(size):
+        return _next_ids(
+            select(Order.id).where(Order.restaurant_id == restaurant_id).order_by(Order.id), size
+        )
+
+    def stray_item_batch(size):
+        # Lines on other restaurants' orders that still point at this menu
+        return _next_ids(
+            select(OrderItem.id).join(MenuItem, MenuItem.id == OrderItem.menu_item_id)
+            .where(MenuItem.restaurant_id == restaurant_id).order_by(OrderItem.id), size
+        )
+
+    def menu_batch(size):
+        return _next_ids(
+            select(MenuItem.id).where(MenuItem.restaurant_id == restaurant_id).order_by(MenuItem.id), size
+        )
+
+    def delete_menu_items(ids):
+        drop_refs('menu_item', ids)
+        db.session.execute(delete(MenuItem).where(MenuItem.id.in_(ids)))
+
+    counts = {
+        'orders': _run_batches(order_batch, _delete_orders, batch_size, pause, progress, 'orders'),
+        'order_items': _run_batches(
+            stray_item_batch,
+            lambda ids: db.session.execute(delete(OrderItem).where(OrderItem.id.in_(ids))),
+            batch_size, pause, progress, 'order items'
+        ),
+        'menu_items': _run_batches(
+            menu_batch, delete_menu_items,
+            batch_size, pause, progress, 'menu items'
+        ),
+    }
+
+    # Media becomes garbage for `flask gc-blobs` once nothing points at it
+    drop_refs('restaurant', [restaurant_id])
+    db.session.execute(delete(Restaurant).where(Restaurant.id == restaurant_id))
+    db.session.commit()
+    logger.info("Deleted restaurant %s: %s", restaurant_id, counts)
+    return counts
+
+
+def archive_orders(older_than_days, batch_size=DEFAULT_BATCH_SIZE, pause=0.0, restaurant_id=None,
+                   statuses=ARCHIVABLE_STATUSES, progress=None):
+    """
+    Move finished orders created more than `older_than_days` ago, and their
+    items, into the archive tables. Copy and delete happen in the same
+    transaction per batch. Returns the number of orders archived.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    candidates = select(Order.id).where(
+        Order.status.in_(statuses),
+        Order.created_at < cutoff
+    ).order_by(Order.id)
+    if restaurant_id is not None:
+        candidates = candidates.where(Order.restaurant_id == restaurant_id)
+
+    def archive_batch(ids):
+        db.session.execute(insert(ArchivedOrder).from_select(
+            ORDER_COLUMNS + ('archived_at',),
+            select(
+                *(getattr(Order, column) for column in ORDER_COLUMNS),
+                literal(datetime.utcnow(), ArchivedOrder.archived_at.type)
+            ).where(Order.id.in_(ids))
+        ))
+        db.session.execute(insert(ArchivedOrderItem).from_select(
+            ORDER_ITEM_COLUMNS,
+            select(*(getattr(OrderItem, column) for column in ORDER_ITEM_COLUMNS)).where(OrderItem.order_id.in_(ids))
+        ))
+        _delete_orders(ids)
+
+    archived = _run_batches(
+        lambda size: _next_ids(candidates, size), archive_batch, batch_size, pause, progress, 'orders archived'
+    )
+    logger.info("Archived %d orders older than %d days", archived, older_than_days)
+    return archived
+
+
+def _expected_summaries(connection, rows):
+    """
+    Summary column values recomputed from order_item and user for `rows`
+    """
+    lines = defaultdict(list)
+    for order_id, quantity, name in connection.execute(
+        select(OrderItem.order_id, OrderItem.quantity, MenuItem.name)
+        .join(MenuItem, MenuItem.id == OrderItem.menu_item_id)
+        .where(OrderItem.order_id.in_([row.id for row in rows]))
+        .order_by(OrderItem.order_id, OrderItem.id)
+    ):
+        lines[order_id].append((quantity, name))
+    return {
+        row.id: dict(order_summary_values(lines[row.id]), customer_display_name=row.username)
+        for row in rows
+    }
+
+
+def check_order_summaries(repair=False, batch_size=DEFAULT_BATCH_SIZE, connection=None, progress=None):
+    """
+    Compare each order's denormalized summary columns with its items and
+    customer, walking the table in id order. With `repair`, drifted rows are
+    rewritten, one transaction per batch (or inside the caller's transaction
+    when a `connection` is passed). Returns the ids of drifted orders.
+    """
+    bind = connection if connection is not None else db.session
+    table = Order.__table__
+    # Setting updated_at to itself stops its onupdate from firing: it is the
+    # completion time that partner earnings and the dashboards go by
+    fix = table.update().where(table.c.id == bindparam('order_id')).values(
+        {**{column: bindparam(f'new_{column}') for column in SUMMARY_COLUMNS}, 'updated_at': table.c.updated_at}
+    )
+
+    drifted, last_id, checked = [], 0, 0
+    while True:
+        rows = bind.execute(
+            select(Order.id, *(getattr(Order, column) for column in SUMMARY_COLUMNS), User.username)
+            .join(User, User.id == Order.customer_id)
+            .where(Order.id > last_id).order_by(Order.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        expected = _expected_summaries(bind, rows)
+        fixes = []
+        for row in rows:
+            values = expected[row.id]
+            if any(getattr(row, column) != values[column] for column in SUMMARY_COLUMNS):
+                fixes.append({'order_id': row.id, **{f'new_{column}': values[column] for column in SUMMARY_COLUMNS}})
+        drifted.extend(entry['order_id'] for entry in fixes)
+        if repair and fixes:
+            bind.execute(fix, fixes)
+        if connection is None:
+            db.session.commit()
+        last_id = rows[-1].id
+        checked += len(rows)
+        if progress:
+            progress('orders checked', checked)
+
+    if drifted:
+        logger.warning("%d of %d orders had stale summary columns%s",
+                       len(drifted), checked, ' (repaired)' if repair else '')
+    return drifted
@@ -0,0 +1,162 @@
+"""
+Prometheus metrics, served at /metrics in the text exposition format.
+
+- http_request_duration_seconds / http_requests_total: latency histogram
+  and status counter per endpoint (the Flask endpoint name, so the label
+  set stays bounded)
+- http_request_size_bytes / http_response_size_bytes: body sizes
+- db_pool_checkout_seconds: time to check a connection out of the pool,
+  including the wait for a free one and the pre-ping
+- cache_requests_total: hits and misses per cache (see CACHE_REQUESTS)
+- order_status_transitions_total: committed Order.status changes
+- http_compression_*: responses, bytes in and out and CPU seconds per
+  encoding, and skipped responses per reason, from compression.stats
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty directory shared
+by the workers: each worker then writes its samples to mmap files there
+and /metrics aggregates all of them (gunicorn.conf.py cleans up after
+workers that exit). Without it, metrics are per process.
+
+Latency is measured up to the end of the view; the time spent streaming a
+generated body is not included.
+"""
+import functools
+import os
+import time
+
+from flask import Response, abort, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import app, db
+from compression import stats as compression_stats
+from models import Order
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+POOL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time to produce a response', ['method', 'endpoint'], buckets=LATENCY_BUCKETS
+)
+REQUESTS = Counter('http_requests_total', 'Responses by status code', ['method', 'endpoint', 'status'])
+REQUEST_SIZE = Histogram('http_request_size_bytes', 'Request body size', ['endpoint'], buckets=SIZE_BUCKETS)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Response body size (before compression)', ['endpoint'], buckets=SIZE_BUCKETS
+)
+POOL_CHECKOUT = Histogram('db_pool_checkout_seconds', 'Wait for a pooled database connection', buckets=POOL_BUCKETS)
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups', ['cache', 'result'])
+ORDER_TRANSITIONS = Counter('order_status_transitions_total', 'Committed order status changes', ['from_status', 'to_status'])
+COMPRESSION_RESPONSES = Counter('http_compression_responses_total', 'Compressed responses', ['encoding'])
+COMPRESSION_BYTES_IN = Counter('http_compression_input_bytes_total', 'Bytes before compression', ['encoding'])
+COMPRESSION_BYTES_OUT = Counter('http_compression_output_bytes_total', 'Bytes after compression', ['encoding'])
+COMPRESSION_CPU = Counter('http_compression_cpu_seconds_total', 'CPU time spent compressing', ['encoding'])
+COMPRESSION_SKIPPED = Counter('http_compression_skipped_total', 'Responses left uncompressed', ['reason'])
+
+
+def cache_lookup(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+class _CompressionMetrics:
+    """
+    Mirrors compression.stats into the Prometheus counters
+    """
+
+    def record(self, encoding, bytes_in, bytes_out, cpu_seconds, responses=0):
+        if responses:
+            COMPRESSION_RESPONSES.labels(encoding).inc(responses)
+        if bytes_in:
+            COMPRESSION_BYTES_IN.labels(encoding).inc(bytes_in)
+        if bytes_out:
+            COMPRESSION_BYTES_OUT.labels(encoding).inc(bytes_out)
+        if cpu_seconds:
+            COMPRESSION_CPU.labels(encoding).inc(cpu_seconds)
+
+    def skip(self, reason):
+        COMPRESSION_SKIPPED.labels(reason).inc()
+
+
+compression_stats.add_observer(_CompressionMetrics())
+
+
+@app.before_request
+def _start_timer():
+    g._request_started = time.perf_counter()
+
+
+@app.after_request
+def _observe_request(response):
+    started = g.pop('_request_started', None)
+    if started is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - started)
+    REQUESTS.labels(request.method, endpoint, str(response.status_code)).inc()
+    if request.content_length:
+        REQUEST_SIZE.labels(endpoint).observe(request.content_length)
+    if not response.is_streamed:
+        RESPONSE_SIZE.labels(endpoint).observe(response.calculate_content_length() or 0)
+    return response
+
+
+def _time_pool_checkouts(pool):
+    """
+    Wrap Pool.connect(), the public method the engine checks connections out
+    with; the pool events only fire once a connection has been handed over
+    """
+    connect = pool.connect
+
+    @functools.wraps(connect)
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            POOL_CHECKOUT.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+
+with app.app_context():
+    _time_pool_checkouts(db.engine.pool)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_status_changes(session, flush_context):
+    changes = session.info.setdefault('order_status_changes', [])
+    for obj in session.new:
+        if isinstance(obj, Order):
+            changes.append(('new', obj.status))
+    for obj in session.dirty:
+        if isinstance(obj, Order):
+            history = inspect(obj).attrs.status.history
+            if history.added and history.deleted and history.added[0] != history.deleted[0]:
+                changes.append((history.deleted[0], history.added[0]))
+
+
+@event.listens_for(Session, 'after_commit')
+def _count_status_changes(session):
+    for old, new in session.info.pop('order_status_changes', ()):
+        ORDER_TRANSITIONS.labels(old, new).inc()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_status_changes(session):
+    session.info.pop('order_status_changes', None)
+
+
+@app.route('/metrics')
+def metrics():
+    token = os.environ.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,148 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from app import db
+from models import (
+    MenuItem, Order, OrderItem, PartnerDailyStats, ArchivedOrder, ArchivedOrderItem, Restaurant, User,
+    order_summary_values
+)
+
+logger = logging.getLogger(__name__)
+
+# Ordered list of (name, callable) schema steps. db.create_all() only creates
+# missing tables, so anything that changes an existing table goes here.
+MIGRATIONS = []
+
+
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migration'
+
+    id = db.Column(db.String(100), primary_key=True)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def migration(name):
+    """
+    Register a schema step; steps run once, in registration order
+    """
+    def decorator(f):
+        MIGRATIONS.append((name, f))
+        return f
+    return decorator
+
+
+@migration('0001_order_keyset_indexes')
+def order_keyset_indexes(connection):
+    # Composite (owner, created_at, id) indexes backing keyset pagination
+    for index in Order.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+
+def add_column(connection, column):
+    """
+    ALTER TABLE ... ADD COLUMN for a model column, unless it already exists
+    """
+    table = column.table.name
+    if column.name in {c['name'] for c in inspect(connection).get_columns(table)}:
+        return
+    column_type = column.type.compile(dialect=connection.dialect)
+    connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN "{column.name}" {column_type}'))
+
+
+@migration('0002_restaurant_image_variants')
+def restaurant_image_variants(connection):
+    add_column(connection, Restaurant.__table__.c.image_variants)
+
+
+@migration('0003_order_summary_columns')
+def order_summary_columns(connection):
+    from maintenance import check_order_summaries
+
+    for name in ('item_count', 'items_summary', 'customer_display_name'):
+        add_column(connection, Order.__table__.c[name])
+    # Backfill existing orders from their items and customer
+    check_order_summaries(repair=True, connection=connection)
+
+
+def rupees_to_paise(connection, column):
+    """
+    Convert a float rupee column to integer paise in place
+    """
+    table = column.table.name
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(
+            f'ALTER TABLE "{table}" ALTER COLUMN "{column.name}" TYPE BIGINT '
+            f'USING ROUND("{column.name}" * 100)::BIGINT'
+        ))
+    else:
+        # SQLite cannot change a column type; the values become whole paise and
+        # Money reads them back as int whatever the declared affinity
+        connection.execute(text(
+            f'UPDATE "{table}" SET "{column.name}" = CAST(ROUND("{column.name}" * 100) AS INTEGER)'
+        ))
+
+
+@migration('0004_money_in_paise')
+def money_in_paise(connection):
+    for column in (MenuItem.price, OrderItem.price, Order.total_amount, PartnerDailyStats.gross,
+                   PartnerDailyStats.earnings, ArchivedOrder.total_amount, ArchivedOrderItem.price):
+        rupees_to_paise(connection, column.property.columns[0])
+
+
+@migration('0005_archived_order_summary_columns')
+def archived_order_summary_columns(connection, batch_size=1000):
+    for name in ('item_count', 'items_summary', 'customer_display_name'):
+        add_column(connection, ArchivedOrder.__table__.c[name])
+
+    # Backfill orders archived before the columns existed from their archived items
+    table = ArchivedOrder.__table__
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            db.select(ArchivedOrder.id, User.username)
+            .outerjoin(User, User.id == ArchivedOrder.customer_id)
+            .where(ArchivedOrder.id > last_id).order_by(ArchivedOrder.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        lines = defaultdict(list)
+        for order_id, quantity, name in connection.execute(
+            db.select(ArchivedOrderItem.order_id, ArchivedOrderItem.quantity, MenuItem.name)
+            .join(MenuItem, MenuItem.id == ArchivedOrderItem.menu_item_id)
+            .where(ArchivedOrderItem.order_id.in_([row.id for row in rows]))
+            .order_by(ArchivedOrderItem.order_id, ArchivedOrderItem.id)
+        ):
+            lines[order_id].append((quantity, name))
+        connection.execute(
+            table.update().where(table.c.id == db.bindparam('order_id')).values(
+                item_count=db.bindparam('new_item_count'), items_summary=db.bindparam('new_items_summary'),
+                customer_display_name=db.bindparam('new_customer_display_name')
+            ),
+            [{'order_id': row.id, 'new_customer_display_name': row.username,
+              **{f'new_{key}': value for key, value in order_summary_values(lines[row.id]).items()}}
+             for row in rows]
+        )
+
+
+def upgrade():
+    """
+    Create missing tables, then apply every migration not recorded in schema_migration yet;
+    returns the names of the migrations applied
+    """
+    db.create_all()
+    with db.engine.connect() as connection:
+        applied = set(connection.execute(db.select(SchemaMigration.id)).scalars())
+
+    pending = [(name, step) for name, step in MIGRATIONS if name not in applied]
+    for name, step in pending:
+        with db.engine.begin() as connection:
+            step(connection)
+            connection.execute(
+                SchemaMigration.__table__.insert().values(id=name, applied_at=datetime.utcnow())
+            )
+        logger.info("Applied migration %s", name)
+    return [name for name, _ in pending]
@@ -1,8 +1,26 @@
 from datetime import datetime
 from app import db
 from flask_login import UserMixin
+from sqlalchemy.orm import WriteOnlyMapped
+from money import Money
 from werkzeug.security import generate_password_hash, check_password_hash
 
+def items_display(lines):
+    """
+    "2x Dosa, 1x Idli and 3 more" from (quantity, item name) pairs
+    """
+    items_text = [f"{quantity}x {name}" for quantity, name in lines]
+    if len(items_text) > 2:
+        return f"{', '.join(items_text[:2])} and {len(items_text) - 2} more"
+    return ', '.join(items_text)
+
+def order_summary_values(lines):
+    """
+    Order.item_count and Order.items_summary for (quantity, item name) pairs
+    """
+    lines = list(lines)
+    return {'item_count': sum(quantity for quantity, _ in lines), 'items_summary': items_display(lines)}
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), nullable=False)
@@ -14,14 +32,15 @@ class User(UserMixin, db.Model):
     is_profile_complete = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Relationship with Orders for Customers
-    customer_orders = db.relationship('Order', foreign_keys='Order.customer_id', backref='customer', lazy='dynamic')
+    # Order history grows without bound, so these collections are write-only:
+    # read them with user.customer_orders.select() plus filters/limits
+    customer_orders: WriteOnlyMapped['Order'] = db.relationship(foreign_keys='Order.customer_id', backref='customer', passive_deletes=True)
     
     # Relationship for Restaurant
     restaurant_profile = db.relationship('Restaurant', backref='owner', uselist=False)
     
     # Relationship for Delivery Partner
-    delivery_orders = db.relationship('Order', foreign_keys='Order.delivery_partner_id', backref='delivery_partner', lazy='dynamic')
+    delivery_orders: WriteOnlyMapped['Order'] = db.relationship(foreign_keys='Order.delivery_partner_id', backref='delivery_partner', passive_deletes=True)
     
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -41,18 +60,21 @@ class Restaurant(db.Model):
     address = db.Column(db.Text, nullable=False)
     phone = db.Column(db.String(20), nullable=False)
     image_url = db.Column(db.String(255), nullable=True)
+    image_variants = db.Column(db.JSON, nullable=True)  # Responsive srcset manifest, see images.py
     rating = db.Column(db.Float, default=0.0)
     is_open = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Relationships
-    menu_items = db.relationship('MenuItem', backref='restaurant', lazy='dynamic')
-    orders = db.relationship('Order', backref='restaurant', lazy='dynamic')
+    # Relationships: a menu is small enough to load (or selectinload) whole,
+    # the order history is write-only
+    menu_items = db.relationship('MenuItem', backref='restaurant')
+    orders: WriteOnlyMapped['Order'] = db.relationship(backref='restaurant', passive_deletes=True)
     
     def __repr__(self):
         return f'<Restaurant {self.name}>'
     
     def to_dict(self):
+        # List endpoints use serializers.RESTAURANT_JSON instead; keep the keys in step
         return {
             'id': self.id,
             'name': self.name,
@@ -61,6 +83,7 @@ class Restaurant(db.Model):
             'address': self.address,
             'phone': self.phone,
             'image_url': self.image_url,
+            'image_variants': self.image_variants,
             'rating': self.rating,
             'is_open': self.is_open
         }
@@ -70,59 +93,129 @@ class MenuItem(db.Model):
     restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    price = db.Column(db.Float, nullable=False)
+    price = db.Column(Money, nullable=False)  # Paise, see money.py
     category = db.Column(db.String(50), nullable=True)
     is_vegetarian = db.Column(db.Boolean, default=False)
     is_available = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Relationship
-    order_items = db.relationship('OrderItem', backref='menu_item', lazy='dynamic')
+    # Relationship; order lines always show the item name, so they join it in
+    order_items: WriteOnlyMapped['OrderItem'] = db.relationship(
+        backref=db.backref('menu_item', lazy='joined'), passive_deletes=True
+    )
     
     def __repr__(self):
         return f'<MenuItem {self.name}>'
 
 class Order(db.Model):
+    __table_args__ = (
+        # Keyset pagination indexes: each dashboard list filters on one owner
+        # column and walks (created_at, id) newest first
+        db.Index('ix_order_customer_created', 'customer_id', 'created_at', 'id'),
+        db.Index('ix_order_restaurant_created', 'restaurant_id', 'created_at', 'id'),
+        db.Index('ix_order_partner_created', 'delivery_partner_id', 'created_at', 'id'),
+        db.Index('ix_order_status_created', 'status', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
     delivery_partner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     status = db.Column(db.String(20), default='pending')  # pending, preparing, ready_for_pickup, picking, delivering, completed, cancelled
-    total_amount = db.Column(db.Float, nullable=False)
+    total_amount = db.Column(Money, nullable=False)  # Paise, see money.py
     delivery_address = db.Column(db.Text, nullable=False)
     payment_method = db.Column(db.String(20), default='cash')  # cash, online
     payment_status = db.Column(db.String(20), default='pending')  # pending, completed, failed
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Order card fields, written once at checkout so dashboards never touch
+    # order_item; `flask check-order-summaries` repairs any drift
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    items_summary = db.Column(db.String(255), nullable=False, default='')
+    customer_display_name = db.Column(db.String(64), nullable=True)
     
-    # Relationship
-    items = db.relationship('OrderItem', backref='order', lazy='dynamic')
+    # Relationship; a handful of lines per order, use selectinload(Order.items)
+    # when loading orders that will show them
+    items = db.relationship('OrderItem', backref='order')
     
     def __repr__(self):
         return f'<Order {self.id}>'
     
     @property
     def customer_name(self):
-        return self.customer.username
+        return self.customer_display_name
     
     @property
     def order_items_display(self):
-        items_text = [f"{item.quantity}x {item.menu_item.name}" for item in self.items.all()]
-        if len(items_text) > 2:
-            return f"{', '.join(items_text[:2])} and {len(items_text) - 2} more"
-        return ', '.join(items_text)
-    
-    @property
-    def item_count(self):
-        """Get total number of items in the order"""
-        return sum(item.quantity for item in self.items.all())
+        return self.items_summary
 
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
     menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_item.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=1)
-    price = db.Column(db.Float, nullable=False)  # Store price at time of order
+    price = db.Column(Money, nullable=False)  # Paise, stored at time of order
     
     def __repr__(self):
         return f'<OrderItem {self.menu_item_id} x{self.quantity}>'
+
+class PartnerDailyStats(db.Model):
+    """Per delivery partner, per day rollup maintained when deliveries complete"""
+    partner_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    deliveries = db.Column(db.Integer, nullable=False, default=0)
+    gross = db.Column(Money, nullable=False, default=0)  # Sum of order totals, paise
+    earnings = db.Column(Money, nullable=False, default=0)  # Partner share of gross, paise
+    rating_sum = db.Column(db.Float, nullable=False, default=0.0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<PartnerDailyStats {self.partner_id} {self.day}>'
+
+class ArchivedOrder(db.Model):
+    """Finished order moved out of the hot order table by `flask archive-orders`"""
+    id = db.Column(db.Integer, primary_key=True)  # Original Order.id
+    customer_id = db.Column(db.Integer, nullable=False, index=True)
+    restaurant_id = db.Column(db.Integer, nullable=False, index=True)
+    delivery_partner_id = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(20))
+    total_amount = db.Column(Money, nullable=False)
+    delivery_address = db.Column(db.Text, nullable=False)
+    payment_method = db.Column(db.String(20))
+    payment_status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    # Order card fields, carried over from the live order
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    items_summary = db.Column(db.String(255), nullable=False, default='')
+    customer_display_name = db.Column(db.String(64), nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ArchivedOrder {self.id}>'
+
+class ArchivedOrderItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)  # Original OrderItem.id
+    order_id = db.Column(db.Integer, nullable=False, index=True)
+    menu_item_id = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    price = db.Column(Money, nullable=False)
+    
+    def __repr__(self):
+        return f'<ArchivedOrderItem {self.menu_item_id} x{self.quantity}>'
+
+class BlobRef(db.Model):
+    """An owner's pointer at a content-addressed blob, see blobstore.py"""
+    __table_args__ = (
+        db.UniqueConstraint('owner_type', 'owner_id', 'role', name='uq_blob_ref_owner_role'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    blob_key = db.Column(db.String(100), nullable=False, index=True)  # ab/cd/<sha256>.<ext>
+    owner_type = db.Column(db.String(20), nullable=False)  # restaurant, menu_item
+    owner_id = db.Column(db.Integer, nullable=False)
+    role = db.Column(db.String(20), nullable=False)  # source, or <variant>.<format> e.g. card.webp
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<BlobRef {self.owner_type}:{self.owner_id} {self.role}>'
@@ -0,0 +1,109 @@
+"""
+Money in integer paise.
+
+Prices and totals live in BIGINT columns as whole paise (1 rupee = 100
+paise) through the Money column type, and the pricing path is integer
+arithmetic, so totals are exact and SUM()s need no rounding. Rupees only
+appear at the edges: the |rupees template filter and to_rupees() for
+display and JSON, parse_rupees() for form input.
+"""
+import numbers
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+from app import app
+
+PAISE_PER_RUPEE = 100
+DELIVERY_FEE = 40 * PAISE_PER_RUPEE
+TAX_PERCENT = 5
+
+
+class Money(TypeDecorator):
+    """
+    An amount in paise stored as BIGINT. Floats are rejected rather than
+    silently truncated, so a rupee value can never be saved as paise.
+    """
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, bool) or not isinstance(value, numbers.Integral):
+            raise TypeError(f"Money columns take integer paise, got {value!r}")
+        return int(value)
+
+    def process_result_value(self, value, dialect):
+        # SQLite databases converted in place keep REAL affinity and return floats
+        return None if value is None else int(value)
+
+
+def percent_of(paise, percent):
+    """
+    `percent`% of an amount, rounded half up to the paisa
+    """
+    return (paise * percent + 50) // 100
+
+
+def order_totals(lines):
+    """
+    Subtotal, delivery fee, tax and total in paise for (unit price, quantity) pairs
+    """
+    subtotal = sum(price * quantity for price, quantity in lines)
+    tax = percent_of(subtotal, TAX_PERCENT)
+    return {
+        'subtotal': subtotal,
+        'delivery_fee': DELIVERY_FEE,
+        'tax': tax,
+        'total': subtotal + DELIVERY_FEE + tax
+    }
+
+
+def cart_totals(cart_items):
+    """
+    order_totals() for session cart lines; their prices must be integer paise
+    """
+    lines = []
+    for item in cart_items:
+        price = item['price']
+        # type() first: the ABC check is slow and session prices are plain ints
+        if type(price) is not int and (isinstance(price, bool) or not isinstance(price, numbers.Integral)):
+            raise TypeError(f"Cart prices are integer paise, got {price!r}")
+        lines.append((price, item['quantity']))
+    return order_totals(lines)
+
+
+def parse_rupees(value):
+    """
+    Paise from user input such as "49.5"; raises ValueError if it is not an
+    amount or is not at least one paisa
+    """
+    try:
+        rupees = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"not an amount: {value!r}")
+    if not rupees.is_finite():
+        raise ValueError(f"not an amount: {value!r}")
+    paise = int((rupees * PAISE_PER_RUPEE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    if paise <= 0:
+        raise ValueError(f"not a positive amount: {value!r}")
+    return paise
+
+
+def to_rupees(paise):
+    """
+    Rupees as a number, for JSON payloads and exports
+    """
+    return round(paise / PAISE_PER_RUPEE, 2)
+
+
+@app.template_filter('rupees')
+def rupees(paise):
+    """
+    12550 -> "125.50"
+    """
+    paise = round(paise)
+    whole, fraction = divmod(abs(paise), PAISE_PER_RUPEE)
+    return f"{'-' if paise < 0 else ''}{whole}.{fraction:02d}"
@@ -0,0 +1,67 @@
+import base64
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from app import db
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+
+def encode_cursor(created_at, order_id):
+    """
+    Encode the (created_at, id) position of the last row on a page as an opaque token
+    """
+    raw = f"{created_at.isoformat()}|{order_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor token back into (created_at, id). Returns None for a missing or malformed token.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, order_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(created_at), int(order_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """
+    Clamp a user supplied page size to a sane range
+    """
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_page(stmt, model, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Fetch one page of the select() `stmt` ordered newest first by (created_at, id).
+
+    Rows after `cursor` are located with a row-value comparison, so the
+    (..., created_at, id) composite indexes serve every page with the same
+    index range scan no matter how deep into the history it is.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    position = decode_cursor(cursor) if isinstance(cursor, str) else cursor
+    if position:
+        stmt = stmt.where(tuple_(model.created_at, model.id) < position)
+
+    rows = db.session.execute(
+        stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
@@ -0,0 +1,327 @@
+"""
+On-demand request profiling for live workers.
+
+POST /_profiler/start opens a profiling session for a number of seconds.
+Each request (optionally only one endpoint) is profiled with probability
+`fraction`, in one of two modes:
+
+- sample: a background thread snapshots the stacks of the profiled
+  requests every PROFILER_SAMPLE_INTERVAL seconds. Cheap enough for
+  production; downloads as collapsed stacks for flamegraph.pl/speedscope.
+- cprofile: deterministic cProfile of the request. Exact call counts but
+  slows the request noticeably; downloads as a pstats file.
+
+The session lives in PROFILE_DIR (default instance/profiles), which all
+gunicorn workers must share: every worker picks up the session file within
+a second and writes its results under the session's folder, and downloads
+merge them. Results are kept per endpoint.
+
+The routes are only served when PROFILER_TOKEN is set, and require
+`Authorization: Bearer <token>`.
+"""
+import cProfile
+import json
+import marshal
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import Response, abort, g, jsonify, request
+
+from app import app
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+SAMPLE_INTERVAL = float(os.environ.get('PROFILER_SAMPLE_INTERVAL', 0.005))
+MAX_SECONDS = 3600
+MODES = ('sample', 'cprofile')
+_SESSION_ID = re.compile(r'\d{8}-\d{6}')
+
+_session = None  # The active session's settings, or None
+_session_checked = 0.0
+_session_mtime = None
+
+_lock = threading.Lock()
+_sampled_threads = {}  # thread id -> (session id, endpoint) of the request being sampled
+_samples = {}  # session id -> Counter of collapsed stacks
+_sampler = None
+_dump_lock = threading.Lock()
+
+
+def _session_file():
+    return os.path.join(PROFILE_DIR, 'session.json')
+
+
+def _session_folder(session_id):
+    return os.path.join(PROFILE_DIR, session_id)
+
+
+def active_session():
+    """
+    The session currently open, re-reading the shared file at most once a second
+    """
+    global _session, _session_checked, _session_mtime
+    now = time.monotonic()
+    if now - _session_checked >= 1.0:
+        _session_checked = now
+        try:
+            mtime = os.stat(_session_file()).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != _session_mtime:
+            _session_mtime = mtime
+            _session = _read_session()
+    if _session is None or time.time() >= _session['until']:
+        return None
+    return _session
+
+
+def _read_session():
+    try:
+        with open(_session_file()) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_session(session):
+    global _session_checked
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    tmp = f'{_session_file()}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(session, f)
+    os.replace(tmp, _session_file())
+    _session_checked = 0.0  # This worker picks it up on its next request
+
+
+@app.before_request
+def _start_profile():
+    endpoint = request.endpoint
+    if endpoint is None or endpoint.startswith('profiler_'):
+        return
+    session = active_session()
+    if session is None or session['endpoint'] not in (None, endpoint) or random.random() >= session['fraction']:
+        return
+
+    if session['mode'] == 'cprofile':
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Another profiler already owns this thread
+            return
+        g._profile = (session['id'], endpoint, profile)
+    else:
+        with _lock:
+            _sampled_threads[threading.get_ident()] = (session['id'], endpoint)
+        _ensure_sampler()
+        g._profile = (session['id'], endpoint, None)
+
+
+@app.teardown_request
+def _finish_profile(exc):
+    session_id, endpoint, profile = g.pop('_profile', (None, None, None))
+    if session_id is None:
+        return
+    if profile is None:
+        with _lock:
+            _sampled_threads.pop(threading.get_ident(), None)
+        return
+
+    profile.disable()
+    folder = os.path.join(_session_folder(session_id), str(os.getpid()))
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f'{endpoint}.prof')
+    with _dump_lock:
+        stats = pstats.Stats(profile)
+        if os.path.exists(path):
+            stats.add(path)
+        stats.dump_stats(path)
+
+
+def _frame_name(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'.replace(';', ':')
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def _ensure_sampler():
+    global _sampler
+    with _lock:
+        if _sampler is None or not _sampler.is_alive():
+            _sampler = threading.Thread(target=_sample_loop, name='profiler-sampler', daemon=True)
+            _sampler.start()
+
+
+def _sample_loop():
+    """
+    Snapshot the profiled requests' stacks until the session ends and they finish
+    """
+    last_flush = time.monotonic()
+    while True:
+        time.sleep(SAMPLE_INTERVAL)
+        frames = sys._current_frames()
+        with _lock:
+            for ident, (session_id, endpoint) in _sampled_threads.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    _samples.setdefault(session_id, Counter())[f'{endpoint};{_collapse(frame)}'] += 1
+            idle = not _sampled_threads
+        del frames
+
+        now = time.monotonic()
+        if now - last_flush >= 1.0 or idle:
+            _flush_samples()
+            last_flush = now
+        if idle and active_session() is None:
+            return
+
+
+def _flush_samples():
+    with _lock:
+        pending = {session_id: Counter(counts) for session_id, counts in _samples.items()}
+    for session_id, counts in pending.items():
+        folder = _session_folder(session_id)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'{os.getpid()}.collapsed')
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            f.writelines(f'{stack} {count}\n' for stack, count in counts.items())
+        os.replace(tmp, path)
+
+
+def _worker_files(session_id, suffix):
+    folder = _session_folder(session_id)
+    if not os.path.isdir(folder):
+        abort(404)
+    for root, dirs, files in os.walk(folder):
+        for name in files:
+            if name.endswith(suffix):
+                yield os.path.join(root, name)
+
+
+def merged_collapsed(session_id, endpoint=None):
+    """
+    Collapsed stack counts for a session summed over all workers
+    """
+    counts = Counter()
+    for path in _worker_files(session_id, '.collapsed'):
+        with open(path) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if endpoint is None or stack.split(';', 1)[0] == endpoint:
+                    counts[stack] += int(count)
+    return counts
+
+
+def merged_pstats(session_id, endpoint=None):
+    """
+    pstats.Stats for a session summed over all workers, or None if nothing was profiled
+    """
+    paths = [
+        path for path in _worker_files(session_id, '.prof')
+        if endpoint is None or os.path.basename(path) == f'{endpoint}.prof'
+    ]
+    return pstats.Stats(*paths) if paths else None
+
+
+def _require_token():
+    token = os.environ.get('PROFILER_TOKEN')
+    if not token:
+        abort(404)
+    if request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+
+
+def _valid_session_id(session_id):
+    if not _SESSION_ID.fullmatch(session_id):
+        abort(404)
+    return session_id
+
+
+@app.route('/_profiler/start', methods=['POST'])
+def profiler_start():
+    _require_token()
+    params = request.get_json(silent=True) or request.form
+    try:
+        seconds = min(float(params.get('seconds', 60)), MAX_SECONDS)
+        fraction = min(max(float(params.get('fraction', 0.1)), 0.0), 1.0)
+    except (TypeError, ValueError):
+        abort(400)
+    mode = params.get('mode', 'sample')
+    if mode not in MODES:
+        abort(400)
+
+    started = time.time()
+    session = {
+        'id': datetime.fromtimestamp(started).strftime('%Y%m%d-%H%M%S'),
+        'mode': mode,
+        'fraction': fraction,
+        'endpoint': params.get('endpoint') or None,
+        'started': started,
+        'until': started + seconds,
+    }
+    _write_session(session)
+    return jsonify(session)
+
+
+@app.route('/_profiler/stop', methods=['POST'])
+def profiler_stop():
+    _require_token()
+    session = _read_session()
+    if session is None:
+        abort(404)
+    session['until'] = min(session['until'], time.time())
+    _write_session(session)
+    return jsonify(session)
+
+
+@app.route('/_profiler')
+def profiler_index():
+    """
+    The current session and every recorded one with its profiled endpoints
+    """
+    _require_token()
+    sessions = []
+    if os.path.isdir(PROFILE_DIR):
+        for session_id in sorted(os.listdir(PROFILE_DIR), reverse=True):
+            if not os.path.isdir(_session_folder(session_id)):
+                continue
+            endpoints = Counter()
+            for stack in merged_collapsed(session_id):
+                endpoints[stack.split(';', 1)[0]] += 1
+            for path in _worker_files(session_id, '.prof'):
+                endpoints[os.path.basename(path)[:-len('.prof')]] += 1
+            sessions.append({'id': session_id, 'endpoints': sorted(endpoints)})
+    return jsonify({'active': active_session(), 'sessions': sessions})
+
+
+@app.route('/_profiler/<session_id>.collapsed')
+def profiler_collapsed(session_id):
+    _require_token()
+    counts = merged_collapsed(_valid_session_id(session_id), request.args.get('endpoint'))
+    body = ''.join(f'{stack} {count}\n' for stack, count in counts.most_common())
+    return Response(body, mimetype='text/plain', headers={
+        'Content-Disposition': f'attachment; filename={session_id}.collapsed'
+    })
+
+
+@app.route('/_profiler/<session_id>.prof')
+def profiler_pstats(session_id):
+    _require_token()
+    stats = merged_pstats(_valid_session_id(session_id), request.args.get('endpoint'))
+    if stats is None:
+        abort(404)
+    return Response(marshal.dumps(stats.stats), mimetype='application/octet-stream', headers={
+        'Content-Disposition': f'attachment; filename={session_id}.prof'
+    })
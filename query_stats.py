@@ -0,0 +1,143 @@
+"""
+Per-request SQL statistics.
+
+Cursor events on every Engine count the statements a request runs, their
+total database time, and how often each statement shape repeats (the
+fingerprint: SQL with literals and IN lists collapsed). After the request
+the totals go out as a Server-Timing header, and a request that runs one
+shape more than SQL_REPEAT_THRESHOLD times is logged as a likely N+1.
+In debug mode HTML pages also get a small panel listing the statements.
+
+Statements run while a streamed body is generated happen after the
+response is sent and are not counted.
+"""
+import logging
+import os
+import re
+import time
+from collections import Counter
+from html import escape
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app
+
+logger = logging.getLogger(__name__)
+
+app.config.setdefault('SQL_STATS', True)
+app.config.setdefault('SQL_REPEAT_THRESHOLD', int(os.environ.get('SQL_REPEAT_THRESHOLD', 5)))
+app.config.setdefault('SQL_DEBUG_PANEL', None)  # None: follow app.debug
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN \((?:\?|%\(\w+\)s|%s|:\w+)(?:, (?:\?|%\(\w+\)s|%s|:\w+))*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """
+    Statement shape: whitespace normalized, literals and IN lists collapsed
+    """
+    shape = _SPACE.sub(' ', statement).strip()
+    shape = _LITERALS.sub('?', shape)
+    return _IN_LISTS.sub('IN (...)', shape)
+
+
+class QueryStats:
+    """
+    Statements run in one request (or any other scope that installs one)
+    """
+    __slots__ = ('count', 'seconds', 'shapes', 'shape_seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.shape_seconds = Counter()
+
+    def record(self, statement, seconds):
+        shape = fingerprint(statement)
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[shape] += 1
+        self.shape_seconds[shape] += seconds
+
+    def repeated(self, threshold):
+        """
+        (shape, count) pairs run more than `threshold` times, most frequent first
+        """
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+
+def current_stats():
+    """
+    QueryStats for the current request, or None outside one
+    """
+    if not has_request_context():
+        return None
+    return g.get('_query_stats')
+
+
+# The start time lives on the statement's execution context rather than the
+# connection, so a statement that raises leaves nothing behind on a pooled connection
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_started', None)
+    stats = current_stats()
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+@app.before_request
+def _start_query_stats():
+    if app.config['SQL_STATS']:
+        g._query_stats = QueryStats()
+
+
+@app.after_request
+def _report_query_stats(response):
+    stats = current_stats()
+    if stats is None:
+        return response
+
+    threshold = app.config['SQL_REPEAT_THRESHOLD']
+    repeated = stats.repeated(threshold)
+    timing = f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"'
+    if repeated:
+        timing += f', n-plus-one;desc="{repeated[0][1]}x one statement"'
+        logger.warning(
+            "Possible N+1 in %s %s: %d queries, %d statement shapes repeated more than %d times; worst %dx: %s",
+            request.method, request.path, stats.count, len(repeated), threshold, repeated[0][1], repeated[0][0][:300]
+        )
+    response.headers.add('Server-Timing', timing)
+
+    panel = app.config['SQL_DEBUG_PANEL']
+    if (app.debug if panel is None else panel) and response.mimetype == 'text/html' and not response.is_streamed:
+        _inject_panel(response, stats, threshold)
+    return response
+
+
+def _inject_panel(response, stats, threshold):
+    body = response.get_data(as_text=True)
+    at = body.rfind('</body>')
+    if at == -1:
+        return
+    rows = ''.join(
+        f'<tr style="color:{"#f66" if count > threshold else "inherit"}">'
+        f'<td>{count}</td><td>{stats.shape_seconds[shape] * 1000:.1f}</td><td>{escape(shape)}</td></tr>'
+        for shape, count in stats.shapes.most_common(25)
+    )
+    panel = (
+        '<details id="sql-stats-panel" style="position:fixed;bottom:0;right:0;z-index:9999;max-width:60vw;'
+        'max-height:50vh;overflow:auto;background:#222;color:#eee;font:12px monospace;padding:4px 8px;opacity:.95">'
+        f'<summary>SQL: {stats.count} queries, {stats.seconds * 1000:.1f} ms</summary>'
+        f'<table><tr><th>n</th><th>ms</th><th>statement</th></tr>{rows}</table></details>'
+    )
+    response.set_data(body[:at] + panel + body[at:])
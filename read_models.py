@@ -0,0 +1,81 @@
+"""
+Column-projected read models for order lists.
+
+Dashboards and list endpoints only read a handful of columns per order, so
+they use these named select() statements instead of ORM entities. Item
+counts, the items text and the customer name are denormalized onto the
+order row at checkout, so a page is a single query over order with the
+restaurant and customer phone joined in. The results are slotted
+dataclasses, so there is no identity map, no instrumentation and no lazy
+loads hiding an N+1.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app import db
+from models import User, Restaurant, Order
+from pagination import keyset_page
+from rollups import delivery_earnings
+
+ORDER_SUMMARY = select(
+    Order.id,
+    Order.status,
+    Order.total_amount,
+    Order.delivery_address,
+    Order.payment_method,
+    Order.created_at,
+    Order.updated_at,
+    Order.item_count,
+    Order.items_summary,
+    Restaurant.name.label('restaurant_name'),
+    Restaurant.address.label('restaurant_address'),
+    Order.customer_display_name.label('customer_name'),
+    User.phone.label('customer_phone'),
+).join(
+    Restaurant, Restaurant.id == Order.restaurant_id
+).join(
+    User, User.id == Order.customer_id
+)
+
+
+@dataclass(slots=True)
+class OrderSummary:
+    id: int
+    status: str
+    total_amount: int  # Paise
+    delivery_address: str
+    payment_method: str
+    created_at: datetime
+    updated_at: datetime
+    item_count: int
+    items_summary: str
+    restaurant_name: str
+    restaurant_address: str
+    customer_name: str
+    customer_phone: str
+
+    @property
+    def order_items_display(self):
+        return self.items_summary
+
+    @property
+    def delivery_earnings(self):
+        return delivery_earnings(self.total_amount)
+
+
+def order_summaries(criteria, order_by=(Order.created_at.desc(), Order.id.desc())):
+    """
+    Every order matching `criteria` (a list of where clauses), newest first
+    """
+    rows = db.session.execute(ORDER_SUMMARY.where(*criteria).order_by(*order_by))
+    return [OrderSummary(*row) for row in rows]
+
+
+def order_summary_page(criteria, cursor=None, limit=None):
+    """
+    One keyset page of orders matching `criteria`. Returns (orders, next_cursor).
+    """
+    rows, next_cursor = keyset_page(ORDER_SUMMARY.where(*criteria), Order, cursor, limit)
+    return [OrderSummary(*row) for row in rows], next_cursor
@@ -0,0 +1,148 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import func, insert, text
+
+from app import db
+from money import percent_of
+from models import Order, ArchivedOrder, PartnerDailyStats
+
+logger = logging.getLogger(__name__)
+
+# Delivery partners earn 10% of each completed order's total
+DELIVERY_EARNINGS_PERCENT = 10
+
+STAT_COLUMNS = ('deliveries', 'gross', 'earnings', 'rating_sum', 'rating_count')
+
+
+def _upsert_increment(partner_id, day, **increments):
+    """
+    Add `increments` to the (partner_id, day) rollup row, creating it if needed.
+
+    Uses INSERT ... ON CONFLICT DO UPDATE on SQLite and PostgreSQL so concurrent
+    completions never lose an update; other databases fall back to read-modify-write.
+    """
+    table = PartnerDailyStats.__table__
+    values = {column: 0 for column in STAT_COLUMNS}
+    values.update(increments)
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(partner_id=partner_id, day=day, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['partner_id', 'day'],
+            set_={column: table.c[column] + stmt.excluded[column] for column in increments}
+        )
+        db.session.execute(stmt)
+        return
+
+    stats = db.session.get(PartnerDailyStats, (partner_id, day), with_for_update=True)
+    if stats is None:
+        db.session.add(PartnerDailyStats(partner_id=partner_id, day=day, **values))
+    else:
+        for column, amount in increments.items():
+            setattr(stats, column, getattr(stats, column) + amount)
+
+
+def delivery_earnings(total_amount):
+    """
+    A delivery partner's share of an order total, both in paise
+    """
+    return percent_of(total_amount, DELIVERY_EARNINGS_PERCENT)
+
+
+def record_completed_delivery(order):
+    """
+    Fold a just-completed order into its partner's daily rollup.
+    Call inside the same transaction that marks the order completed.
+    """
+    completed_at = order.updated_at or datetime.utcnow()
+    _upsert_increment(
+        order.delivery_partner_id,
+        completed_at.date(),
+        deliveries=1,
+        gross=order.total_amount,
+        earnings=delivery_earnings(order.total_amount)
+    )
+
+
+def partner_totals(partner_id):
+    """
+    Lifetime totals for a delivery partner, read from the rollup table
+    """
+    row = db.session.query(
+        func.coalesce(func.sum(PartnerDailyStats.deliveries), 0),
+        func.coalesce(func.sum(PartnerDailyStats.earnings), 0),
+        func.coalesce(func.sum(PartnerDailyStats.rating_sum), 0.0),
+        func.coalesce(func.sum(PartnerDailyStats.rating_count), 0)
+    ).filter(PartnerDailyStats.partner_id == partner_id).one()
+
+    deliveries, earnings, rating_sum, rating_count = row
+    return {
+        'total_deliveries': deliveries,
+        'total_earnings': int(earnings),  # Paise
+        'average_rating': round(rating_sum / rating_count, 1) if rating_count else None
+    }
+
+
+def rebuild_partner_stats(chunk_size=5000, progress=None):
+    """
+    Rebuild the rollup table from completed (live and archived) orders,
+    reading `chunk_size` orders at a time. Returns the number of orders
+    folded in.
+
+    The delete, the reads and the insert are one transaction, so dashboards
+    keep reading the old rows until the new ones are committed. Writes to
+    the table are locked out for the whole rebuild: on PostgreSQL with an
+    explicit table lock, on SQLite by the database write lock the delete
+    takes. record_completed_delivery() writes the table in the transaction
+    that completes the order, so a completion either commits before the
+    rebuild reads the orders and is counted by it, or waits and is added
+    after it. Either way it is counted exactly once.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Conflicts with the row-exclusive lock every INSERT/UPDATE takes, but not with reads
+        db.session.execute(text('LOCK TABLE partner_daily_stats IN SHARE ROW EXCLUSIVE MODE'))
+    PartnerDailyStats.query.delete()
+
+    totals = defaultdict(lambda: defaultdict(int))
+    processed = 0
+    # Archived orders keep their original ids and still count towards lifetime stats
+    for model in (Order, ArchivedOrder):
+        last_id = 0
+        while True:
+            rows = db.session.query(
+                model.id, model.delivery_partner_id, model.updated_at, model.total_amount
+            ).filter(
+                model.status == 'completed',
+                model.delivery_partner_id.isnot(None),
+                model.id > last_id
+            ).order_by(model.id).limit(chunk_size).all()
+
+            if not rows:
+                break
+
+            for order_id, partner_id, updated_at, total_amount in rows:
+                key = (partner_id, (updated_at or datetime.utcnow()).date())
+                totals[key]['deliveries'] += 1
+                totals[key]['gross'] += total_amount
+                totals[key]['earnings'] += delivery_earnings(total_amount)
+
+            last_id = rows[-1][0]
+            processed += len(rows)
+            if progress:
+                progress(processed)
+
+    if totals:
+        db.session.execute(insert(PartnerDailyStats), [
+            {'partner_id': partner_id, 'day': day, 'rating_sum': 0.0, 'rating_count': 0, **increments}
+            for (partner_id, day), increments in totals.items()
+        ])
+    db.session.commit()
+    logger.info("Rebuilt partner rollups from %d orders", processed)
+    return processed
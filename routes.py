@@ -2,21 +2,36 @@ import os
 import json
 import random
 import math
-import stripe
 from decimal import Decimal
 from datetime import datetime, timedelta
-from flask import render_template, redirect, url_for, flash, request, jsonify, session, abort
+from flask import render_template, redirect, url_for, flash, request, jsonify, session, abort, Response, stream_with_context, send_from_directory
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.exceptions import RequestEntityTooLarge
 from sqlalchemy import or_, func
+from sqlalchemy.orm import selectinload
 from app import app, db
-from models import User, Restaurant, MenuItem, Order, OrderItem
+from models import User, Restaurant, MenuItem, Order, OrderItem, order_summary_values
+from money import cart_totals, order_totals, parse_rupees, to_rupees
 from utils import allowed_roles
+from pagination import page_size
+from read_models import order_summaries, order_summary_page
+from rollups import record_completed_delivery, partner_totals
+from blobstore import BLOB_FOLDER, BLOB_MAX_AGE, is_blob_key
+from uploads import sniff_image_type
+from assets import send_asset
+from serializers import RESTAURANT_JSON
 from forms import LoginForm, RegisterForm, CompleteProfileForm, EditProfileForm
 
-# Configure Stripe
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
 
+def stripe_client():
+    """
+    The stripe module, configured; imported on first use since it is slow to import and only checkout needs it
+    """
+    import stripe
+
+    stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+    return stripe
 
 
 # Authentication routes
@@ -172,6 +187,49 @@ def logout():
     flash('You have been logged out.', 'info')
     return redirect(url_for('login'))
 
+def owned_restaurant_id(user):
+    restaurant = Restaurant.query.filter_by(owner_id=user.id).first()
+    return restaurant.id if restaurant else None
+
+# Paginated dashboard order lists: view name -> (role, row partial, filter criteria for the current user)
+ORDER_LISTS = {
+    'customer_active': ('customer', 'partials/customer_orders.html', lambda user: [
+        Order.customer_id == user.id,
+        Order.status.in_(['pending', 'preparing', 'ready', 'picking', 'delivering'])
+    ]),
+    'customer_history': ('customer', 'partials/customer_orders.html', lambda user: [
+        Order.customer_id == user.id,
+        Order.status.in_(['completed', 'cancelled'])
+    ]),
+    'restaurant_active': ('restaurant', 'partials/restaurant_active_orders.html', lambda user: [
+        Order.restaurant_id == owned_restaurant_id(user),
+        Order.status.in_(['pending', 'preparing', 'ready'])
+    ]),
+    'restaurant_history': ('restaurant', 'partials/restaurant_order_history.html', lambda user: [
+        Order.restaurant_id == owned_restaurant_id(user),
+        Order.status.in_(['completed', 'cancelled'])
+    ]),
+    'delivery_available': ('delivery', 'partials/delivery_available_orders.html', lambda user: [
+        Order.status == 'ready',
+        Order.delivery_partner_id.is_(None)
+    ]),
+    'delivery_history': ('delivery', 'partials/delivery_history.html', lambda user: [
+        Order.delivery_partner_id == user.id,
+        Order.status == 'completed'
+    ]),
+}
+# The enhanced delivery dashboard shows the same lists with different markup
+ORDER_LISTS['enhanced_available'] = ('delivery', 'partials/enhanced_available_orders.html', ORDER_LISTS['delivery_available'][2])
+ORDER_LISTS['enhanced_history'] = ('delivery', 'partials/enhanced_delivery_history.html', ORDER_LISTS['delivery_history'][2])
+
+def load_order_page(view, cursor=None, limit=None):
+    """
+    Load one keyset page of a dashboard order list for the current user.
+    Returns (orders, next_cursor) with orders as read_models.OrderSummary rows.
+    """
+    criteria = ORDER_LISTS[view][2]
+    return order_summary_page(criteria(current_user), cursor, page_size(limit))
+
 # Dashboard routes
 @app.route('/')
 def home():
@@ -190,19 +248,16 @@ def user_dashboard():
         return redirect(url_for('delivery_dashboard'))
     
     # For customers
-    active_orders = Order.query.filter_by(
-        customer_id=current_user.id
-    ).filter(
-        Order.status.in_(['pending', 'preparing', 'ready', 'picking', 'delivering'])
-    ).order_by(Order.created_at.desc()).all()
-    
-    order_history = Order.query.filter_by(
-        customer_id=current_user.id
-    ).filter(
-        Order.status.in_(['completed', 'cancelled'])
-    ).order_by(Order.created_at.desc()).limit(10).all()
+    active_orders, active_cursor = load_order_page('customer_active')
+    order_history, history_cursor = load_order_page('customer_history')
     
-    return render_template('user_dashboard.html', active_orders=active_orders, order_history=order_history)
+    return render_template(
+        'user_dashboard.html',
+        active_orders=active_orders,
+        active_cursor=active_cursor,
+        order_history=order_history,
+        history_cursor=history_cursor
+    )
 
 @app.route('/restaurant/dashboard')
 @login_required
@@ -214,17 +269,8 @@ def restaurant_dashboard():
         flash('Restaurant profile not found. Please contact support.', 'danger')
         return redirect(url_for('home'))
     
-    current_orders = Order.query.filter_by(
-        restaurant_id=restaurant.id
-    ).filter(
-        Order.status.in_(['pending', 'preparing', 'ready'])
-    ).order_by(Order.created_at.desc()).all()
-    
-    completed_orders = Order.query.filter_by(
-        restaurant_id=restaurant.id
-    ).filter(
-        Order.status.in_(['completed', 'cancelled'])
-    ).order_by(Order.created_at.desc()).limit(10).all()
+    current_orders, active_cursor = load_order_page('restaurant_active')
+    completed_orders, history_cursor = load_order_page('restaurant_history')
     
     menu_items = MenuItem.query.filter_by(restaurant_id=restaurant.id).all()
     
@@ -232,7 +278,9 @@ def restaurant_dashboard():
         'restaurant_dashboard.html', 
         restaurant=restaurant, 
         current_orders=current_orders, 
+        active_cursor=active_cursor,
         completed_orders=completed_orders,
+        history_cursor=history_cursor,
         menu_items=menu_items
     )
 
@@ -241,29 +289,42 @@ def restaurant_dashboard():
 @allowed_roles(['delivery'])
 def delivery_dashboard():
     # Orders that need a delivery partner
-    available_orders = Order.query.filter_by(status='ready').all()
+    available_orders, available_cursor = load_order_page('delivery_available')
     
     # Orders assigned to this delivery partner
-    my_orders = Order.query.filter_by(
-        delivery_partner_id=current_user.id
-    ).filter(
+    my_orders = order_summaries([
+        Order.delivery_partner_id == current_user.id,
         Order.status.in_(['picking', 'delivering'])
-    ).all()
+    ])
     
     # Order history
-    completed_orders = Order.query.filter_by(
-        delivery_partner_id=current_user.id
-    ).filter(
-        Order.status == 'completed'
-    ).order_by(Order.created_at.desc()).limit(10).all()
+    completed_orders, history_cursor = load_order_page('delivery_history')
     
     return render_template(
         'delivery_dashboard.html',
         available_orders=available_orders,
+        available_cursor=available_cursor,
         my_orders=my_orders,
-        completed_orders=completed_orders
+        completed_orders=completed_orders,
+        history_cursor=history_cursor
     )
 
+@app.route('/api/order/list/<view>')
+@login_required
+def order_list_page(view):
+    """Next page of a dashboard order list, rendered with the same row partial as the dashboard"""
+    order_list = ORDER_LISTS.get(view)
+    if not order_list or current_user.role != order_list[0]:
+        return jsonify({'success': False, 'message': 'Order list not found'}), 404
+    
+    orders, next_cursor = load_order_page(view, request.args.get('cursor'), request.args.get('limit'))
+    
+    return jsonify({
+        'success': True,
+        'html': render_template(order_list[1], orders=orders, view=view),
+        'next_cursor': next_cursor
+    })
+
 # Restaurant routes
 @app.route('/restaurant/<int:restaurant_id>')
 def restaurant_details(restaurant_id):
@@ -276,7 +337,7 @@ def restaurant_details(restaurant_id):
 @app.route('/order/<int:order_id>')
 @login_required
 def order_details(order_id):
-    order = Order.query.get_or_404(order_id)
+    order = Order.query.options(selectinload(Order.items)).get_or_404(order_id)
     
     # Authorization check - only allow customer, restaurant owner, or assigned delivery partner
     if (current_user.id != order.customer_id and 
@@ -284,7 +345,30 @@ def order_details(order_id):
         current_user.id != order.delivery_partner_id):
         abort(403)
     
-    return render_template('order_details.html', order=order)
+    # Breakdown recomputed from the stored lines; the total is order.total_amount
+    totals = order_totals((item.price, item.quantity) for item in order.items)
+    return render_template('order_details.html', order=order, **totals)
+
+def priced_cart():
+    """
+    The session cart with each line's price taken from its MenuItem, in paise.
+    Carts saved before prices moved to paise hold float rupees, and a price
+    may have changed since the item was added, so the session's own prices are
+    never trusted. Lines whose item is gone or belongs to another restaurant
+    are dropped. The refreshed cart is saved back to the session.
+    """
+    cart = session.get('cart', [])
+    ids = [item['menu_item_id'] for item in cart]
+    prices = dict(db.session.query(MenuItem.id, MenuItem.price).filter(
+        MenuItem.id.in_(ids),
+        MenuItem.restaurant_id == session.get('restaurant_id')
+    ).all()) if ids else {}
+    priced = [dict(item, price=prices[item['menu_item_id']]) for item in cart if item['menu_item_id'] in prices]
+    if priced != cart:
+        session['cart'] = priced
+        if not priced:
+            session.pop('restaurant_id', None)
+    return priced
 
 # Cart routes
 @app.route('/add-to-cart', methods=['POST'])
@@ -330,7 +414,7 @@ def add_to_cart():
         cart.append({
             'menu_item_id': int(menu_item_id),
             'name': menu_item.name,
-            'price': menu_item.price,
+            'price': menu_item.price,  # Paise
             'quantity': quantity
         })
     
@@ -354,7 +438,8 @@ def add_to_cart():
 @login_required
 @allowed_roles(['customer'])
 def cart():
-    if not session.get('cart'):
+    cart_items = priced_cart()
+    if not cart_items:
         flash('Your cart is empty.', 'info')
         return redirect(url_for('home'))
     
@@ -365,21 +450,14 @@ def cart():
     session.pop('cart_notification', None)
     session.pop('last_added_item', None)
     
-    # Calculate cart totals
-    cart_items = session.get('cart', [])
-    subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-    delivery_fee = 40  # Fixed delivery fee
-    tax = round(subtotal * 0.05, 2)  # 5% tax
-    total = subtotal + delivery_fee + tax
+    # Calculate cart totals (paise)
+    totals = cart_totals(cart_items)
     
     return render_template(
         'cart.html', 
         cart_items=cart_items, 
         restaurant=restaurant,
-        subtotal=subtotal,
-        delivery_fee=delivery_fee,
-        tax=tax,
-        total=total
+        **totals
     )
 
 @app.route('/update-cart-item', methods=['POST'])
@@ -393,7 +471,7 @@ def update_cart_item():
     if item_index is None or new_quantity is None:
         return jsonify({'success': False, 'message': 'Invalid request'}), 400
     
-    cart = session.get('cart', [])
+    cart = priced_cart()
     
     if item_index < 0 or item_index >= len(cart):
         return jsonify({'success': False, 'message': 'Item not found in cart'}), 404
@@ -412,16 +490,13 @@ def update_cart_item():
         session.pop('restaurant_id', None)
     
     # Recalculate totals
-    subtotal = sum(item['price'] * item['quantity'] for item in cart)
-    delivery_fee = 40
-    tax = round(subtotal * 0.05, 2)
-    total = subtotal + delivery_fee + tax
+    totals = cart_totals(cart)
     
     return jsonify({
         'success': True, 
-        'subtotal': subtotal,
-        'tax': tax,
-        'total': total,
+        'subtotal': to_rupees(totals['subtotal']),
+        'tax': to_rupees(totals['tax']),
+        'total': to_rupees(totals['total']),
         'cart_count': len(cart)
     })
 
@@ -438,7 +513,8 @@ def clear_cart():
 @login_required
 @allowed_roles(['customer'])
 def checkout():
-    if not session.get('cart'):
+    cart_items = priced_cart()
+    if not cart_items:
         flash('Your cart is empty.', 'info')
         return redirect(url_for('home'))
     
@@ -447,22 +523,20 @@ def checkout():
         delivery_address = request.form.get('delivery_address', current_user.address)
         
         restaurant_id = session.get('restaurant_id')
-        cart_items = session.get('cart', [])
         
-        # Calculate total
-        subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-        delivery_fee = 40  # Fixed delivery fee
-        tax = round(subtotal * 0.05, 2)  # 5% tax
-        total = subtotal + delivery_fee + tax
+        # Calculate totals (paise)
+        totals = cart_totals(cart_items)
         
         # Create order
         order = Order(
             customer_id=current_user.id,
             restaurant_id=restaurant_id,
-            total_amount=total,
+            total_amount=totals['total'],
             delivery_address=delivery_address,
             payment_method=payment_method,
-            payment_status='completed' if payment_method == 'online' else 'pending'
+            payment_status='completed' if payment_method == 'online' else 'pending',
+            customer_display_name=current_user.username,
+            **order_summary_values((item['quantity'], item['name']) for item in cart_items)
         )
         db.session.add(order)
         db.session.flush()  # Get order ID without committing
@@ -490,21 +564,14 @@ def checkout():
     restaurant_id = session.get('restaurant_id')
     restaurant = Restaurant.query.get_or_404(restaurant_id)
     
-    # Calculate cart totals
-    cart_items = session.get('cart', [])
-    subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-    delivery_fee = 40  # Fixed delivery fee
-    tax = round(subtotal * 0.05, 2)  # 5% tax
-    total = subtotal + delivery_fee + tax
+    # Calculate cart totals (paise)
+    totals = cart_totals(cart_items)
     
     return render_template(
         'checkout.html', 
         cart_items=cart_items, 
         restaurant=restaurant,
-        subtotal=subtotal,
-        delivery_fee=delivery_fee,
-        tax=tax,
-        total=total
+        **totals
     )
 
 # API routes
@@ -512,20 +579,20 @@ def checkout():
 def search_restaurants():
     query = request.args.get('query', '').lower()
     
-    if not query:
-        restaurants = Restaurant.query.all()
-    else:
-        restaurants = Restaurant.query.filter(
+    # Column rows straight to dicts; no ORM objects for a list payload
+    stmt = RESTAURANT_JSON.select()
+    if query:
+        stmt = stmt.where(
             or_(
                 Restaurant.name.ilike(f'%{query}%'), 
                 Restaurant.cuisine_type.ilike(f'%{query}%'),
                 Restaurant.description.ilike(f'%{query}%')
             )
-        ).all()
+        )
     
     return jsonify({
         'success': True,
-        'restaurants': [restaurant.to_dict() for restaurant in restaurants]
+        'restaurants': RESTAURANT_JSON.dump_all(db.session.execute(stmt))
     })
 
 @app.route('/api/toggle_restaurant_status', methods=['POST'])
@@ -546,22 +613,94 @@ def toggle_restaurant_status():
         'message': f'Restaurant is now {"open" if restaurant.is_open else "closed"}'
     })
 
-@app.route('/api/restaurant/upload_image', methods=['POST'])
+@app.route('/api/restaurant/analytics')
 @login_required
 @allowed_roles(['restaurant'])
-def upload_restaurant_image():
-    import os
-    import uuid
-    from werkzeug.utils import secure_filename
+def restaurant_analytics():
+    from analytics import get_restaurant_sales
+    
+    restaurant = Restaurant.query.filter_by(owner_id=current_user.id).first()
+    if not restaurant:
+        return jsonify({'success': False, 'message': 'Restaurant not found'}), 404
+    
+    days = request.args.get('days', 30, type=int)
+    if not 1 <= days <= 365:
+        return jsonify({'success': False, 'message': 'days must be between 1 and 365'}), 400
+    
+    return jsonify({
+        'success': True,
+        'days': days,
+        'analytics': get_restaurant_sales(restaurant.id, days=days)
+    })
+
+@app.route('/api/restaurant/orders/export')
+@login_required
+@allowed_roles(['restaurant'])
+def export_restaurant_orders():
+    from exports import EXPORT_FORMATS, parse_date_range, stream_export
+    
+    restaurant = Restaurant.query.filter_by(owner_id=current_user.id).first()
+    if not restaurant:
+        return jsonify({'success': False, 'message': 'Restaurant not found'}), 404
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': 'Format must be csv or ndjson'}), 400
+    
+    try:
+        start, end = parse_date_range(request.args.get('from'), request.args.get('to'))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Dates must be in YYYY-MM-DD format'}), 400
     
-    UPLOAD_FOLDER = 'static/uploads'
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'bmp'}
+    statuses = [status for status in request.args.get('status', '').split(',') if status]
+    use_gzip = request.args.get('gzip') in ('1', 'true')
     
-    # Ensure upload directory exists
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    filename = f"orders_restaurant_{restaurant.id}.{export_format}" + ('.gz' if use_gzip else '')
+    chunks = stream_export(
+        export_format,
+        gzip=use_gzip,
+        restaurant_id=restaurant.id,
+        start=start,
+        end=end,
+        statuses=statuses
+    )
     
-    def allowed_file(filename):
-        return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if use_gzip else EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/media/<path:key>')
+def media(key):
+    """
+    Serve a content-addressed blob. The URL changes whenever the bytes do, so it can be cached forever.
+    """
+    if not is_blob_key(key):
+        abort(404)
+    response = send_from_directory(BLOB_FOLDER, key, max_age=BLOB_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """
+    Serve a fingerprinted bundle built by `flask build-assets`
+    """
+    return send_asset(filename)
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    if request.path.startswith('/api/'):
+        return jsonify({'success': False, 'message': e.description}), 413
+    return e
+
+@app.route('/api/restaurant/upload_image', methods=['POST'])
+@login_required
+@allowed_roles(['restaurant'])
+def upload_restaurant_image():
+    from images import save_restaurant_upload
     
     if 'image' not in request.files:
         return jsonify({'success': False, 'message': 'No image file provided'}), 400
@@ -570,7 +709,9 @@ def upload_restaurant_image():
     if file.filename == '':
         return jsonify({'success': False, 'message': 'No selected file'}), 400
     
-    if not allowed_file(file.filename):
+    # Trust the file's magic bytes, not its name
+    file_ext = sniff_image_type(file.stream.head)
+    if not file_ext:
         return jsonify({
             'success': False, 
             'message': 'Invalid image format. Please upload JPG, PNG, GIF, WEBP, or BMP files.'
@@ -581,21 +722,7 @@ def upload_restaurant_image():
         return jsonify({'success': False, 'message': 'Restaurant not found'}), 404
     
     try:
-        # Create secure unique filename
-        filename = secure_filename(file.filename)
-        file_ext = filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"restaurant_{restaurant.id}_{uuid.uuid4().hex}.{file_ext}"
-        file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-        
-        # Save file
-        file.save(file_path)
-        
-        # Generate public URL
-        file_url = f"/static/uploads/{unique_filename}"
-        
-        # Update restaurant image URL in database
-        restaurant.image_url = file_url
-        db.session.commit()
+        file_url = save_restaurant_upload(restaurant, file, file_ext)
         
         return jsonify({
             'success': True,
@@ -624,6 +751,11 @@ def add_menu_item():
     if not name or not price:
         return jsonify({'success': False, 'message': 'Name and price are required'}), 400
     
+    try:
+        price = parse_rupees(price)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Price must be a positive amount in rupees'}), 400
+    
     restaurant = Restaurant.query.filter_by(owner_id=current_user.id).first()
     if not restaurant:
         return jsonify({'success': False, 'message': 'Restaurant not found'}), 404
@@ -632,7 +764,7 @@ def add_menu_item():
         restaurant_id=restaurant.id,
         name=name,
         description=description,
-        price=float(price),
+        price=price,
         category=category,
         is_vegetarian=is_vegetarian
     )
@@ -646,7 +778,7 @@ def add_menu_item():
         'item': {
             'id': menu_item.id,
             'name': menu_item.name,
-            'price': menu_item.price,
+            'price': to_rupees(menu_item.price),
             'description': menu_item.description,
             'category': menu_item.category,
             'is_vegetarian': menu_item.is_vegetarian
@@ -692,6 +824,9 @@ def update_restaurant_details():
     if not restaurant:
         return jsonify({'success': False, 'message': 'Restaurant not found'}), 404
     
+    # Parse the body up front so an oversized upload surfaces as a 413
+    image = request.files.get('image')
+    
     try:
         # Update basic details
         restaurant.name = request.form.get('name', restaurant.name)
@@ -713,30 +848,19 @@ def update_restaurant_details():
                 return jsonify({'success': False, 'message': 'Invalid rating value'}), 400
         
         # Handle image upload if provided
-        if 'image' in request.files:
-            file = request.files['image']
-            if file and file.filename:
-                import uuid
-                from werkzeug.utils import secure_filename
-                
-                UPLOAD_FOLDER = 'static/uploads'
-                ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-                
-                # Validate file extension
-                ext = file.filename.rsplit('.', 1)[1].lower()
-                if ext not in ALLOWED_EXTENSIONS:
-                    return jsonify({
-                        'success': False,
-                        'message': 'Invalid image format. Please upload JPG, PNG, GIF or WEBP files.'
-                    }), 400
-                
-                # Create unique filename
-                filename = f"restaurant_{restaurant.id}_{uuid.uuid4().hex}.{ext}"
-                file_path = os.path.join(UPLOAD_FOLDER, filename)
-                
-                # Save file
-                file.save(file_path)
-                restaurant.image_url = f"/static/uploads/{filename}"
+        if image and image.filename:
+            from images import save_restaurant_upload
+            
+            # Validate the file's magic bytes, not its extension
+            ext = sniff_image_type(image.stream.head)
+            if not ext:
+                return jsonify({
+                    'success': False,
+                    'message': 'Invalid image format. Please upload JPG, PNG, GIF, WEBP or BMP files.'
+                }), 400
+            
+            # Save and queue resized variants
+            save_restaurant_upload(restaurant, image, ext)
         
         db.session.commit()
         return jsonify({
@@ -847,17 +971,14 @@ def accept_order():
 @login_required
 @allowed_roles(['delivery'])
 def get_available_orders():
-    orders = Order.query.filter_by(
-        status='ready',
-        delivery_partner_id=None
-    ).all()
+    orders = order_summaries(ORDER_LISTS['delivery_available'][2](current_user))
     
     return jsonify({
         'success': True,
         'orders': [{
             'id': order.id,
-            'restaurant_name': order.restaurant.name,
-            'restaurant_address': order.restaurant.address,
+            'restaurant_name': order.restaurant_name,
+            'restaurant_address': order.restaurant_address,
             'items': order.order_items_display,
             'created_at': order.created_at.isoformat()
         } for order in orders]
@@ -980,6 +1101,7 @@ def update_order_status():
             
             order.status = 'completed'
             order.updated_at = datetime.utcnow()
+            record_completed_delivery(order)
             db.session.commit()
             
             return jsonify({
@@ -1056,7 +1178,7 @@ def update_order_status():
 @login_required
 def tracking(order_id):
     # Get order details
-    order = Order.query.get_or_404(order_id)
+    order = Order.query.options(selectinload(Order.items)).get_or_404(order_id)
     
     # Access control: only the customer, restaurant owner, or assigned delivery partner can view
     if (current_user.role == 'customer' and order.customer_id != current_user.id) or \
@@ -1076,38 +1198,19 @@ def tracking(order_id):
 @allowed_roles(['delivery'])
 def enhanced_delivery_dashboard():
     # Orders that need a delivery partner
-    available_orders = Order.query.filter_by(status='ready').all()
+    available_orders, available_cursor = load_order_page('enhanced_available')
     
     # Orders assigned to this delivery partner
-    my_orders = Order.query.filter_by(
-        delivery_partner_id=current_user.id
-    ).filter(
+    my_orders = order_summaries([
+        Order.delivery_partner_id == current_user.id,
         Order.status.in_(['picking', 'delivering'])
-    ).all()
+    ])
     
     # Order history
-    completed_orders = Order.query.filter_by(
-        delivery_partner_id=current_user.id
-    ).filter(
-        Order.status == 'completed'
-    ).order_by(Order.created_at.desc()).limit(10).all()
+    completed_orders, history_cursor = load_order_page('enhanced_history')
     
-    # Mock data for dashboard (in a real app, this would come from the database)
-    total_deliveries = Order.query.filter_by(
-        delivery_partner_id=current_user.id,
-        status='completed'
-    ).count()
-    
-    # Calculate earnings (10% of order total)
-    completed_order_amounts = db.session.query(db.func.sum(Order.total_amount)).filter(
-        Order.delivery_partner_id == current_user.id,
-        Order.status == 'completed'
-    ).scalar() or 0
-    
-    total_earnings = float(completed_order_amounts) * 0.10
-    
-    # Mock average rating
-    average_rating = 4.7  # In a real app, this would be calculated from ratings
+    # Lifetime stats come from the per-day rollup instead of scanning every completed order
+    stats = partner_totals(current_user.id)
     
     # Check if delivery partner is online
     # In a real app, this would be stored in the user record
@@ -1116,11 +1219,13 @@ def enhanced_delivery_dashboard():
     return render_template(
         'enhanced_delivery_dashboard.html',
         available_orders=available_orders,
+        available_cursor=available_cursor,
         my_orders=my_orders,
         completed_orders=completed_orders,
-        total_deliveries=total_deliveries,
-        total_earnings=total_earnings,
-        average_rating=average_rating,
+        history_cursor=history_cursor,
+        total_deliveries=stats['total_deliveries'],
+        total_earnings=stats['total_earnings'],
+        average_rating=stats['average_rating'],
         is_online=is_online
     )
 
@@ -1129,7 +1234,8 @@ def enhanced_delivery_dashboard():
 @login_required
 @allowed_roles(['customer'])
 def payment_checkout():
-    if not session.get('cart'):
+    cart_items = priced_cart()
+    if not cart_items:
         flash('Your cart is empty.', 'info')
         return redirect(url_for('home'))
     
@@ -1138,22 +1244,20 @@ def payment_checkout():
         delivery_address = request.form.get('delivery_address', current_user.address)
         
         restaurant_id = session.get('restaurant_id')
-        cart_items = session.get('cart', [])
         
-        # Calculate total
-        subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-        delivery_fee = 40  # Fixed delivery fee
-        tax = round(subtotal * 0.05, 2)  # 5% tax
-        total = subtotal + delivery_fee + tax
+        # Calculate totals (paise)
+        totals = cart_totals(cart_items)
         
         # Create order
         order = Order(
             customer_id=current_user.id,
             restaurant_id=restaurant_id,
-            total_amount=total,
+            total_amount=totals['total'],
             delivery_address=delivery_address,
             payment_method=payment_method,
-            payment_status='completed' if payment_method != 'cod' else 'pending'
+            payment_status='completed' if payment_method != 'cod' else 'pending',
+            customer_display_name=current_user.username,
+            **order_summary_values((item['quantity'], item['name']) for item in cart_items)
         )
         db.session.add(order)
         db.session.flush()  # Get order ID without committing
@@ -1195,22 +1299,15 @@ def payment_checkout():
     
     form = SimpleForm(csrf_token)
     
-    # Calculate cart totals
-    cart_items = session.get('cart', [])
-    subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-    delivery_fee = 40  # Fixed delivery fee
-    tax = round(subtotal * 0.05, 2)  # 5% tax
-    total = subtotal + delivery_fee + tax
+    # Calculate cart totals (paise)
+    totals = cart_totals(cart_items)
     
     return render_template(
         'payment_checkout.html', 
         cart_items=cart_items, 
         restaurant=restaurant,
-        subtotal=subtotal,
-        delivery_fee=delivery_fee,
-        tax=tax,
-        total=total,
-        form=form
+        form=form,
+        **totals
     )
 
 # Restaurant Bot Route
@@ -1366,7 +1463,8 @@ def restaurant_bot_update(restaurant_id):
 @login_required
 @allowed_roles(['customer'])
 def create_checkout_session():
-    if not session.get('cart'):
+    cart_items = priced_cart()
+    if not cart_items:
         flash('Your cart is empty.', 'info')
         return redirect(url_for('home'))
     
@@ -1374,13 +1472,9 @@ def create_checkout_session():
         # Get cart details
         restaurant_id = session.get('restaurant_id')
         restaurant = Restaurant.query.get_or_404(restaurant_id)
-        cart_items = session.get('cart', [])
         
-        # Calculate cart totals
-        subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-        delivery_fee = 40  # Fixed delivery fee
-        tax = round(subtotal * 0.05, 2)  # 5% tax
-        total = subtotal + delivery_fee + tax
+        # Calculate cart totals (paise)
+        totals = cart_totals(cart_items)
         
         # Prepare line items for Stripe
         line_items = []
@@ -1392,7 +1486,7 @@ def create_checkout_session():
                         'name': item['name'],
                         'description': f'From {restaurant.name}',
                     },
-                    'unit_amount': int(item['price'] * 100),  # Stripe expects amount in cents
+                    'unit_amount': item['price'],  # Paise, Stripe's smallest INR unit
                 },
                 'quantity': item['quantity'],
             })
@@ -1405,7 +1499,7 @@ def create_checkout_session():
                     'name': 'Delivery Fee',
                     'description': 'Standard delivery charge',
                 },
-                'unit_amount': int(delivery_fee * 100),
+                'unit_amount': totals['delivery_fee'],
             },
             'quantity': 1,
         })
@@ -1418,7 +1512,7 @@ def create_checkout_session():
                     'name': 'Tax',
                     'description': '5% tax on food items',
                 },
-                'unit_amount': int(tax * 100),
+                'unit_amount': totals['tax'],
             },
             'quantity': 1,
         })
@@ -1427,7 +1521,7 @@ def create_checkout_session():
         domain_url = request.host_url.rstrip('/')
         
         # Create Stripe checkout session
-        checkout_session = stripe.checkout.Session.create(
+        checkout_session = stripe_client().checkout.Session.create(
             payment_method_types=['card'],
             line_items=line_items,
             mode='payment',
@@ -1455,27 +1549,26 @@ def create_checkout_session():
 @allowed_roles(['customer'])
 def stripe_success():
     # Create order from cart data
+    cart_items = priced_cart()
     restaurant_id = session.get('restaurant_id')
-    cart_items = session.get('cart', [])
     
     if not cart_items:
         flash('Your order could not be processed. Please try again.', 'warning')
         return redirect(url_for('home'))
     
-    # Calculate total
-    subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-    delivery_fee = 40  # Fixed delivery fee
-    tax = round(subtotal * 0.05, 2)  # 5% tax
-    total = subtotal + delivery_fee + tax
+    # Calculate totals (paise)
+    totals = cart_totals(cart_items)
     
     # Create order
     order = Order(
         customer_id=current_user.id,
         restaurant_id=restaurant_id,
-        total_amount=total,
+        total_amount=totals['total'],
         delivery_address=current_user.address,
         payment_method='card',
-        payment_status='completed'
+        payment_status='completed',
+        customer_display_name=current_user.username,
+        **order_summary_values((item['quantity'], item['name']) for item in cart_items)
     )
     db.session.add(order)
     db.session.flush()  # Get order ID without committing
@@ -1607,33 +1700,33 @@ def init_db():
         # Add menu items for SSN Main Canteen
         if restaurant1 and not MenuItem.query.filter_by(restaurant_id=restaurant1.id).first():
             menu_items1 = [
-                MenuItem(restaurant_id=restaurant1.id, name='Dosa', description='Crispy South Indian pancake served with chutney and sambar', price=50, category='Breakfast', is_vegetarian=True),
-                MenuItem(restaurant_id=restaurant1.id, name='Idli', description='Steamed rice cakes served with chutney and sambar', price=30, category='Breakfast', is_vegetarian=True),
-                MenuItem(restaurant_id=restaurant1.id, name='Pongal', description='Rice and lentil porridge seasoned with pepper, cumin and ghee', price=40, category='Breakfast', is_vegetarian=True),
-                MenuItem(restaurant_id=restaurant1.id, name='Lemon Rice', description='Rice flavored with lemon juice, turmeric, and tempering', price=45, category='Lunch', is_vegetarian=True),
-                MenuItem(restaurant_id=restaurant1.id, name='Coffee', description='Hot filter coffee, served in traditional style', price=20, category='Beverages', is_vegetarian=True),
+                MenuItem(restaurant_id=restaurant1.id, name='Dosa', description='Crispy South Indian pancake served with chutney and sambar', price=5000, category='Breakfast', is_vegetarian=True),
+                MenuItem(restaurant_id=restaurant1.id, name='Idli', description='Steamed rice cakes served with chutney and sambar', price=3000, category='Breakfast', is_vegetarian=True),
+                MenuItem(restaurant_id=restaurant1.id, name='Pongal', description='Rice and lentil porridge seasoned with pepper, cumin and ghee', price=4000, category='Breakfast', is_vegetarian=True),
+                MenuItem(restaurant_id=restaurant1.id, name='Lemon Rice', description='Rice flavored with lemon juice, turmeric, and tempering', price=4500, category='Lunch', is_vegetarian=True),
+                MenuItem(restaurant_id=restaurant1.id, name='Coffee', description='Hot filter coffee, served in traditional style', price=2000, category='Beverages', is_vegetarian=True),
             ]
             db.session.add_all(menu_items1)
         
         # Add menu items for Rishub's Food Court
         if restaurant2 and not MenuItem.query.filter_by(restaurant_id=restaurant2.id).first():
             menu_items2 = [
-                MenuItem(restaurant_id=restaurant2.id, name='Burger', description='Classic beef burger with lettuce, tomato, and special sauce', price=80, category='Main Course', is_vegetarian=False),
-                MenuItem(restaurant_id=restaurant2.id, name='Fries', description='Crispy golden French fries served with ketchup', price=60, category='Sides', is_vegetarian=True),
-                MenuItem(restaurant_id=restaurant2.id, name='Coke', description='Refreshing Coca-Cola served with ice', price=40, category='Beverages', is_vegetarian=True),
-                MenuItem(restaurant_id=restaurant2.id, name='Sandwich', description='Grilled chicken sandwich with mayo and veggies', price=70, category='Main Course', is_vegetarian=False),
-                MenuItem(restaurant_id=restaurant2.id, name='Pasta', description='Creamy pasta with garlic bread on the side', price=100, category='Main Course', is_vegetarian=True),
+                MenuItem(restaurant_id=restaurant2.id, name='Burger', description='Classic beef burger with lettuce, tomato, and special sauce', price=8000, category='Main Course', is_vegetarian=False),
+                MenuItem(restaurant_id=restaurant2.id, name='Fries', description='Crispy golden French fries served with ketchup', price=6000, category='Sides', is_vegetarian=True),
+                MenuItem(restaurant_id=restaurant2.id, name='Coke', description='Refreshing Coca-Cola served with ice', price=4000, category='Beverages', is_vegetarian=True),
+                MenuItem(restaurant_id=restaurant2.id, name='Sandwich', description='Grilled chicken sandwich with mayo and veggies', price=7000, category='Main Course', is_vegetarian=False),
+                MenuItem(restaurant_id=restaurant2.id, name='Pasta', description='Creamy pasta with garlic bread on the side', price=10000, category='Main Course', is_vegetarian=True),
             ]
             db.session.add_all(menu_items2)
         
         # Add menu items for Ashwin's Food Court
         if restaurant3 and not MenuItem.query.filter_by(restaurant_id=restaurant3.id).first():
             menu_items3 = [
-                MenuItem(restaurant_id=restaurant3.id, name='Biryani', description='Fragrant rice dish with tender chicken pieces', price=150, category='Main Course', is_vegetarian=False),
-                MenuItem(restaurant_id=restaurant3.id, name='Chicken Curry', description='Spicy chicken curry cooked in traditional style', price=130, category='Main Course', is_vegetarian=False),
-                MenuItem(restaurant_id=restaurant3.id, name='Roti', description='Whole wheat flatbread', price=40, category='Bread', is_vegetarian=True),
-                MenuItem(restaurant_id=restaurant3.id, name='Paneer Butter Masala', description='Cottage cheese cubes in rich tomato gravy', price=120, category='Main Course', is_vegetarian=True),
-                MenuItem(restaurant_id=restaurant3.id, name='Lassi', description='Sweet yogurt-based drink with a hint of cardamom', price=50, category='Beverages', is_vegetarian=True),
+                MenuItem(restaurant_id=restaurant3.id, name='Biryani', description='Fragrant rice dish with tender chicken pieces', price=15000, category='Main Course', is_vegetarian=False),
+                MenuItem(restaurant_id=restaurant3.id, name='Chicken Curry', description='Spicy chicken curry cooked in traditional style', price=13000, category='Main Course', is_vegetarian=False),
+                MenuItem(restaurant_id=restaurant3.id, name='Roti', description='Whole wheat flatbread', price=4000, category='Bread', is_vegetarian=True),
+                MenuItem(restaurant_id=restaurant3.id, name='Paneer Butter Masala', description='Cottage cheese cubes in rich tomato gravy', price=12000, category='Main Course', is_vegetarian=True),
+                MenuItem(restaurant_id=restaurant3.id, name='Lassi', description='Sweet yogurt-based drink with a hint of cardamom', price=5000, category='Beverages', is_vegetarian=True),
             ]
             db.session.add_all(menu_items3)
         
@@ -0,0 +1,47 @@
+"""
+Precompiled row serializers for JSON endpoints.
+
+Each serializer owns a column-projected SELECT and the payload keys for it.
+Rows come back as plain tuples, so no ORM objects, identity map entries or
+attribute instrumentation are involved, and each row becomes a dict by
+zipping it with the fixed key tuple.
+"""
+from sqlalchemy import select
+
+from models import Restaurant
+
+
+class RowSerializer:
+    """
+    `fields` maps payload keys to column expressions, in output order
+    """
+
+    def __init__(self, **fields):
+        self.keys = tuple(fields)
+        self.statement = select(*fields.values())
+
+    def select(self):
+        # Statements are immutable; .where()/.order_by() return new ones
+        return self.statement
+
+    def dump(self, row):
+        return dict(zip(self.keys, row))
+
+    def dump_all(self, rows):
+        keys = self.keys
+        return [dict(zip(keys, row)) for row in rows]
+
+
+# Same payload as Restaurant.to_dict(); keep the two in step
+RESTAURANT_JSON = RowSerializer(
+    id=Restaurant.id,
+    name=Restaurant.name,
+    description=Restaurant.description,
+    cuisine_type=Restaurant.cuisine_type,
+    address=Restaurant.address,
+    phone=Restaurant.phone,
+    image_url=Restaurant.image_url,
+    image_variants=Restaurant.image_variants,
+    rating=Restaurant.rating,
+    is_open=Restaurant.is_open,
+)
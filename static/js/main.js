@@ -93,6 +93,43 @@ document.addEventListener('DOMContentLoaded', function() {
         }, false);
     });
     
+    // Incremental loading for paginated order lists
+    document.addEventListener('click', function(event) {
+        const button = event.target.closest('[data-load-more]');
+        if (!button) return;
+        
+        const view = button.getAttribute('data-load-more');
+        const cursor = button.getAttribute('data-cursor');
+        const target = document.querySelector(button.getAttribute('data-target'));
+        const originalText = button.innerHTML;
+        
+        button.disabled = true;
+        button.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Loading...';
+        
+        fetch(`/api/order/list/${view}?cursor=${encodeURIComponent(cursor)}`)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) {
+                    throw new Error(data.message || 'Error loading orders');
+                }
+                
+                target.insertAdjacentHTML('beforeend', data.html);
+                
+                if (data.next_cursor) {
+                    button.setAttribute('data-cursor', data.next_cursor);
+                    button.disabled = false;
+                    button.innerHTML = originalText;
+                } else {
+                    button.remove();
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                button.disabled = false;
+                button.innerHTML = originalText;
+            });
+    });
+    
     // Quantity controls for menu items
     const decreaseButtons = document.querySelectorAll('.quantity-decrease');
     const increaseButtons = document.querySelectorAll('.quantity-increase');
@@ -0,0 +1,314 @@
+"""
+Deterministic synthetic data at production scale.
+
+Generates users, restaurants, menus and orders with their items in large
+chunks: COPY on PostgreSQL (psycopg2), executemany elsewhere, one
+transaction per chunk. Every value comes from a seeded Random, and the
+timeline is anchored to an `until` date, so the same arguments always
+produce the same rows and benchmarks and index experiments are repeatable.
+
+Distributions, roughly what a delivery platform sees:
+- order volume grows over the period and is higher on weekends;
+- orders cluster at lunch and dinner;
+- a few restaurants and customers account for a large share of orders;
+- 1-4 lines per order, mostly quantity 1;
+- older orders are completed (some cancelled), and orders from the last
+  ACTIVE_MINUTES are spread over the in-flight statuses.
+
+Ids are assigned here, continuing after the current maximum, so rows can
+reference each other without round trips, and the data can be added to a
+non-empty database.
+"""
+import csv
+import io
+import logging
+import math
+import random
+from array import array
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+
+from sqlalchemy import func, select, text
+
+from app import db
+from money import PAISE_PER_RUPEE, order_totals
+from models import User, Restaurant, MenuItem, Order, OrderItem, order_summary_values
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 10000
+ACTIVE_MINUTES = 90
+PASSWORD = 'password'
+# generate_password_hash(PASSWORD), computed once: a fresh hash gets a random
+# salt, which would make the generated rows differ from run to run
+PASSWORD_HASH = ('scrypt:32768:8:1$5Y91NwMwBLb5VreG$1aba929bbf5ba407e1daada5e58343291c754e7cec3bf7207fbfe716779aab'
+                 '281cf93eb5316334890bb203c26fabae3b11e173ea0ea0807f425b91220462e5a6')
+
+CUISINES = ['South Indian', 'North Indian', 'Chinese', 'Fast Food', 'Biryani', 'Chettinad', 'Bakery',
+            'Street Food', 'Kerala', 'Andhra', 'Continental', 'Desserts']
+NAME_PREFIXES = ['Sri', 'New', 'Royal', 'Hotel', 'Anna', 'Madras', 'Spice', 'Urban', 'Classic', 'Green']
+NAME_SUFFIXES = ['Bhavan', 'Kitchen', 'Mess', 'Cafe', 'Corner', 'Dhaba', 'Express', 'House', 'Point', 'Grand']
+DISHES = ['Masala Dosa', 'Idli', 'Vada', 'Pongal', 'Veg Biryani', 'Chicken Biryani', 'Mutton Biryani',
+          'Parotta', 'Chicken 65', 'Paneer Butter Masala', 'Butter Naan', 'Fried Rice', 'Hakka Noodles',
+          'Gobi Manchurian', 'Burger', 'Fries', 'Sandwich', 'Pasta', 'Filter Coffee', 'Masala Chai',
+          'Lime Soda', 'Gulab Jamun', 'Rasmalai', 'Curd Rice', 'Lemon Rice', 'Meals', 'Kothu Parotta',
+          'Fish Fry', 'Egg Curry', 'Chapathi']
+CATEGORIES = ['Breakfast', 'Main Course', 'Main Course', 'Starters', 'Sides', 'Beverages', 'Desserts']
+STREETS = ['Anna Salai', 'Mount Road', 'Rajiv Gandhi Salai', 'Arcot Road', 'Poonamallee High Road',
+           'ECR', 'Velachery Main Road', 'Cathedral Road', 'TTK Road', 'GST Road']
+AREAS = ['T. Nagar', 'Adyar', 'Mylapore', 'Velachery', 'Anna Nagar', 'Tambaram', 'Guindy', 'Porur',
+         'Kalavakkam', 'Thiruvanmiyur', 'Nungambakkam', 'Chromepet']
+
+# Relative order volume by hour of day: lunch and dinner peaks
+HOUR_WEIGHTS = [2, 1, 1, 0, 0, 0, 1, 3, 6, 7, 5, 6, 12, 14, 10, 6, 5, 6, 8, 12, 15, 13, 8, 4]
+LINE_COUNT_WEIGHTS = [50, 30, 15, 5]  # 1-4 lines
+QUANTITY_WEIGHTS = [75, 20, 5]  # 1-3 of an item
+ACTIVE_STATUSES = [('pending', 20), ('preparing', 25), ('ready', 15), ('picking', 15), ('delivering', 25)]
+CANCELLED_PERCENT = 8
+ONLINE_PAYMENT_PERCENT = 40
+
+
+def _address(index):
+    return f"{index * 7919 % 999 + 1}, {STREETS[index % len(STREETS)]}, {AREAS[index // len(STREETS) % len(AREAS)]}, Chennai"
+
+
+def _dish_name(restaurant_index, item_index):
+    name = DISHES[(restaurant_index * 7 + item_index) % len(DISHES)]
+    return name if item_index < len(DISHES) else f"{name} #{item_index // len(DISHES) + 1}"
+
+
+def _cumulative(weights):
+    return list(accumulate(weights))
+
+
+def _spread(total, weights):
+    """
+    Split `total` into integer parts proportional to `weights` (largest remainder)
+    """
+    scale = total / sum(weights)
+    exact = [weight * scale for weight in weights]
+    parts = [int(value) for value in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: parts[i] - exact[i])
+    for i in by_remainder[:total - sum(parts)]:
+        parts[i] += 1
+    return parts
+
+
+def _skewed(rng, count, exponent):
+    """
+    An index in [0, count) where low indices are picked far more often
+    """
+    return min(int(count * rng.random() ** exponent), count - 1)
+
+
+def _next_id(model):
+    return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+class _Writer:
+    """
+    Bulk-load rows (tuples in `columns` order) into a table
+    """
+
+    def __init__(self):
+        bind = db.session.get_bind()
+        self.copy = bind.dialect.name == 'postgresql' and bind.dialect.driver == 'psycopg2'
+        self.preparer = bind.dialect.identifier_preparer
+
+    def write(self, model, columns, rows):
+        if not rows:
+            return
+        table = model.__table__
+        if self.copy:
+            self._copy(table, columns, rows)
+        else:
+            db.session.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+    def _copy(self, table, columns, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(['\\N' if value is None else ('t' if value is True else 'f' if value is False else value)
+                             for value in row])
+        buffer.seek(0)
+        column_list = ', '.join(self.preparer.quote(column) for column in columns)
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert(
+            f"COPY {self.preparer.format_table(table)} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+
+    def reset_sequences(self, models):
+        if not self.copy:
+            return
+        for model in models:
+            table = self.preparer.format_table(model.__table__)
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+            ))
+
+
+def generate(restaurants, menu_items, customers, partners, orders, days=180, seed=42, until=None,
+             chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Insert a synthetic dataset. `menu_items` is the total across restaurants;
+    orders are spread over the `days` days ending on `until` (a date,
+    default yesterday). Returns the number of rows written per table.
+    """
+    if restaurants < 1 or customers < 1 or partners < 1:
+        raise ValueError('restaurants, customers and partners must be at least 1')
+    if menu_items < restaurants:
+        raise ValueError('every restaurant needs at least one menu item')
+    if days < 1:
+        raise ValueError('days must be at least 1')
+
+    rng = random.Random(seed)
+    until = until or (datetime.utcnow().date() - timedelta(days=1))
+    end = datetime.combine(until, time.max).replace(microsecond=0)
+    start = datetime.combine(until - timedelta(days=days - 1), time.min)
+    writer = _Writer()
+    counts = {}
+
+    def flush(label, model, columns, rows):
+        writer.write(model, columns, rows)
+        db.session.commit()
+        counts[label] = counts.get(label, 0) + len(rows)
+        if progress:
+            progress(label, counts[label])
+        rows.clear()
+
+    # Users: customers, then one owner per restaurant, then delivery partners
+    user_columns = ('id', 'username', 'email', 'password_hash', 'phone', 'address', 'role',
+                    'is_profile_complete', 'created_at')
+    first_customer = user_id = _next_id(User)
+    first_owner = first_customer + customers
+    first_partner = first_owner + restaurants
+    rows = []
+    for role, count in (('customer', customers), ('restaurant', restaurants), ('delivery', partners)):
+        for _ in range(count):
+            rows.append((
+                user_id, f"{role.title()} {user_id}", f"{role}{user_id}@synthetic.test", PASSWORD_HASH,
+                f"9{user_id % 10 ** 9:09d}", _address(user_id), role, True,
+                start - timedelta(minutes=rng.randrange(60 * 24 * 365))
+            ))
+            user_id += 1
+            if len(rows) >= chunk_size:
+                flush('users', User, user_columns, rows)
+    flush('users', User, user_columns, rows)
+
+    # Restaurants, each owned by its own user
+    restaurant_columns = ('id', 'owner_id', 'name', 'description', 'cuisine_type', 'address', 'phone',
+                          'rating', 'is_open', 'created_at')
+    first_restaurant = _next_id(Restaurant)
+    for index in range(restaurants):
+        cuisine = CUISINES[rng.randrange(len(CUISINES))]
+        name = f"{rng.choice(NAME_PREFIXES)} {cuisine} {rng.choice(NAME_SUFFIXES)} {first_restaurant + index}"
+        rows.append((
+            first_restaurant + index, first_owner + index, name, f"{cuisine} food from {AREAS[index % len(AREAS)]}",
+            cuisine, _address(first_owner + index), f"9{(first_owner + index) % 10 ** 9:09d}",
+            round(rng.triangular(3.0, 5.0, 4.2), 1), rng.random() < 0.85,
+            start - timedelta(minutes=rng.randrange(60 * 24 * 365))
+        ))
+        if len(rows) >= chunk_size:
+            flush('restaurants', Restaurant, restaurant_columns, rows)
+    flush('restaurants', Restaurant, restaurant_columns, rows)
+
+    # Menus: contiguous ids per restaurant, so an order can pick items by offset
+    menu_columns = ('id', 'restaurant_id', 'name', 'description', 'price', 'category', 'is_vegetarian',
+                    'is_available', 'created_at')
+    first_item = _next_id(MenuItem)
+    menu_sizes = _spread(menu_items, [1] * restaurants)
+    menu_starts = array('q', accumulate([0] + menu_sizes[:-1]))
+    prices = array('q')
+    for index, size in enumerate(menu_sizes):
+        for item_index in range(size):
+            rupees = rng.lognormvariate(math.log(150), 0.5)
+            price = min(max(round(rupees / 5) * 5, 20), 1500) * PAISE_PER_RUPEE
+            prices.append(price)
+            rows.append((
+                first_item + len(prices) - 1, first_restaurant + index, _dish_name(index, item_index), None,
+                price, CATEGORIES[rng.randrange(len(CATEGORIES))], rng.random() < 0.6, rng.random() < 0.95,
+                start - timedelta(days=rng.randrange(30))
+            ))
+            if len(rows) >= chunk_size:
+                flush('menu items', MenuItem, menu_columns, rows)
+    flush('menu items', MenuItem, menu_columns, rows)
+
+    # Orders, day by day in time order so ids increase with created_at
+    order_columns = ('id', 'customer_id', 'restaurant_id', 'delivery_partner_id', 'status', 'total_amount',
+                     'delivery_address', 'payment_method', 'payment_status', 'created_at', 'updated_at',
+                     'item_count', 'items_summary', 'customer_display_name')
+    item_columns = ('id', 'order_id', 'menu_item_id', 'quantity', 'price')
+    order_id, item_id = _next_id(Order), _next_id(OrderItem)
+    day_weights = [
+        (1 + day / days) * (1.25 if (start + timedelta(days=day)).weekday() >= 4 else 1.0)
+        for day in range(days)
+    ]
+    hour_weights = _cumulative(HOUR_WEIGHTS)
+    line_weights, quantity_weights = _cumulative(LINE_COUNT_WEIGHTS), _cumulative(QUANTITY_WEIGHTS)
+    active_statuses = [status for status, _ in ACTIVE_STATUSES]
+    active_weights = _cumulative([weight for _, weight in ACTIVE_STATUSES])
+    active_since = end - timedelta(minutes=ACTIVE_MINUTES)
+    item_rows = []
+
+    def flush_orders():
+        writer.write(Order, order_columns, rows)
+        flush('order items', OrderItem, item_columns, item_rows)
+        counts['orders'] = counts.get('orders', 0) + len(rows)
+        if progress:
+            progress('orders', counts['orders'])
+        rows.clear()
+
+    for day, day_orders in enumerate(_spread(orders, day_weights)):
+        day_start = start + timedelta(days=day)
+        times = sorted(
+            day_start + timedelta(hours=hour, seconds=rng.randrange(3600))
+            for hour in rng.choices(range(24), cum_weights=hour_weights, k=day_orders)
+        )
+        for created_at in times:
+            customer = _skewed(rng, customers, 2.0)
+            restaurant = _skewed(rng, restaurants, 1.8)
+            menu_start, menu_size = menu_starts[restaurant], menu_sizes[restaurant]
+            line_count = min(rng.choices((1, 2, 3, 4), cum_weights=line_weights)[0], menu_size)
+            picked = rng.sample(range(menu_size), line_count)
+            quantities = rng.choices((1, 2, 3), cum_weights=quantity_weights, k=line_count)
+
+            lines = []
+            for item_index, quantity in zip(picked, quantities):
+                price = prices[menu_start + item_index]
+                item_rows.append((item_id, order_id, first_item + menu_start + item_index, quantity, price))
+                lines.append((item_index, quantity, price))
+                item_id += 1
+
+            if created_at >= active_since:
+                status = rng.choices(active_statuses, cum_weights=active_weights)[0]
+                updated_at = created_at
+            elif rng.randrange(100) < CANCELLED_PERCENT:
+                status = 'cancelled'
+                updated_at = created_at + timedelta(minutes=rng.randint(1, 15))
+            else:
+                status = 'completed'
+                updated_at = created_at + timedelta(minutes=rng.randint(20, 70))
+            partner = first_partner + rng.randrange(partners) if status in ('picking', 'delivering', 'completed') else None
+            online = rng.randrange(100) < ONLINE_PAYMENT_PERCENT
+            customer_id = first_customer + customer
+            summary = order_summary_values(
+                (quantity, _dish_name(restaurant, item_index)) for item_index, quantity, _ in lines
+            )
+
+            rows.append((
+                order_id, customer_id, first_restaurant + restaurant, partner, status,
+                order_totals((price, quantity) for _, quantity, price in lines)['total'],
+                _address(customer_id), 'online' if online else 'cash',
+                'completed' if online or status == 'completed' else 'pending',
+                created_at, updated_at, summary['item_count'], summary['items_summary'], f"Customer {customer_id}"
+            ))
+            order_id += 1
+            if len(rows) >= chunk_size:
+                flush_orders()
+    flush_orders()
+
+    writer.reset_sequences([User, Restaurant, MenuItem, Order, OrderItem])
+    db.session.commit()
+    logger.info("Generated synthetic data (seed %d): %s", seed, counts)
+    return counts
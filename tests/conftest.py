@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp(prefix='ezfoodz-tests-')}/test.db"
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from app import create_app, db  # noqa: E402
+from migrations import upgrade  # noqa: E402
+from synthetic import generate  # noqa: E402
+
+DATASET = dict(restaurants=3, menu_items=30, customers=10, partners=2, orders=200, days=30, seed=3,
+               until=date(2026, 1, 31))
+
+
+@pytest.fixture
+def app():
+    """
+    The app over a freshly migrated database with a small synthetic dataset
+    """
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        upgrade()
+        generate(**DATASET)
+        yield app
+        db.session.remove()
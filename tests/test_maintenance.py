@@ -0,0 +1,42 @@
+from sqlalchemy import select, text
+
+from app import db
+from maintenance import check_order_summaries
+from models import Order
+
+
+def stale_orders(count):
+    """
+    Blank the summary columns of the first `count` orders without touching updated_at;
+    returns their {id: updated_at}
+    """
+    ids = db.session.scalars(select(Order.id).order_by(Order.id).limit(count)).all()
+    db.session.execute(
+        text('UPDATE "order" SET item_count = 0, items_summary = \'\' WHERE id IN ({})'.format(','.join(map(str, ids))))
+    )
+    db.session.commit()
+    return dict(db.session.execute(select(Order.id, Order.updated_at).where(Order.id.in_(ids))).all())
+
+
+def test_repair_keeps_updated_at(app):
+    before = stale_orders(20)
+
+    assert sorted(check_order_summaries(repair=True, batch_size=7)) == sorted(before)
+
+    db.session.expire_all()
+    rows = db.session.execute(select(Order.id, Order.updated_at, Order.item_count).where(Order.id.in_(before))).all()
+    assert {row.id: row.updated_at for row in rows} == before
+    assert all(row.item_count > 0 for row in rows)
+    assert check_order_summaries() == []
+
+
+def test_repair_in_callers_transaction_keeps_updated_at(app):
+    # The path migration 0003 takes
+    before = stale_orders(5)
+
+    with db.engine.begin() as connection:
+        check_order_summaries(repair=True, connection=connection)
+
+    db.session.expire_all()
+    assert dict(db.session.execute(select(Order.id, Order.updated_at).where(Order.id.in_(before))).all()) == before
+    assert check_order_summaries() == []
@@ -0,0 +1,18 @@
+from sqlalchemy import text
+
+from app import db
+from metrics import POOL_CHECKOUT
+
+
+def checkouts():
+    return sum(sample.value for metric in POOL_CHECKOUT.collect() for sample in metric.samples
+               if sample.name == 'db_pool_checkout_seconds_count')
+
+
+def test_pool_checkouts_are_timed(app):
+    before = checkouts()
+
+    with db.engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+
+    assert checkouts() == before + 1
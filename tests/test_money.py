@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import select
+
+from app import db
+from models import MenuItem, User
+from money import parse_rupees
+from synthetic import PASSWORD
+
+
+@pytest.mark.parametrize('value, paise', [('49.5', 4950), ('75', 7500), (' 0.01 ', 1), (120, 12000)])
+def test_parse_rupees(value, paise):
+    assert parse_rupees(value) == paise
+
+
+@pytest.mark.parametrize('value', ['abc', 'nan', 'Infinity', '0', '-50', '-0.01', '0.001'])
+def test_parse_rupees_rejects_non_positive_and_non_amounts(value):
+    with pytest.raises(ValueError):
+        parse_rupees(value)
+
+
+def owner_client(app):
+    email = db.session.scalar(select(User.email).where(User.role == 'restaurant').order_by(User.id).limit(1))
+    client = app.test_client()
+    client.post('/login', data={'email': email, 'password': PASSWORD})
+    return client
+
+
+@pytest.mark.parametrize('price', ['-50', '0', '0.001'])
+def test_add_menu_item_rejects_non_positive_price(app, price):
+    items = db.session.scalar(select(db.func.count(MenuItem.id)))
+
+    response = owner_client(app).post('/api/restaurant/add_menu_item', json={'name': 'Free Dosa', 'price': price})
+
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert db.session.scalar(select(db.func.count(MenuItem.id))) == items
+
+
+def test_add_menu_item_stores_paise(app):
+    response = owner_client(app).post('/api/restaurant/add_menu_item', json={'name': 'Query Dosa', 'price': '49.5'})
+
+    assert response.status_code == 200
+    assert response.get_json()['item']['price'] == 49.5
+    assert db.session.scalar(select(MenuItem.price).where(MenuItem.name == 'Query Dosa')) == 4950
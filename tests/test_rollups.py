@@ -0,0 +1,58 @@
+import threading
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from app import db
+from models import Order, PartnerDailyStats, User
+from rollups import delivery_earnings, rebuild_partner_stats, record_completed_delivery
+
+
+def rollup_totals():
+    return db.session.execute(
+        select(func.sum(PartnerDailyStats.deliveries), func.sum(PartnerDailyStats.earnings))
+    ).one()
+
+
+def order_totals():
+    rows = db.session.execute(
+        select(Order.total_amount).where(Order.status == 'completed', Order.delivery_partner_id.isnot(None))
+    ).scalars().all()
+    return len(rows), sum(delivery_earnings(total) for total in rows)
+
+
+def test_rebuild_matches_orders(app):
+    rebuild_partner_stats(chunk_size=17)
+
+    assert tuple(rollup_totals()) == order_totals()
+
+
+def test_delivery_completed_during_rebuild_is_counted_once(app):
+    # The newest unfinished order: in a chunk the rebuild has not read yet when it completes
+    order_id = db.session.scalar(select(Order.id).where(Order.status != 'completed').order_by(Order.id.desc()).limit(1))
+    partner_id = db.session.scalar(select(User.id).where(User.role == 'delivery').limit(1))
+    db.session.remove()
+    completions = []
+
+    def complete():
+        with app.app_context():
+            order = db.session.get(Order, order_id)
+            order.delivery_partner_id = partner_id
+            order.status = 'completed'
+            order.updated_at = datetime.utcnow()
+            record_completed_delivery(order)
+            db.session.commit()
+            completions.append(order_id)
+
+    worker = threading.Thread(target=complete)
+
+    def progress(processed):
+        if worker.ident is None:
+            worker.start()
+            worker.join(0.2)  # Blocked by the rebuild until it commits
+
+    rebuild_partner_stats(chunk_size=17, progress=progress)
+    worker.join()
+
+    assert completions == [order_id]
+    assert tuple(rollup_totals()) == order_totals()
@@ -0,0 +1,104 @@
+"""
+Streaming, size-capped file uploads.
+
+Werkzeug parses multipart bodies in fixed-size chunks and hands each file
+part to the request's stream factory. UploadRequest makes that factory an
+UploadSpool: a temporary file in the blob store's scratch folder that hashes
+and counts bytes as they arrive and aborts with 413 as soon as the cap is
+crossed. Memory per upload stays at one parser chunk whatever the file
+size, and the finished file is renamed into the blob store without a copy.
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+
+SNIFF_BYTES = 16
+
+# Leading bytes -> canonical extension. The client's filename and
+# Content-Type are never trusted.
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+)
+
+
+def sniff_image_type(head):
+    """
+    Extension for an image from its first bytes, or None if it is not a supported format
+    """
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    return None
+
+
+def _format_size(size):
+    if size >= 1024 * 1024:
+        return f'{size / (1024 * 1024):g} MB'
+    return f'{size / 1024:.0f} KB'
+
+
+class UploadSpool:
+    """
+    Disk-backed file object that one multipart file part is streamed into
+    """
+
+    def __init__(self, max_bytes, folder):
+        fd, self.path = tempfile.mkstemp(dir=folder, prefix='upload-')
+        self._file = os.fdopen(fd, 'w+b')
+        self._digest = hashlib.sha256()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.head = b''
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            # The parser drops this part without closing it, so clean up here
+            self.close()
+            raise RequestEntityTooLarge(f'Uploads are limited to {_format_size(self.max_bytes)}')
+        if len(self.head) < SNIFF_BYTES:
+            self.head += data[:SNIFF_BYTES - len(self.head)]
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+    def detach(self):
+        """
+        Close the file and hand its path to the caller, who now owns it
+        """
+        self._file.close()
+        path, self.path = self.path, None
+        return path
+
+    def close(self):
+        self._file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+    def __getattr__(self, name):
+        # read/seek/readline/... for FileStorage
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """
+    Request class that streams file parts into UploadSpools capped at MAX_UPLOAD_BYTES.
+    Flask closes request files at teardown, which removes any spool not moved into the blob store.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        from blobstore import temp_folder
+
+        return UploadSpool(current_app.config['MAX_UPLOAD_BYTES'], temp_folder())